@@ -1,9 +1,16 @@
 """Main FastAPI application."""
 
+import asyncio
+import sys
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 
+from src.cache import close_redis
 from src.config import settings
+from src.crud.openfoodfacts import POPULAR_BARCODES, close_off_client, warm_cache
 from src.routers import (
     helloworld,
     database,
@@ -14,7 +21,27 @@ from src.routers import (
     openfoodfacts,
 )
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Warm caches on startup and release long-lived resources on shutdown."""
+    warm_task = None
+    if settings.warm_cache:
+        warm_task = asyncio.create_task(
+            warm_cache(POPULAR_BARCODES, openfoodfacts.POPULAR_CATEGORIES)
+        )
+    yield
+    if warm_task is not None:
+        warm_task.cancel()
+    await langgraph_agent.mcp_session.close()
+    await langgraph_agent.close_openai_client()
+    await close_off_client()
+    await transactions.close_graphdb_client()
+    await close_redis()
+
+
 app = FastAPI(
+    lifespan=lifespan,
     title=settings.app_name,
     version=settings.app_version,
     debug=settings.debug,
@@ -31,6 +58,10 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Product lists compress well. Starlette skips SSE streams, and audio responses
+# opt out by setting Content-Encoding themselves
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+
 app.include_router(helloworld.router)
 app.include_router(database.router)
 app.include_router(customers.router)
@@ -74,4 +105,12 @@ async def health_check():
 if __name__ == "__main__":
     import uvicorn
 
-    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
+    # uvloop has no Windows build; fall back to the stock asyncio loop there
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=8000,
+        reload=True,
+        loop="asyncio" if sys.platform == "win32" else "uvloop",
+        http="httptools",
+    )
@@ -0,0 +1,92 @@
+"""Optional Redis cache shared across the API."""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+from .config import settings
+
+try:
+    from redis import asyncio as redis_asyncio
+except ImportError:  # Redis is optional; without it nothing is cached
+    redis_asyncio = None
+
+logger = logging.getLogger(__name__)
+
+_redis = None
+
+
+def get_redis():
+    """Return the shared Redis client, or None when no cache is configured."""
+    global _redis
+    if _redis is None and settings.redis_url:
+        if redis_asyncio is None:
+            logger.warning("REDIS_URL is set but the redis package is not installed")
+            return None
+        _redis = redis_asyncio.from_url(settings.redis_url)
+    return _redis
+
+
+async def close_redis() -> None:
+    """Close the shared Redis client, if one was created."""
+    global _redis
+    if _redis is not None:
+        await _redis.aclose()
+        _redis = None
+
+
+class TTLCache:
+    """Bounded in-process LRU cache whose entries expire after `ttl` seconds."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict = OrderedDict()
+
+    def get(self, key: Hashable, default: Optional[Any] = None) -> Any:
+        item = self._data.get(key)
+        if item is None:
+            return default
+        expires_at, value = item
+        if expires_at < time.monotonic():
+            del self._data[key]
+            return default
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class SingleFlight:
+    """Coalesce concurrent calls with the same key into one in-flight task."""
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+
+    async def run(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(fn())
+            self._inflight[key] = future
+            future.add_done_callback(lambda f: self._forget(key, f))
+        # Shielded so one cancelled caller doesn't fail the rest of the herd
+        return await asyncio.shield(future)
+
+    def _forget(self, key: Hashable, future: asyncio.Future) -> None:
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
+
+    def __len__(self) -> int:
+        return len(self._inflight)
@@ -1,7 +1,7 @@
 """Application configuration."""
 
 import os
-from typing import List
+from typing import List, Optional
 
 from pydantic_settings import BaseSettings
 
@@ -40,6 +40,14 @@ class Settings(BaseSettings):
 
     # OpenAI API configuration for LangGraph Agent
     openai_api_key: str = os.getenv("OPENAI_API_KEY")
+    agent_model: str = os.getenv("AGENT_MODEL", "openai:gpt-4.1")
+    router_model: str = os.getenv("ROUTER_MODEL", "gpt-4o-mini")
+
+    # Optional Redis response cache (e.g. redis://localhost:6379/0)
+    redis_url: Optional[str] = os.getenv("REDIS_URL")
+
+    # Prefetch popular Open Food Facts products and searches at startup
+    warm_cache: bool = os.getenv("WARM_CACHE", "true").lower() == "true"
 
     # MCP Server configuration
     mcp_server_command: str = os.getenv("MCP_SERVER_COMMAND", "uv")
@@ -1,11 +1,15 @@
 """Open Food Facts API CRUD operations."""
 
+import asyncio
+import base64
+import binascii
 import logging
 from typing import Dict, Any, List, Optional
 from urllib.parse import quote_plus
 
 import httpx
 
+from src.cache import SingleFlight, TTLCache, get_redis
 from src.models import (
     ProductNutrition,
     OpenFoodFactsProduct,
@@ -17,78 +21,351 @@ from src.models import (
 logger = logging.getLogger(__name__)
 
 
+# Product data changes rarely, so cached lookups live for a day
+PRODUCT_CACHE_TTL = 86400
+
+# Hot barcodes are also kept in process, in front of Redis
+_product_cache = TTLCache(maxsize=2048, ttl=600)
+
+# Search pages go stale faster than products
+SEARCH_CACHE_TTL = 3600
+_search_cache = TTLCache(maxsize=512, ttl=300)
+
+# Background prefetches of the next search page, capped so bursts stay bounded
+PREFETCH_CONCURRENCY = 32
+_prefetch_slots = asyncio.Semaphore(PREFETCH_CONCURRENCY)
+_prefetch_tasks: set = set()
+
+# All Open Food Facts traffic shares one pooled HTTP/2 client
+OFF_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=50)
+OFF_TIMEOUT = httpx.Timeout(10.0, connect=2.0)
+_off_client: Optional[httpx.AsyncClient] = None
+
+# Looked up at startup so the first scans of popular products hit warm cache
+POPULAR_BARCODES = [
+    "3017620422003",  # Nutella
+    "5449000011114",  # Coca-Cola
+    "5449000000996",  # Coca-Cola Classic 330 ml
+    "3274080005003",  # Cristaline water
+    "7622210449283",  # LU Prince
+    "737628064502",  # Thai peanut noodle kit
+]
+WARM_CONCURRENCY = 8
+
+# Upstream fan-out allowed per batch lookup
+BATCH_CONCURRENCY = 16
+
+# Concurrent misses for the same barcode or search share one upstream call
+_inflight = SingleFlight()
+
+# ProductNutrition field -> Open Food Facts nutriment key (per 100 g)
+NUTRIMENT_FIELDS = (
+    ("energy", "energy-kcal_100g"),
+    ("fat", "fat_100g"),
+    ("saturated_fat", "saturated-fat_100g"),
+    ("carbohydrates", "carbohydrates_100g"),
+    ("sugars", "sugars_100g"),
+    ("proteins", "proteins_100g"),
+    ("salt", "salt_100g"),
+    ("fiber", "fiber_100g"),
+)
+
+
+def get_off_client() -> httpx.AsyncClient:
+    """Return the shared Open Food Facts client so lookups reuse its connections."""
+    global _off_client
+    if _off_client is None:
+        _off_client = httpx.AsyncClient(
+            http2=True, limits=OFF_LIMITS, timeout=OFF_TIMEOUT
+        )
+    return _off_client
+
+
+async def close_off_client() -> None:
+    """Close the shared Open Food Facts client, if one was created."""
+    global _off_client
+    if _off_client is not None:
+        await _off_client.aclose()
+        _off_client = None
+
+
+def encode_search_cursor(page: int) -> str:
+    """
+    Encode a search page as an opaque pagination cursor.
+
+    :param page: Page number (1-based) the cursor points to
+    :return: URL-safe cursor string
+    """
+    return base64.urlsafe_b64encode(f"p:{page}".encode()).decode().rstrip("=")
+
+
+def decode_search_cursor(cursor: str) -> int:
+    """
+    Decode a pagination cursor back to its page number.
+
+    :param cursor: Cursor from a previous search result
+    :return: Page number (1-based)
+    :raises ValueError: If the cursor is malformed
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+    except (binascii.Error, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+    prefix, _, page = raw.partition(":")
+    if prefix != "p" or not page.isdigit() or int(page) < 1:
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return int(page)
+
+
 # CRUD Functions
 async def fetch_product_by_barcode(barcode: str) -> Optional[OpenFoodFactsProduct]:
     """
-    Fetch product information from Open Food Facts API by barcode.
+    Fetch product information by barcode, from memory or Redis when cached.
 
     :param barcode: Product barcode
     :return: Product information or None if not found
     """
-    url = f"https://world.openfoodfacts.org/api/v2/product/{barcode}.json"
+    if (product := _product_cache.get(barcode)) is not None:
+        return product
 
-    try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, timeout=10.0)
-            response.raise_for_status()
-            data = response.json()
+    return await _inflight.run(("product", barcode), lambda: _load_product(barcode))
+
+
+async def fetch_products_by_barcodes(
+    barcodes: List[str],
+) -> Dict[str, Optional[OpenFoodFactsProduct]]:
+    """
+    Fetch several products concurrently, with bounded upstream fan-out.
 
-            if data.get("status") != 1 or "product" not in data:
+    :param barcodes: Product barcodes; duplicates are looked up once
+    :return: Product or None per barcode, in request order
+    """
+    unique = list(dict.fromkeys(barcodes))
+    slots = asyncio.Semaphore(BATCH_CONCURRENCY)
+
+    async def fetch(barcode: str) -> Optional[OpenFoodFactsProduct]:
+        async with slots:
+            try:
+                return await fetch_product_by_barcode(barcode)
+            except Exception as e:
+                logger.warning(f"Batch lookup failed for {barcode}: {e}")
                 return None
 
-            product_data = data["product"]
-
-            # Extract nutritional information
-            nutrition = None
-            if "nutriments" in product_data:
-                nutriments = product_data["nutriments"]
-                nutrition = ProductNutrition(
-                    energy=nutriments.get("energy-kcal_100g"),
-                    fat=nutriments.get("fat_100g"),
-                    saturated_fat=nutriments.get("saturated-fat_100g"),
-                    carbohydrates=nutriments.get("carbohydrates_100g"),
-                    sugars=nutriments.get("sugars_100g"),
-                    proteins=nutriments.get("proteins_100g"),
-                    salt=nutriments.get("salt_100g"),
-                    fiber=nutriments.get("fiber_100g"),
-                )
+    products = await asyncio.gather(*(fetch(barcode) for barcode in unique))
+    return dict(zip(unique, products))
 
-            # Create product object
-            product = OpenFoodFactsProduct(
-                id=barcode,
-                barcode=barcode,
-                name=product_data.get("product_name", ""),
-                brands=product_data.get("brands", ""),
-                ingredients=product_data.get("ingredients_text", ""),
-                allergens=product_data.get("allergens", ""),
-                nutri_score=product_data.get("nutriscore_grade", "").upper(),
-                nova_group=product_data.get("nova_group"),
-                eco_score=product_data.get("ecoscore_grade", "").upper(),
-                image_url=product_data.get("image_url", ""),
-                nutrition_facts=nutrition,
-                labels=product_data.get("labels", ""),
-                categories=product_data.get("categories", ""),
-                countries=product_data.get("countries", ""),
-            )
 
-            return product
+async def warm_cache(barcodes: List[str], queries: List[str]) -> None:
+    """
+    Preload popular products and first search pages into the caches.
+
+    :param barcodes: Product barcodes to fetch
+    :param queries: Search queries whose first page to fetch
+    """
+    slots = asyncio.Semaphore(WARM_CONCURRENCY)
+
+    async def warm(lookup, key: str) -> None:
+        async with slots:
+            await lookup(key)
+
+    await asyncio.gather(
+        *(warm(fetch_product_by_barcode, barcode) for barcode in barcodes),
+        *(warm(search_products_by_query, query) for query in queries),
+        return_exceptions=True,
+    )
+    logger.info(
+        "Warmed Open Food Facts cache with %d products and %d searches",
+        len(barcodes),
+        len(queries),
+    )
+
+
+async def _load_product(barcode: str) -> Optional[OpenFoodFactsProduct]:
+    """
+    Load a product from Redis or the Open Food Facts API and cache it.
+
+    :param barcode: Product barcode
+    :return: Product information or None if not found
+    """
+    redis = get_redis()
+    key = f"off:product:{barcode}"
+
+    if redis is not None:
+        try:
+            if cached := await redis.get(key):
+                product = OpenFoodFactsProduct.model_validate_json(cached)
+                _product_cache.set(barcode, product)
+                return product
+        except Exception as e:
+            logger.warning(f"Cache read failed for {key}: {e}")
+
+    product = await _fetch_product_from_api(barcode)
+
+    if product is not None:
+        _product_cache.set(barcode, product)
+        if redis is not None:
+            try:
+                await redis.set(key, product.model_dump_json(), ex=PRODUCT_CACHE_TTL)
+            except Exception as e:
+                logger.warning(f"Cache write failed for {key}: {e}")
+
+    return product
+
+
+def _build_nutrition(nutriments: Dict[str, Any]) -> ProductNutrition:
+    """
+    Map Open Food Facts nutriments to our per-100 g nutrition model.
+
+    :param nutriments: The product's nutriments object
+    :return: Nutritional information
+    """
+    return ProductNutrition(
+        **{field: nutriments.get(key) for field, key in NUTRIMENT_FIELDS}
+    )
+
+
+async def _fetch_product_from_api(barcode: str) -> Optional[OpenFoodFactsProduct]:
+    """
+    Fetch product information from Open Food Facts API by barcode.
+
+    :param barcode: Product barcode
+    :return: Product information or None if not found
+    :raises httpx.HTTPError: If Open Food Facts could not be reached
+    """
+    url = f"https://world.openfoodfacts.org/api/v2/product/{barcode}.json"
+
+    try:
+        response = await get_off_client().get(url)
+        # Open Food Facts answers unknown barcodes with a 404
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        data = response.json()
+
+        if data.get("status") != 1 or "product" not in data:
+            return None
+
+        product_data = data["product"]
+
+        # Extract nutritional information
+        nutrition = None
+        if "nutriments" in product_data:
+            nutrition = _build_nutrition(product_data["nutriments"])
+
+        # Create product object
+        product = OpenFoodFactsProduct(
+            id=barcode,
+            barcode=barcode,
+            name=product_data.get("product_name", ""),
+            brands=product_data.get("brands", ""),
+            ingredients=product_data.get("ingredients_text", ""),
+            allergens=product_data.get("allergens", ""),
+            nutri_score=product_data.get("nutriscore_grade", "").upper(),
+            nova_group=product_data.get("nova_group"),
+            eco_score=product_data.get("ecoscore_grade", "").upper(),
+            image_url=product_data.get("image_url", ""),
+            nutrition_facts=nutrition,
+            labels=product_data.get("labels", ""),
+            categories=product_data.get("categories", ""),
+            countries=product_data.get("countries", ""),
+        )
+
+        return product
 
+    # Failures propagate so they aren't mistaken for (cacheable) missing products
     except httpx.HTTPStatusError as e:
         logger.error(f"HTTP error fetching product {barcode}: {e.response.status_code}")
-        return None
+        raise
     except httpx.RequestError as e:
         logger.error(f"Request error fetching product {barcode}: {e}")
-        return None
+        raise
     except Exception as e:
         logger.error(f"Unexpected error fetching product {barcode}: {e}")
-        return None
+        raise
 
 
 async def search_products_by_query(
     query: str, page: int = 1, page_size: int = 10
 ) -> ProductSearchResult:
     """
-    Search for products in Open Food Facts by name or brand.
+    Search for products in Open Food Facts by name or brand, from cache when possible.
+
+    :param query: Search query
+    :param page: Page number (1-based)
+    :param page_size: Number of results per page
+    :return: Search results
+    """
+    if (result := _search_cache.get((query, page, page_size))) is not None:
+        return result
+
+    return await _inflight.run(
+        ("search", query, page, page_size),
+        lambda: _load_search(query, page, page_size),
+    )
+
+
+def prefetch_next_search_page(result: ProductSearchResult) -> None:
+    """
+    Warm the search cache with the page after `result` in the background.
+
+    :param result: Search page the client just received
+    """
+    # Skip the last page, and skip rather than queue when saturated
+    if result.next_cursor is None or _prefetch_slots.locked():
+        return
+
+    async def prefetch():
+        async with _prefetch_slots:
+            await search_products_by_query(
+                result.query, result.page + 1, result.page_size
+            )
+
+    task = asyncio.create_task(prefetch())
+    _prefetch_tasks.add(task)
+    task.add_done_callback(_prefetch_tasks.discard)
+
+
+async def _load_search(query: str, page: int, page_size: int) -> ProductSearchResult:
+    """
+    Load a search page from Redis or the Open Food Facts API and cache it.
+
+    :param query: Search query
+    :param page: Page number (1-based)
+    :param page_size: Number of results per page
+    :return: Search results
+    """
+    redis = get_redis()
+    key = f"off:search:{page}:{page_size}:{query}"
+
+    if redis is not None:
+        try:
+            if cached := await redis.get(key):
+                result = ProductSearchResult.model_validate_json(cached)
+                _search_cache.set((query, page, page_size), result)
+                return result
+        except Exception as e:
+            logger.warning(f"Cache read failed for {key}: {e}")
+
+    result = await _search_products_from_api(query, page, page_size)
+
+    # Failed searches come back empty, so only real hits are cached
+    if result.products:
+        _search_cache.set((query, page, page_size), result)
+        if redis is not None:
+            try:
+                await redis.set(key, result.model_dump_json(), ex=SEARCH_CACHE_TTL)
+            except Exception as e:
+                logger.warning(f"Cache write failed for {key}: {e}")
+
+    return result
+
+
+async def _search_products_from_api(
+    query: str, page: int = 1, page_size: int = 10
+) -> ProductSearchResult:
+    """
+    Search for products through the Open Food Facts search API.
 
     :param query: Search query
     :param page: Page number (1-based)
@@ -113,55 +390,52 @@ async def search_products_by_query(
     }
 
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, params=params, timeout=15.0)
-            response.raise_for_status()
-            data = response.json()
-
-            products = []
-            if "products" in data:
-                for product_data in data["products"]:
-                    # Extract nutritional information
-                    nutrition = None
-                    if "nutriments" in product_data:
-                        nutriments = product_data["nutriments"]
-                        nutrition = ProductNutrition(
-                            energy=nutriments.get("energy-kcal_100g"),
-                            fat=nutriments.get("fat_100g"),
-                            saturated_fat=nutriments.get("saturated-fat_100g"),
-                            carbohydrates=nutriments.get("carbohydrates_100g"),
-                            sugars=nutriments.get("sugars_100g"),
-                            proteins=nutriments.get("proteins_100g"),
-                            salt=nutriments.get("salt_100g"),
-                            fiber=nutriments.get("fiber_100g"),
-                        )
-
-                    # Create product object
-                    product = OpenFoodFactsProduct(
-                        id=product_data.get("code", ""),
-                        barcode=product_data.get("code", ""),
-                        name=product_data.get("product_name", ""),
-                        brands=product_data.get("brands", ""),
-                        ingredients=product_data.get("ingredients_text", ""),
-                        allergens=product_data.get("allergens", ""),
-                        nutri_score=product_data.get("nutriscore_grade", "").upper(),
-                        nova_group=product_data.get("nova_group"),
-                        eco_score=product_data.get("ecoscore_grade", "").upper(),
-                        image_url=product_data.get("image_url", ""),
-                        nutrition_facts=nutrition,
-                        labels=product_data.get("labels", ""),
-                        categories=product_data.get("categories", ""),
-                        countries=product_data.get("countries", ""),
-                    )
-                    products.append(product)
-
-            return ProductSearchResult(
-                products=products,
-                total_found=len(products),
-                page=page,
-                page_size=page_size,
-                query=query,
-            )
+        response = await get_off_client().get(
+            url, params=params, timeout=httpx.Timeout(15.0, connect=2.0)
+        )
+        response.raise_for_status()
+        data = response.json()
+
+        products = []
+        if "products" in data:
+            for product_data in data["products"]:
+                # Extract nutritional information
+                nutrition = None
+                if "nutriments" in product_data:
+                    nutrition = _build_nutrition(product_data["nutriments"])
+
+                # Create product object
+                product = OpenFoodFactsProduct(
+                    id=product_data.get("code", ""),
+                    barcode=product_data.get("code", ""),
+                    name=product_data.get("product_name", ""),
+                    brands=product_data.get("brands", ""),
+                    ingredients=product_data.get("ingredients_text", ""),
+                    allergens=product_data.get("allergens", ""),
+                    nutri_score=product_data.get("nutriscore_grade", "").upper(),
+                    nova_group=product_data.get("nova_group"),
+                    eco_score=product_data.get("ecoscore_grade", "").upper(),
+                    image_url=product_data.get("image_url", ""),
+                    nutrition_facts=nutrition,
+                    labels=product_data.get("labels", ""),
+                    categories=product_data.get("categories", ""),
+                    countries=product_data.get("countries", ""),
+                )
+                products.append(product)
+
+        # A short page is the last one
+        next_cursor = (
+            encode_search_cursor(page + 1) if len(products) >= page_size else None
+        )
+
+        return ProductSearchResult(
+            products=products,
+            total_found=len(products),
+            page=page,
+            page_size=page_size,
+            query=query,
+            next_cursor=next_cursor,
+        )
 
     except httpx.HTTPStatusError as e:
         logger.error(f"HTTP error searching products: {e.response.status_code}")
@@ -253,7 +527,7 @@ async def find_healthy_alternatives(
                     score_comparison["eco_score"] = f"{orig_eco} → {alt_eco}"
 
             if is_better:
-                alt_dict = alt_product.dict()
+                alt_dict = alt_product.model_dump()
                 alt_dict["improvement_reason"] = score_comparison
                 better_alternatives.append(alt_dict)
 
@@ -298,36 +572,43 @@ async def analyze_product_nutrition(barcode: str) -> Dict[str, Any]:
                 "analysis": None,
             }
 
-        # Create nutritional analysis
-        analysis = {
-            "product": product.dict(),
-            "health_scores": {
-                "nutri_score": {
-                    "grade": product.nutri_score or "unknown",
-                    "meaning": _get_nutri_score_meaning(product.nutri_score),
-                },
-                "nova_group": {
-                    "group": product.nova_group or "unknown",
-                    "meaning": _get_nova_group_meaning(product.nova_group),
-                },
-                "eco_score": {
-                    "grade": product.eco_score or "unknown",
-                    "meaning": _get_eco_score_meaning(product.eco_score),
-                },
-            },
-            "nutrition_facts": product.nutrition_facts.dict()
-            if product.nutrition_facts
-            else None,
-            "recommendations": _generate_product_recommendations(product),
-        }
-
-        return {"analysis": analysis}
+        return {"analysis": compute_nutrition_analysis(product)}
 
     except Exception as e:
         logger.error(f"Error analyzing product nutrition: {e}")
         return {"error": f"Failed to analyze product: {str(e)}", "analysis": None}
 
 
+def compute_nutrition_analysis(product: OpenFoodFactsProduct) -> Dict[str, Any]:
+    """
+    Build the nutritional analysis of an already fetched product.
+
+    :param product: Product to analyze
+    :return: Health scores, nutrition facts and recommendations
+    """
+    return {
+        "product": product.model_dump(),
+        "health_scores": {
+            "nutri_score": {
+                "grade": product.nutri_score or "unknown",
+                "meaning": _get_nutri_score_meaning(product.nutri_score),
+            },
+            "nova_group": {
+                "group": product.nova_group or "unknown",
+                "meaning": _get_nova_group_meaning(product.nova_group),
+            },
+            "eco_score": {
+                "grade": product.eco_score or "unknown",
+                "meaning": _get_eco_score_meaning(product.eco_score),
+            },
+        },
+        "nutrition_facts": product.nutrition_facts.model_dump()
+        if product.nutrition_facts
+        else None,
+        "recommendations": _generate_product_recommendations(product),
+    }
+
+
 def _get_nutri_score_meaning(score: Optional[str]) -> str:
     """Get meaning of Nutri-Score grade."""
     meanings = {
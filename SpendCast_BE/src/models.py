@@ -563,7 +563,10 @@ class ProductSearchRequest(BaseModel):
     query: str = Field(
         ..., min_length=2, description="Search query (product name, brand, category)"
     )
-    page: int = Field(1, ge=1, description="Page number")
+    cursor: Optional[str] = Field(
+        None, description="next_cursor from a previous page; takes precedence over page"
+    )
+    page: int = Field(1, ge=1, description="Page number (use cursor for paging)")
     page_size: int = Field(10, ge=1, le=50, description="Number of results per page")
 
 
@@ -575,6 +578,14 @@ class ProductAnalysisResponse(BaseModel):
     error: Optional[str] = Field(None, description="Error message if failed")
 
 
+class BatchProductRequest(BaseModel):
+    """Batch product lookup request model."""
+
+    barcodes: List[str] = Field(
+        ..., min_length=1, max_length=100, description="Barcodes to look up (max 100)"
+    )
+
+
 class HealthyAlternativesRequest(BaseModel):
     """Healthy alternatives request model."""
 
@@ -591,28 +602,6 @@ class OpenFoodFactsBaseResponse(BaseModel):
     message: Optional[str] = Field(None, description="Response message")
 
 
-class ProductResponse(OpenFoodFactsBaseResponse):
-    """Single product response model."""
-
-    product: Optional[Any] = Field(
-        None, description="Product data"
-    )  # OpenFoodFactsProduct type
-
-
-class SearchResponse(OpenFoodFactsBaseResponse):
-    """Product search response model."""
-
-    data: Any = Field(..., description="Search results")  # ProductSearchResult type
-
-
-class AlternativesResponse(OpenFoodFactsBaseResponse):
-    """Healthy alternatives response model."""
-
-    data: Any = Field(
-        ..., description="Alternative products"
-    )  # HealthyAlternativesResult type
-
-
 # OpenFoodFacts CRUD Models
 class ProductNutrition(BaseModel):
     """Nutritional information for a product."""
@@ -656,6 +645,9 @@ class ProductSearchResult(BaseModel):
     page: int = Field(..., description="Current page number")
     page_size: int = Field(..., description="Number of products per page")
     query: str = Field(..., description="Search query used")
+    next_cursor: Optional[str] = Field(
+        None, description="Cursor for the next page, or None on the last page"
+    )
 
 
 class NutritionAnalysis(BaseModel):
@@ -695,6 +687,33 @@ class HealthyAlternativesResult(BaseModel):
     criteria_used: str = Field(..., description="Criteria used for comparison")
 
 
+# Typed so Pydantic serializes them with compiled schemas instead of inferring Any
+class ProductResponse(OpenFoodFactsBaseResponse):
+    """Single product response model."""
+
+    product: Optional[OpenFoodFactsProduct] = Field(None, description="Product data")
+
+
+class SearchResponse(OpenFoodFactsBaseResponse):
+    """Product search response model."""
+
+    data: ProductSearchResult = Field(..., description="Search results")
+
+
+class AlternativesResponse(OpenFoodFactsBaseResponse):
+    """Healthy alternatives response model."""
+
+    data: HealthyAlternativesResult = Field(..., description="Alternative products")
+
+
+class BatchProductResponse(OpenFoodFactsBaseResponse):
+    """Batch product lookup response model."""
+
+    products: Dict[str, Optional[OpenFoodFactsProduct]] = Field(
+        ..., description="Product per requested barcode, None when not found"
+    )
+
+
 # Transaction API Models (for GraphDB integration)
 class TransactionBasic(BaseModel):
     """Basic transaction information model for API responses."""
@@ -723,6 +742,14 @@ class TransactionDetailsAPI(BaseModel):
     has_receipt: bool = Field(False, description="Has receipt attached")
 
 
+class TransactionBatchRequest(BaseModel):
+    """Bulk transaction details request model."""
+
+    ids: List[str] = Field(
+        ..., min_length=1, max_length=100, description="Transaction IDs to look up"
+    )
+
+
 class ReceiptItemAPI(BaseModel):
     """Receipt line item model for API responses."""
 
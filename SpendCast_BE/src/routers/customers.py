@@ -1,17 +1,34 @@
 """Customer management API router using GraphDB SPARQL queries."""
 
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Path, Query
 from pydantic import BaseModel, Field
-from typing import Dict, Any, List, Optional
+from typing import Annotated, Dict, Any, List, Optional
+import asyncio
 import logging
+import math
 import httpx
 
 from src.config import settings
+from src.sparql import XSD_DATE, ParamQuery, sparql_literal
 
 router = APIRouter(prefix="/api/v1/customers", tags=["customers"])
 
 logger = logging.getLogger(__name__)
 
+# Customer names are bound as SPARQL literals; the charset is still kept narrow
+# (letters incl. umlauts, digits, space, dot, apostrophe, dash).
+CUSTOMER_NAME_PATTERN = r"^[\w .'-]{1,80}$"
+
+CustomerName = Annotated[
+    str,
+    Path(pattern=CUSTOMER_NAME_PATTERN, description="Full name of the customer"),
+]
+
+
+def uri_local_name(uri: str) -> str:
+    """Return the part of a URI after its last '/' or '#' without splitting."""
+    return uri[max(uri.rfind("/"), uri.rfind("#")) + 1 :]
+
 
 class CustomerBasic(BaseModel):
     """Basic customer information model."""
@@ -51,6 +68,138 @@ class CustomerSummary(BaseModel):
     account_count: int
 
 
+# Query templates are constant text; the customer name and year are only ever
+# bound as ?p_ values (see src.sparql)
+CUSTOMER_DETAILS_QUERY = ParamQuery("""
+PREFIX exs: <https://static.rwpz.net/spendcast/schema#>
+
+SELECT ?person ?name ?email ?phone ?birth_date ?citizenship WHERE {
+    #PARAMS
+    BIND(?p_name AS ?name)
+    ?person exs:hasName ?name .
+    ?person a exs:Person .
+    OPTIONAL { ?person exs:hasEmailAddress ?email }
+    OPTIONAL { ?person exs:hasTelephoneNumber ?phone }
+    OPTIONAL { ?person exs:birthDate ?birth_date }
+    OPTIONAL { ?person exs:citizenship ?citizenship }
+}
+""")
+
+# Account rows plus one extra row carrying the balance total computed by GraphDB
+CUSTOMER_ACCOUNTS_QUERY = ParamQuery("""
+PREFIX exs: <https://static.rwpz.net/spendcast/schema#>
+
+SELECT ?account ?account_type ?balance ?currency ?iban ?total_balance WHERE {
+    {
+        #PARAMS
+        ?person exs:hasName ?p_name .
+        ?person exs:hasAccount ?account .
+        ?account a ?account_type .
+        OPTIONAL { ?account exs:hasInitialBalance ?balance }
+        OPTIONAL { ?account exs:hasCurrency ?currency }
+        OPTIONAL { ?account exs:hasInternationalBankAccountIdentifier ?iban }
+        FILTER(?account_type != exs:Account)
+    }
+    UNION
+    {
+        SELECT (SUM(?sum_balance) AS ?total_balance) WHERE {
+            #PARAMS
+            ?sum_person exs:hasName ?p_name .
+            ?sum_person exs:hasAccount ?sum_account .
+            ?sum_account a ?sum_account_type .
+            ?sum_account exs:hasInitialBalance ?sum_balance .
+            FILTER(?sum_account_type != exs:Account)
+        }
+    }
+}
+ORDER BY ?account_type
+""")
+
+CUSTOMER_TRANSACTIONS_QUERY = ParamQuery("""
+PREFIX exs: <https://static.rwpz.net/spendcast/schema#>
+PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+
+SELECT ?transaction ?amount ?date ?status ?merchant_name WHERE {
+    #PARAMS
+    ?person exs:hasName ?p_name .
+    ?person exs:hasAccount ?account .
+
+    ?transaction a exs:FinancialTransaction .
+    ?transaction exs:hasParticipant ?payerRole .
+    ?payerRole a exs:Payer .
+    ?payerRole exs:isPlayedBy ?account .
+
+    ?transaction exs:hasMonetaryAmount ?amount_uri .
+    ?amount_uri exs:hasAmount ?amount .
+    ?transaction exs:hasTransactionDate ?date .
+    OPTIONAL { ?transaction exs:status ?status }
+
+    OPTIONAL {
+        ?transaction exs:hasParticipant ?payeeRole .
+        ?payeeRole a exs:Payee .
+        ?payeeRole exs:isPlayedBy ?merchant .
+        ?merchant rdfs:label ?merchant_name .
+    }
+}
+ORDER BY DESC(?date)
+""")
+
+CUSTOMER_SPENDING_ANALYSIS_QUERY = ParamQuery("""
+PREFIX exs: <https://static.rwpz.net/spendcast/schema#>
+PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+
+SELECT ?category_label (SUM(?amount) AS ?total_spent) (COUNT(?transaction) AS ?transaction_count) WHERE {
+    #PARAMS
+    ?person exs:hasName ?p_name .
+    ?person exs:hasAccount ?account .
+
+    ?transaction a exs:FinancialTransaction .
+    ?transaction exs:hasParticipant ?payerRole .
+    ?payerRole a exs:Payer .
+    ?payerRole exs:isPlayedBy ?account .
+
+    ?transaction exs:hasReceipt ?receipt .
+    ?receipt exs:hasLineItem ?line_item .
+    ?line_item exs:hasProduct ?product .
+    ?product exs:category ?category .
+    ?category rdfs:label ?category_label .
+
+    ?transaction exs:hasMonetaryAmount ?amount_uri .
+    ?amount_uri exs:hasAmount ?amount .
+
+    ?transaction exs:hasTransactionDate ?date .
+    FILTER(?date >= ?p_start && ?date <= ?p_end)
+}
+GROUP BY ?category_label
+ORDER BY DESC(?total_spent)
+LIMIT 20
+""")
+
+CUSTOMER_MONTHLY_SPENDING_QUERY = ParamQuery("""
+PREFIX exs: <https://static.rwpz.net/spendcast/schema#>
+
+SELECT ?month (SUM(?amount) AS ?total_spent) (COUNT(?transaction) AS ?transaction_count) WHERE {
+    #PARAMS
+    ?person exs:hasName ?p_name .
+    ?person exs:hasAccount ?account .
+
+    ?transaction a exs:FinancialTransaction .
+    ?transaction exs:hasParticipant ?payerRole .
+    ?payerRole a exs:Payer .
+    ?payerRole exs:isPlayedBy ?account .
+
+    ?transaction exs:hasMonetaryAmount ?amount_uri .
+    ?amount_uri exs:hasAmount ?amount .
+    ?transaction exs:hasTransactionDate ?date .
+
+    FILTER(?date >= ?p_start && ?date <= ?p_end)
+    BIND(CONCAT(STR(YEAR(?date)), "-", IF(MONTH(?date) < 10, "0", ""), STR(MONTH(?date))) AS ?month)
+}
+GROUP BY ?month
+ORDER BY ?month
+""")
+
+
 async def execute_sparql_query(query: str) -> Dict[str, Any]:
     """Execute SPARQL query against GraphDB."""
     try:
@@ -92,7 +241,6 @@ async def list_customers(limit: int = Query(10, ge=1, le=100)):
     """Get list of all customers."""
     query = f"""
     PREFIX exs: <https://static.rwpz.net/spendcast/schema#>
-    PREFIX ex: <https://static.rwpz.net/spendcast/>
     
     SELECT ?name ?email ?phone WHERE {{
         ?person a exs:Person .
@@ -119,25 +267,16 @@ async def list_customers(limit: int = Query(10, ge=1, le=100)):
 
 
 @router.get("/{customer_name}", response_model=CustomerSummary)
-async def get_customer_details(customer_name: str):
+async def get_customer_details(customer_name: CustomerName):
     """Get detailed information about a specific customer."""
-    # First get customer basic info
-    customer_query = f"""
-    PREFIX exs: <https://static.rwpz.net/spendcast/schema#>
-    PREFIX ex: <https://static.rwpz.net/spendcast/>
-    
-    SELECT ?person ?name ?email ?phone ?birth_date ?citizenship WHERE {{
-        ?person a exs:Person .
-        ?person exs:hasName "{customer_name}" .
-        ?person exs:hasName ?name .
-        OPTIONAL {{ ?person exs:hasEmailAddress ?email }}
-        OPTIONAL {{ ?person exs:hasTelephoneNumber ?phone }}
-        OPTIONAL {{ ?person exs:birthDate ?birth_date }}
-        OPTIONAL {{ ?person exs:citizenship ?citizenship }}
-    }}
-    """
+    name = sparql_literal(customer_name)
+    customer_query = CUSTOMER_DETAILS_QUERY.bind(name=name)
+    accounts_query = CUSTOMER_ACCOUNTS_QUERY.bind(name=name)
 
-    customer_result = await execute_sparql_query(customer_query)
+    # Both queries only depend on the name, so run them concurrently
+    customer_result, accounts_result = await asyncio.gather(
+        execute_sparql_query(customer_query), execute_sparql_query(accounts_query)
+    )
     customer_bindings = customer_result.get("results", {}).get("bindings", [])
 
     if not customer_bindings:
@@ -145,43 +284,30 @@ async def get_customer_details(customer_name: str):
 
     customer_data = customer_bindings[0]
 
-    # Get customer accounts
-    accounts_query = f"""
-    PREFIX exs: <https://static.rwpz.net/spendcast/schema#>
-    PREFIX ex: <https://static.rwpz.net/spendcast/>
-    
-    SELECT ?account ?account_type ?balance ?currency ?iban WHERE {{
-        ?person exs:hasName "{customer_name}" .
-        ?person exs:hasAccount ?account .
-        ?account a ?account_type .
-        OPTIONAL {{ ?account exs:hasInitialBalance ?balance }}
-        OPTIONAL {{ ?account exs:hasCurrency ?currency }}
-        OPTIONAL {{ ?account exs:hasInternationalBankAccountIdentifier ?iban }}
-        FILTER(?account_type != exs:Account)
-    }}
-    ORDER BY ?account_type
-    """
-
-    accounts_result = await execute_sparql_query(accounts_query)
     accounts = []
-    total_balance = 0.0
+    total_balance = None
 
     for binding in accounts_result.get("results", {}).get("bindings", []):
-        balance = float(binding.get("balance", {}).get("value", 0))
-        total_balance += balance
+        if "total_balance" in binding:
+            total_balance = float(binding["total_balance"]["value"])
+            continue
 
         account = CustomerAccount(
-            account_id=binding["account"]["value"].split("/")[-1],
-            account_type=binding["account_type"]["value"].split("#")[-1],
-            balance=balance,
-            currency=binding.get("currency", {}).get("value", "CHF").split("/")[-1],
+            account_id=uri_local_name(binding["account"]["value"]),
+            account_type=uri_local_name(binding["account_type"]["value"]),
+            balance=float(binding.get("balance", {}).get("value", 0)),
+            currency=uri_local_name(binding.get("currency", {}).get("value", "CHF")),
             iban=binding.get("iban", {}).get("value"),
         )
         accounts.append(account)
 
+    if total_balance is None:
+        # fsum keeps currency totals free of accumulated rounding error
+        total_balance = math.fsum(account.balance for account in accounts)
+
     # Build customer details
     customer = CustomerDetails(
-        id=customer_data["person"]["value"].split("/")[-1],
+        id=uri_local_name(customer_data["person"]["value"]),
         name=customer_data["name"]["value"],
         email=customer_data.get("email", {}).get("value"),
         phone=customer_data.get("phone", {}).get("value"),
@@ -199,48 +325,20 @@ async def get_customer_details(customer_name: str):
 
 @router.get("/{customer_name}/transactions")
 async def get_customer_transactions(
-    customer_name: str,
+    customer_name: CustomerName,
     limit: int = Query(20, ge=1, le=100),
     offset: int = Query(0, ge=0),
 ):
     """Get recent transactions for a customer."""
-    query = f"""
-    PREFIX exs: <https://static.rwpz.net/spendcast/schema#>
-    PREFIX ex: <https://static.rwpz.net/spendcast/>
-    PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
-    
-    SELECT ?transaction ?amount ?date ?status ?merchant_name WHERE {{
-        ?person exs:hasName "{customer_name}" .
-        ?person exs:hasAccount ?account .
-        
-        ?transaction a exs:FinancialTransaction .
-        ?transaction exs:hasParticipant ?payerRole .
-        ?payerRole a exs:Payer .
-        ?payerRole exs:isPlayedBy ?account .
-        
-        ?transaction exs:hasMonetaryAmount ?amount_uri .
-        ?amount_uri exs:hasAmount ?amount .
-        ?transaction exs:hasTransactionDate ?date .
-        OPTIONAL {{ ?transaction exs:status ?status }}
-        
-        OPTIONAL {{
-            ?transaction exs:hasParticipant ?payeeRole .
-            ?payeeRole a exs:Payee .
-            ?payeeRole exs:isPlayedBy ?merchant .
-            ?merchant rdfs:label ?merchant_name .
-        }}
-    }}
-    ORDER BY DESC(?date)
-    LIMIT {limit}
-    OFFSET {offset}
-    """
+    query = CUSTOMER_TRANSACTIONS_QUERY.bind(name=sparql_literal(customer_name))
+    query += f"LIMIT {limit}\nOFFSET {offset}\n"
 
     result = await execute_sparql_query(query)
     transactions = []
 
     for binding in result.get("results", {}).get("bindings", []):
         transaction = {
-            "transaction_id": binding["transaction"]["value"].split("/")[-1],
+            "transaction_id": uri_local_name(binding["transaction"]["value"]),
             "amount": float(binding["amount"]["value"]),
             "date": binding["date"]["value"],
             "status": binding.get("status", {}).get("value", "unknown"),
@@ -259,54 +357,26 @@ async def get_customer_transactions(
 
 @router.get("/{customer_name}/spending-analysis")
 async def get_customer_spending_analysis(
-    customer_name: str, year: int = Query(2025, ge=2020, le=2030)
+    customer_name: CustomerName,
+    year: int = Query(2025, ge=2020, le=2030),
 ):
     """Get spending analysis by category for a customer."""
-    query = f"""
-    PREFIX exs: <https://static.rwpz.net/spendcast/schema#>
-    PREFIX ex: <https://static.rwpz.net/spendcast/>
-    PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
-    
-    SELECT ?category_label (SUM(?amount) AS ?total_spent) (COUNT(?transaction) AS ?transaction_count) WHERE {{
-        ?person exs:hasName "{customer_name}" .
-        ?person exs:hasAccount ?account .
-        
-        ?transaction a exs:FinancialTransaction .
-        ?transaction exs:hasParticipant ?payerRole .
-        ?payerRole a exs:Payer .
-        ?payerRole exs:isPlayedBy ?account .
-        
-        ?transaction exs:hasReceipt ?receipt .
-        ?receipt exs:hasLineItem ?line_item .
-        ?line_item exs:hasProduct ?product .
-        ?product exs:category ?category .
-        ?category rdfs:label ?category_label .
-        
-        ?transaction exs:hasMonetaryAmount ?amount_uri .
-        ?amount_uri exs:hasAmount ?amount .
-        
-        ?transaction exs:hasTransactionDate ?date .
-        FILTER(?date >= "{year}-01-01"^^xsd:date && ?date <= "{year}-12-31"^^xsd:date)
-    }}
-    GROUP BY ?category_label
-    ORDER BY DESC(?total_spent)
-    LIMIT 20
-    """
+    query = CUSTOMER_SPENDING_ANALYSIS_QUERY.bind(
+        name=sparql_literal(customer_name),
+        start=sparql_literal(f"{year}-01-01", XSD_DATE),
+        end=sparql_literal(f"{year}-12-31", XSD_DATE),
+    )
 
     result = await execute_sparql_query(query)
-    categories = []
-    total_amount = 0.0
-
-    for binding in result.get("results", {}).get("bindings", []):
-        amount = float(binding["total_spent"]["value"])
-        total_amount += amount
-
-        category = {
+    categories = [
+        {
             "category": binding["category_label"]["value"],
-            "total_spent": amount,
+            "total_spent": float(binding["total_spent"]["value"]),
             "transaction_count": int(binding["transaction_count"]["value"]),
         }
-        categories.append(category)
+        for binding in result.get("results", {}).get("bindings", [])
+    ]
+    total_amount = math.fsum(category["total_spent"] for category in categories)
 
     return {
         "customer_name": customer_name,
@@ -319,51 +389,32 @@ async def get_customer_spending_analysis(
 
 @router.get("/{customer_name}/monthly-spending")
 async def get_customer_monthly_spending(
-    customer_name: str, year: int = Query(2025, ge=2020, le=2030)
+    customer_name: CustomerName,
+    year: int = Query(2025, ge=2020, le=2030),
 ):
     """Get monthly spending breakdown for a customer."""
-    query = f"""
-    PREFIX exs: <https://static.rwpz.net/spendcast/schema#>
-    PREFIX ex: <https://static.rwpz.net/spendcast/>
-    
-    SELECT ?month (SUM(?amount) AS ?total_spent) (COUNT(?transaction) AS ?transaction_count) WHERE {{
-        ?person exs:hasName "{customer_name}" .
-        ?person exs:hasAccount ?account .
-        
-        ?transaction a exs:FinancialTransaction .
-        ?transaction exs:hasParticipant ?payerRole .
-        ?payerRole a exs:Payer .
-        ?payerRole exs:isPlayedBy ?account .
-        
-        ?transaction exs:hasMonetaryAmount ?amount_uri .
-        ?amount_uri exs:hasAmount ?amount .
-        ?transaction exs:hasTransactionDate ?date .
-        
-        FILTER(?date >= "{year}-01-01"^^xsd:date && ?date <= "{year}-12-31"^^xsd:date)
-        BIND(CONCAT(STR(YEAR(?date)), "-", IF(MONTH(?date) < 10, "0", ""), STR(MONTH(?date))) AS ?month)
-    }}
-    GROUP BY ?month
-    ORDER BY ?month
-    """
+    query = CUSTOMER_MONTHLY_SPENDING_QUERY.bind(
+        name=sparql_literal(customer_name),
+        start=sparql_literal(f"{year}-01-01", XSD_DATE),
+        end=sparql_literal(f"{year}-12-31", XSD_DATE),
+    )
 
     result = await execute_sparql_query(query)
-    monthly_data = []
-    total_year_spending = 0.0
-
-    for binding in result.get("results", {}).get("bindings", []):
-        amount = float(binding["total_spent"]["value"])
-        total_year_spending += amount
+    bindings = result.get("results", {}).get("bindings", [])
 
-        # Safely get month value, skip if not present
-        if "month" not in binding:
-            continue
-
-        month_data = {
+    # Rows without a month still count towards the yearly total
+    total_year_spending = math.fsum(
+        float(binding["total_spent"]["value"]) for binding in bindings
+    )
+    monthly_data = [
+        {
             "month": binding["month"]["value"],
-            "total_spent": amount,
+            "total_spent": float(binding["total_spent"]["value"]),
             "transaction_count": int(binding["transaction_count"]["value"]),
         }
-        monthly_data.append(month_data)
+        for binding in bindings
+        if "month" in binding
+    ]
 
     return {
         "customer_name": customer_name,
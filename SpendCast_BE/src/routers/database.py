@@ -3,6 +3,7 @@
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 from typing import Dict, Any, List
+from datetime import datetime, timezone
 import logging
 
 from src.crud.database import check_database_connection, check_graphdb_connection
@@ -12,6 +13,11 @@ router = APIRouter(prefix="/api/v1", tags=["database"])
 logger = logging.getLogger(__name__)
 
 
+def utc_timestamp() -> str:
+    """Current UTC time as an ISO 8601 string with a trailing 'Z'."""
+    return datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+
+
 class DatabaseStatus(BaseModel):
     """Database connection status model."""
 
@@ -69,12 +75,10 @@ async def check_database_connections():
         all_connected = all(db.status == "connected" for db in databases)
         overall_status = "healthy" if all_connected else "degraded"
 
-        from datetime import datetime
-
-        timestamp = datetime.utcnow().isoformat() + "Z"
-
         return DatabaseCheckResponse(
-            overall_status=overall_status, databases=databases, timestamp=timestamp
+            overall_status=overall_status,
+            databases=databases,
+            timestamp=utc_timestamp(),
         )
 
     except Exception as e:
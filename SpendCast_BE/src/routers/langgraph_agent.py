@@ -1,20 +1,27 @@
 """LangGraph Agent router."""
 
+import asyncio
 import base64
-import json
 import logging
 import os
-from typing import AsyncGenerator, Optional
+import re
+import time
+import uuid
+from collections import deque
+from typing import Any, AsyncGenerator, Dict, List, Literal, Optional, Tuple
 
+import anyio
 import openai
-from fastapi import APIRouter, HTTPException
+import orjson
+from fastapi import APIRouter, File, Form, Header, HTTPException, UploadFile
 from fastapi.responses import StreamingResponse
-from langchain_core.messages import HumanMessage, SystemMessage
+from fastapi.sse import EventSourceResponse, ServerSentEvent
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
 from langchain_mcp_adapters.tools import load_mcp_tools
 from langgraph.prebuilt import create_react_agent
 from mcp import ClientSession
 from mcp.client.stdio import stdio_client, StdioServerParameters
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from io import BytesIO
 
 from ..config import settings
@@ -22,13 +29,103 @@ from ..config import settings
 # Set up logging
 logger = logging.getLogger(__name__)
 
+# Environment for the MCP server, snapshotted once. The persistent session
+# reuses these parameters on reconnect, so per-call env changes never apply.
+_SERVER_ENV = os.environ.copy()
+
 # Define MCP server parameters
 server_params = StdioServerParameters(
     command=settings.mcp_server_command,
     args=settings.mcp_server_args,
-    env=os.environ.copy(),
+    env=_SERVER_ENV,
 )
 
+AGENT_MODEL = settings.agent_model
+
+
+class MCPSessionManager:
+    """Keeps one MCP stdio session and its tools alive across requests.
+
+    The stdio client and session are entered in a dedicated background task,
+    because anyio requires them to be exited by the same task that entered
+    them. Requests only ever await the loaded tools and the agents compiled
+    from them.
+    """
+
+    def __init__(self, params: StdioServerParameters):
+        self._params = params
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._closing: Optional[asyncio.Event] = None
+        self.tools: Optional[List] = None
+        self._agents: Dict[str, Any] = {}
+
+    async def get_tools(self) -> List:
+        """Return the MCP tools, starting the server on first use."""
+        if self.tools is None:
+            async with self._lock:
+                if self.tools is None:
+                    await self._connect()
+        return self.tools
+
+    async def get_agent(self, name: str):
+        """Return the named agent from AGENT_PROMPTS, compiled once per session."""
+        tools = await self.get_tools()
+        agent = self._agents.get(name)
+        if agent is None:
+            agent = create_react_agent(AGENT_MODEL, tools, prompt=AGENT_PROMPTS[name])
+            self._agents[name] = agent
+        return agent
+
+    async def close(self) -> None:
+        """Shut the session down; the next request reconnects."""
+        if self._task is None:
+            return
+        self._closing.set()
+        try:
+            await self._task
+        except Exception as e:
+            logger.warning(f"Error while closing MCP session: {e}")
+        self._task = None
+        self._reset()
+
+    def _reset(self) -> None:
+        self.tools = None
+        self._agents.clear()
+
+    async def _connect(self) -> None:
+        ready = asyncio.get_running_loop().create_future()
+        self._closing = asyncio.Event()
+        self._task = asyncio.create_task(self._run(ready, self._closing))
+        self.tools = await ready
+
+    async def _run(self, ready: asyncio.Future, closing: asyncio.Event) -> None:
+        try:
+            async with stdio_client(self._params) as (read, write):
+                async with ClientSession(read, write) as session:
+                    await session.initialize()
+                    ready.set_result(await load_mcp_tools(session))
+                    await closing.wait()
+        except Exception as e:
+            if not ready.done():
+                ready.set_exception(e)
+            else:
+                logger.error(f"MCP session terminated: {e}")
+        finally:
+            # If the server died on its own, let the next request respawn it
+            if self._task is asyncio.current_task():
+                self._reset()
+
+
+mcp_session = MCPSessionManager(server_params)
+
+
+async def _handle_agent_error(e: Exception) -> None:
+    """Drop the shared MCP session if the error means its pipes are gone."""
+    if isinstance(e, (anyio.ClosedResourceError, anyio.BrokenResourceError)):
+        await mcp_session.close()
+
+
 router = APIRouter(
     prefix="/api/v1/agent",
     tags=["LangGraph Agent"],
@@ -38,7 +135,10 @@ router = APIRouter(
 
 class ChatRequest(BaseModel):
     message: str
-    include_audio: bool = False
+    include_audio: bool = Field(
+        False,
+        description="Deprecated: message is base64 audio. Use /chat/audio instead.",
+    )
     response_as_audio: bool = False
 
 
@@ -46,7 +146,10 @@ class ChatResponse(BaseModel):
     response: str
     success: bool
     error: Optional[str] = None
-    audio_content: Optional[str] = None
+    audio_content: Optional[str] = Field(
+        None,
+        description="Deprecated: base64 MP3. /chat/audio streams audio/mpeg instead.",
+    )
 
 
 class PodcastResponse(BaseModel):
@@ -211,42 +314,133 @@ ORDER BY ?lineItem
 ```
 """
 
+# Built once and always sent first, byte-identical, so OpenAI's prompt cache can
+# reuse the long SPARQL examples across turns
+PREPROMPT_MSG = SystemMessage(content=preprompt)
+
+# Every agent graph this router serves. Chat and podcast share one graph; the
+# token stream runs without the preprompt.
+AGENT_PROMPTS: Dict[str, Optional[SystemMessage]] = {
+    "chat": PREPROMPT_MSG,
+    "stream": None,
+}
+
+
+# Cheap model that decides whether a chat turn needs the SPARQL agent at all
+ROUTER_MODEL = settings.router_model
+ROUTER_TIMEOUT = 5.0
+
+ROUTER_PROMPT = """Classify the user's message to a PostFinance banking assistant.
+Answer "agent" if answering needs the client's own data: accounts, balances,
+cards, transactions, receipts, purchased products, spending or savings.
+Answer "direct" for everything else, such as greetings, thanks, small talk or
+general questions. Reply with exactly one word: agent or direct."""
+
+DIRECT_PROMPT = """You are a useful chat agent for PostFinance private clients.
+You are currently talking to Jeanine Marie Blumenthal.
+You are cheerful and warm, and give SHORT and concise answers.
+Sometimes you make some jokes."""
+
+
+async def route_turn(message: str) -> Literal["direct", "agent"]:
+    """Decide whether a chat turn needs the data-querying agent."""
+    try:
+        client = get_openai_client().with_options(
+            timeout=ROUTER_TIMEOUT, max_retries=0
+        )
+        completion = await client.chat.completions.create(
+            model=ROUTER_MODEL,
+            messages=[
+                {"role": "system", "content": ROUTER_PROMPT},
+                {"role": "user", "content": message},
+            ],
+            max_tokens=2,
+            temperature=0,
+        )
+        answer = completion.choices[0].message.content or ""
+    except Exception as e:
+        logger.warning(f"Turn routing failed, using the agent: {e}")
+        return "agent"
+    return "direct" if answer.strip().lower().startswith("direct") else "agent"
+
+
+async def answer_directly(message: str) -> str:
+    """Answer a turn that needs no client data with a single completion."""
+    completion = await get_openai_client().chat.completions.create(
+        model=ROUTER_MODEL,
+        messages=[
+            {"role": "system", "content": DIRECT_PROMPT},
+            {"role": "user", "content": message},
+        ],
+    )
+    return completion.choices[0].message.content or ""
+
+
+def final_content(agent_response: Any) -> str:
+    """Extract just the final message content for cleaner response."""
+    if isinstance(agent_response, dict) and (
+        messages := agent_response.get("messages")
+    ):
+        final_message = messages[-1]
+        if isinstance(final_message, BaseMessage):
+            return final_message.content
+    return str(agent_response)
+
 
 async def call_agent(message: str) -> str:
     """Call the agent with a message"""
+    if await route_turn(message) == "direct":
+        try:
+            return await answer_directly(message)
+        except Exception as e:
+            logger.warning(f"Direct answer failed, using the agent: {e}")
+
     try:
-        # Create a fresh session for each request to avoid ClosedResourceError
-        async with stdio_client(server_params) as (read, write):
-            async with ClientSession(read, write) as session:
-                # Initialize the connection
-                await session.initialize()
-                # Get tools
-                tools = await load_mcp_tools(session)
-                # Create and run the agent
-                agent = create_react_agent("openai:gpt-4.1", tools, prompt=preprompt)
-
-                # IMPORTANT: Keep the session alive during agent execution
-                agent_response = await agent.ainvoke(
-                    {"messages": [HumanMessage(content=message)]}
-                )
+        agent = await mcp_session.get_agent("chat")
 
-                # Extract just the final message content for cleaner response
-                if messages := agent_response.get("messages"):
-                    final_message = messages[-1]
-                    if hasattr(final_message, "content"):
-                        return final_message.content
+        agent_response = await agent.ainvoke(
+            {"messages": [HumanMessage(content=message)]}
+        )
 
-                return str(agent_response)
+        return final_content(agent_response)
 
     except Exception as e:
         logger.error(f"Error calling agent: {e}")
+        await _handle_agent_error(e)
         raise HTTPException(status_code=500, detail=f"Agent error: {str(e)}")
 
 
+_openai_client: Optional[openai.AsyncOpenAI] = None
+
+# Bytes per chunk when streaming synthesized speech to the client
+AUDIO_CHUNK_SIZE = 4096
+
+# Long texts are synthesized as concurrent TTS segments of at most this size
+TTS_SEGMENT_CHARS = 600
+TTS_CONCURRENCY = 8
+_SENTENCE_BREAK = re.compile(r"(?<=[.!?])\s+|\n{2,}")
+
+
+def get_openai_client() -> openai.AsyncOpenAI:
+    """Return the shared OpenAI client so audio calls reuse its connection pool."""
+    global _openai_client
+    if _openai_client is None:
+        _openai_client = openai.AsyncOpenAI()
+    return _openai_client
+
+
+async def close_openai_client() -> None:
+    """Close the shared OpenAI client, if one was created."""
+    global _openai_client
+    if _openai_client is not None:
+        await _openai_client.close()
+        _openai_client = None
+
+
 async def generate_audio(text: str) -> bytes:
     """Generate audio from text using OpenAI's TTS model."""
     try:
-        client = openai.AsyncOpenAI()
+        client = get_openai_client()
         response = await client.audio.speech.create(
             model="tts-1", voice="alloy", input=text
         )
@@ -256,14 +450,14 @@ async def generate_audio(text: str) -> bytes:
         raise HTTPException(status_code=500, detail=f"Audio generation error: {str(e)}")
 
 
-async def transcribe_audio(audio_base64: str) -> str:
-    """Given an MP3 encoded in base64, transcribe the text."""
+async def transcribe_audio_bytes(
+    audio_bytes: bytes, filename: str = "user_voice.webm"
+) -> str:
+    """Transcribe a raw audio recording."""
     try:
-        client = openai.AsyncOpenAI()
-        # the input from the user is an audio recording
-        audio_bytes = base64.b64decode(audio_base64)
+        client = get_openai_client()
         audio_file = BytesIO(audio_bytes)
-        audio_file.name = "user_voice.webm"  # openai needs a name to infer the format
+        audio_file.name = filename  # openai needs a name to infer the format
         transcription = await client.audio.transcriptions.create(
             model="gpt-4o-mini-transcribe", file=audio_file, response_format="text"
         )
@@ -275,6 +469,103 @@ async def transcribe_audio(audio_base64: str) -> str:
         )
 
 
+def _b64encode_str(data: bytes) -> str:
+    return base64.b64encode(data).decode("utf-8")
+
+
+async def encode_audio_base64(audio_bytes: bytes) -> str:
+    """Base64-encode audio in a worker thread; podcasts run to several MB."""
+    return await asyncio.to_thread(_b64encode_str, audio_bytes)
+
+
+async def transcribe_audio(audio_base64: str) -> str:
+    """Given an MP3 encoded in base64, transcribe the text."""
+    try:
+        audio_bytes = await asyncio.to_thread(base64.b64decode, audio_base64)
+    except ValueError as e:
+        logger.error(f"Error decoding audio: {e}")
+        raise HTTPException(
+            status_code=500, detail=f"Audio transcription error: {str(e)}"
+        )
+    return await transcribe_audio_bytes(audio_bytes)
+
+
+def split_tts_segments(text: str, max_chars: int = TTS_SEGMENT_CHARS) -> List[str]:
+    """Pack whole sentences into segments of at most max_chars characters."""
+    segments: List[str] = []
+    current = ""
+    for sentence in _SENTENCE_BREAK.split(text):
+        sentence = sentence.strip()
+        if not sentence:
+            continue
+        if current and len(current) + 1 + len(sentence) > max_chars:
+            segments.append(current)
+            current = sentence
+        else:
+            current = f"{current} {sentence}" if current else sentence
+    if current:
+        segments.append(current)
+    return segments
+
+
+async def generate_segmented_audio(text: str) -> bytes:
+    """Synthesize long text segment by segment in parallel and join the MP3s."""
+    semaphore = asyncio.Semaphore(TTS_CONCURRENCY)
+
+    async def synthesize(segment: str) -> bytes:
+        async with semaphore:
+            return await generate_audio(segment)
+
+    # tts-1 MP3 output is frame-aligned, so the segments concatenate cleanly
+    audios = await asyncio.gather(
+        *(synthesize(segment) for segment in split_tts_segments(text))
+    )
+    return b"".join(audios)
+
+
+async def stream_audio(text: str) -> AsyncGenerator[bytes, None]:
+    """Yield MP3 chunks from OpenAI's TTS model as they are synthesized."""
+    client = get_openai_client()
+    async with client.audio.speech.with_streaming_response.create(
+        model="tts-1", voice="alloy", input=text, response_format="mp3"
+    ) as response:
+        async for chunk in response.iter_bytes(AUDIO_CHUNK_SIZE):
+            yield chunk
+
+
+async def audio_stream_response(
+    audio: AsyncGenerator[bytes, None],
+) -> StreamingResponse:
+    """Return MP3 chunks as a progressive audio/mpeg response."""
+    # Wait for the first chunk so failures still surface as a 500
+    try:
+        first_chunk = await anext(audio, b"")
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error generating audio: {e}")
+        raise HTTPException(status_code=500, detail=f"Audio generation error: {str(e)}")
+
+    async def body() -> AsyncGenerator[bytes, None]:
+        yield first_chunk
+        async for chunk in audio:
+            yield chunk
+
+    # MP3 doesn't compress; an explicit encoding keeps GZipMiddleware off the stream
+    return StreamingResponse(
+        body(), media_type="audio/mpeg", headers={"Content-Encoding": "identity"}
+    )
+
+
+async def _warm_up_agent() -> None:
+    """Start the MCP session and compile the chat agent ahead of call_agent."""
+    try:
+        await mcp_session.get_agent("chat")
+    except Exception as e:
+        # call_agent retries and reports the failure to the client
+        logger.warning(f"Agent warm-up failed: {e}")
+
+
 @router.get("/health")
 async def agent_health_check():
     """Health check for LangGraph agent."""
@@ -290,7 +581,10 @@ async def chat_with_agent(request: ChatRequest):
         logger.info(f"Received message: {request.message}")
 
         if request.include_audio:
-            request.message = await transcribe_audio(request.message)
+            # Bring the MCP session and agent graph up while speech-to-text runs
+            request.message, _ = await asyncio.gather(
+                transcribe_audio(request.message), _warm_up_agent()
+            )
 
         # Call the agent
         agent_response = await call_agent(request.message)
@@ -300,7 +594,7 @@ async def chat_with_agent(request: ChatRequest):
         if request.response_as_audio:
             logger.info("Generating audio for the response.")
             audio_bytes = await generate_audio(agent_response)
-            audio_content = base64.b64encode(audio_bytes).decode("utf-8")
+            audio_content = await encode_audio_base64(audio_bytes)
             logger.info("Audio generated successfully.")
 
         logger.info("Agent responded successfully")
@@ -316,9 +610,7 @@ async def chat_with_agent(request: ChatRequest):
         return ChatResponse(response="", success=False, error=str(e))
 
 
-@router.get("/podcast", response_model=PodcastResponse)
-async def generate_podcast():
-    podcast_prompt = """You are tasked to generate a podcast for the user about their finances
+PODCAST_PROMPT = """You are tasked to generate a podcast for the user about their finances
     during the current year (2025). The podcast should last between 3 and 5 minutes when reading
     it outloud. You should cover the following topics (not required to cover them in order):
         - The current balances of all of the accounts.
@@ -333,74 +625,308 @@ async def generate_podcast():
 
     If you make a query to the database and it fails, just try again without telling the user. If it fails again, just skip that part of the podcast. Do not mention any failures to the end user!
     """
+
+
+async def generate_podcast_text() -> str:
+    """Let the agent write the podcast script from the user's finances."""
     try:
-        async with stdio_client(server_params) as (read, write):
-            async with ClientSession(read, write) as session:
-                await session.initialize()
-                # Get tools
-                tools = await load_mcp_tools(session)
-                # Create and run the agent
-                agent = create_react_agent("openai:gpt-4.1", tools, prompt=preprompt)
-
-                # IMPORTANT: Keep the session alive during agent execution
-                agent_response = await agent.ainvoke(
-                    {"messages": [SystemMessage(content=podcast_prompt)]}
-                )
+        agent = await mcp_session.get_agent("chat")
 
-                # Extract just the final message content for cleaner response
-                if messages := agent_response.get("messages"):
-                    final_message = messages[-1]
-                    if hasattr(final_message, "content"):
-                        podcast_text = final_message.content
+        agent_response = await agent.ainvoke(
+            {"messages": [SystemMessage(content=PODCAST_PROMPT)]}
+        )
 
-                audio_bytes = await generate_audio(podcast_text)
-                audio_base64 = base64.b64encode(audio_bytes).decode("utf-8")
-                return PodcastResponse(response=audio_base64, success=True)
+        return final_content(agent_response)
     except Exception as e:
         logger.error(f"Error calling agent: {e}")
+        await _handle_agent_error(e)
         raise HTTPException(status_code=500, detail=f"Agent error: {str(e)}")
 
 
-async def stream_agent_response(message: str) -> AsyncGenerator[str, None]:
-    """Stream agent response as it's generated"""
+@router.post("/chat/audio-stream")
+async def chat_with_agent_audio_stream(request: ChatRequest):
+    """
+    Chat with the LangGraph agent and stream the spoken answer as MP3
+    """
+    logger.info(f"Received audio stream message: {request.message}")
+
+    if request.include_audio:
+        request.message, _ = await asyncio.gather(
+            transcribe_audio(request.message), _warm_up_agent()
+        )
+
+    agent_response = await call_agent(request.message)
+    return await audio_stream_response(stream_audio(agent_response))
+
+
+@router.post("/chat/audio")
+async def chat_with_agent_audio(
+    audio: UploadFile = File(..., description="Recorded question, e.g. webm"),
+    response_as_audio: bool = Form(False),
+):
+    """
+    Chat with the LangGraph agent using an uploaded recording
+
+    Answers with ChatResponse JSON, or with an audio/mpeg stream when
+    response_as_audio is set.
+    """
+    logger.info(f"Received audio upload: {audio.filename}")
+    audio_bytes = await audio.read()
+
+    message, _ = await asyncio.gather(
+        transcribe_audio_bytes(audio_bytes, audio.filename or "user_voice.webm"),
+        _warm_up_agent(),
+    )
+    agent_response = await call_agent(message)
+
+    if response_as_audio:
+        return await audio_stream_response(stream_audio(agent_response))
+    return ChatResponse(response=agent_response, success=True)
+
+
+@router.get("/podcast", response_model=PodcastResponse)
+async def generate_podcast():
+    podcast_text = await generate_podcast_text()
+    audio_bytes = await generate_segmented_audio(podcast_text)
+    audio_base64 = await encode_audio_base64(audio_bytes)
+    return PodcastResponse(response=audio_base64, success=True)
+
+
+async def stream_podcast_paragraphs() -> AsyncGenerator[str, None]:
+    """Yield the podcast script paragraph by paragraph as the agent writes it."""
     try:
-        async with stdio_client(server_params) as (read, write):
-            async with ClientSession(read, write) as session:
-                await session.initialize()
-                tools = await load_mcp_tools(session)
-                agent = create_react_agent("openai:gpt-4.1", tools)
-
-                # Use astream instead of ainvoke for streaming
-                async for token, metadata in agent.astream(
-                    {"messages": [HumanMessage(content=message)]},
-                    stream_mode="messages",
+        agent = await mcp_session.get_agent("chat")
+        text = ""
+        # Finished paragraphs that may still turn out to be a tool-call preamble
+        pending: List[str] = []
+        calls_tools = False
+        async for event in agent.astream_events(
+            {"messages": [SystemMessage(content=PODCAST_PROMPT)]},
+            version="v2",
+            include_types=["chat_model"],
+        ):
+            if event["event"] == "on_chat_model_start":
+                text = ""
+                pending = []
+                calls_tools = False
+            elif event["event"] == "on_chat_model_stream":
+                chunk = event["data"]["chunk"]
+                calls_tools = calls_tools or bool(chunk.tool_call_chunks)
+                text += chunk.content or ""
+                while "\n\n" in text:
+                    paragraph, text = text.split("\n\n", 1)
+                    if paragraph.strip():
+                        pending.append(paragraph.strip())
+                # Tool calls stream after the text, so a paragraph is only script
+                # once the turn keeps writing prose after it
+                if text.strip() and not calls_tools:
+                    for paragraph in pending:
+                        yield paragraph
+                    pending = []
+            elif event["event"] == "on_chat_model_end":
+                # Text from a turn that calls tools is not script
+                if not calls_tools and not getattr(
+                    event["data"]["output"], "tool_calls", None
                 ):
-                    if metadata.get("langgraph_node") == "agent":
-                        if hasattr(token, "content") and token.content:
-                            # Format as Server-Sent Events
-                            yield f"data: {json.dumps({'content': token.content, 'type': 'message'})}\n\n"
+                    for paragraph in pending:
+                        yield paragraph
+                    if text.strip():
+                        yield text.strip()
+                text = ""
+                pending = []
+    except Exception as e:
+        logger.error(f"Error calling agent: {e}")
+        await _handle_agent_error(e)
+        raise HTTPException(status_code=500, detail=f"Agent error: {str(e)}")
+
+
+async def stream_podcast_audio() -> AsyncGenerator[bytes, None]:
+    """Synthesize each podcast paragraph as soon as it is written, in order."""
+    semaphore = asyncio.Semaphore(TTS_CONCURRENCY)
+    queue: asyncio.Queue = asyncio.Queue()
+
+    async def synthesize(segment: str) -> bytes:
+        async with semaphore:
+            return await generate_audio(segment)
+
+    async def produce() -> None:
+        try:
+            async for paragraph in stream_podcast_paragraphs():
+                for segment in split_tts_segments(paragraph):
+                    await queue.put(asyncio.create_task(synthesize(segment)))
+        finally:
+            await queue.put(None)
+
+    producer = asyncio.create_task(produce())
+    try:
+        while (task := await queue.get()) is not None:
+            yield await task
+        # Surface agent errors that ended the script early
+        await producer
+    finally:
+        producer.cancel()
+        while not queue.empty():
+            if task := queue.get_nowait():
+                task.cancel()
+
+
+@router.get("/podcast/stream")
+async def stream_podcast():
+    """Stream the podcast as MP3, speaking each paragraph as soon as it is written."""
+    return await audio_stream_response(stream_podcast_audio())
+
+
+def sse_event(payload: Dict[str, Any]) -> ServerSentEvent:
+    """Build an SSE event whose JSON data is already encoded with orjson."""
+    return ServerSentEvent(raw_data=orjson.dumps(payload).decode())
+
+
+# Constant stream frames, encoded once at import
+END_EVENT = sse_event({"type": "end"})
+OVERFLOW_EVENT = sse_event({"type": "overflow"})
+
+
+async def stream_agent_response(
+    message: str,
+) -> AsyncGenerator[ServerSentEvent, None]:
+    """Stream agent response as it's generated"""
+    try:
+        agent = await mcp_session.get_agent("stream")
+
+        # Only the agent node calls the chat model, so subscribing to chat model
+        # events replaces filtering every token by node
+        async for event in agent.astream_events(
+            {"messages": [HumanMessage(content=message)]},
+            version="v2",
+            include_types=["chat_model"],
+        ):
+            if event["event"] == "on_chat_model_stream":
+                if content := event["data"]["chunk"].content:
+                    yield sse_event({"content": content, "type": "message"})
 
         # Signal end of stream
-        yield f"data: {json.dumps({'type': 'end'})}\n\n"
+        yield END_EVENT
 
     except Exception as e:
         logger.error(f"Error in streaming agent: {e}")
-        yield f"data: {json.dumps({'error': str(e), 'type': 'error'})}\n\n"
+        await _handle_agent_error(e)
+        yield sse_event({"error": str(e), "type": "error"})
 
 
-@router.post("/chat/stream")
-async def stream_chat_with_agent(request: ChatRequest):
+# Replay buffers for /chat/stream, keyed by channel id
+EVENT_BUFFER_SIZE = 256
+EVENT_BUFFER_TTL = 300.0
+
+
+class _EventBuffer:
+    """Ring buffer of the events of one streamed agent turn.
+
+    The turn runs in its own task and writes here, so a client that drops
+    mid-stream can reconnect with Last-Event-ID and pick up where it left off
+    instead of re-running the agent.
     """
-    Stream chat with the LangGraph agent using Server-Sent Events
+
+    def __init__(self, channel: str, maxlen: int = EVENT_BUFFER_SIZE):
+        self.channel = channel
+        self.events: deque = deque(maxlen=maxlen)
+        self.next_seq = 0
+        self.done = False
+        self.updated = time.monotonic()
+        self.task: Optional[asyncio.Task] = None
+        self._changed = asyncio.Condition()
+
+    async def append(self, event: ServerSentEvent) -> None:
+        seq = self.next_seq
+        self.next_seq += 1
+        self.events.append(
+            (seq, event.model_copy(update={"id": f"{self.channel}:{seq}"}))
+        )
+        await self._notify()
+
+    async def finish(self) -> None:
+        self.done = True
+        await self._notify()
+
+    async def follow(self, after: int = -1) -> AsyncGenerator[ServerSentEvent, None]:
+        """Yield buffered events with a sequence above `after`, then live ones.
+
+        The ring buffer is what bounds memory for a slow client: the turn never
+        waits for it, and a client that falls more than EVENT_BUFFER_SIZE events
+        behind gets an overflow event instead of a stream with a silent gap.
+        """
+        while True:
+            if self.events and self.events[0][0] > after + 1:
+                logger.warning(f"Stream {self.channel} overflowed a slow client")
+                yield OVERFLOW_EVENT
+                return
+            for seq, event in list(self.events):
+                if seq > after:
+                    after = seq
+                    yield event
+            if self.done and after >= self.next_seq - 1:
+                return
+            async with self._changed:
+                await self._changed.wait_for(
+                    lambda: self.done or self.next_seq - 1 > after
+                )
+
+    async def _notify(self) -> None:
+        self.updated = time.monotonic()
+        async with self._changed:
+            self._changed.notify_all()
+
+
+_event_buffers: Dict[str, _EventBuffer] = {}
+
+
+def _sweep_event_buffers() -> None:
+    """Forget finished turns nobody has resumed within the TTL."""
+    cutoff = time.monotonic() - EVENT_BUFFER_TTL
+    for channel, buffer in list(_event_buffers.items()):
+        if buffer.done and buffer.updated < cutoff:
+            del _event_buffers[channel]
+
+
+def _resume_point(last_event_id: Optional[str]) -> Optional[Tuple[_EventBuffer, int]]:
+    """Resolve a Last-Event-ID of the form "<channel>:<seq>" to its buffer."""
+    if not last_event_id:
+        return None
+    channel, _, seq = last_event_id.rpartition(":")
+    buffer = _event_buffers.get(channel)
+    if buffer is None or not seq.isdigit():
+        return None
+    return buffer, int(seq)
+
+
+async def _run_agent_turn(buffer: _EventBuffer, message: str) -> None:
+    try:
+        async for event in stream_agent_response(message):
+            await buffer.append(event)
+    finally:
+        await buffer.finish()
+
+
+@router.post("/chat/stream", response_class=EventSourceResponse)
+async def stream_chat_with_agent(
+    request: ChatRequest,
+    last_event_id: Optional[str] = Header(default=None),
+) -> AsyncGenerator[ServerSentEvent, None]:
     """
-    logger.info(f"Received streaming message: {request.message}")
+    Stream chat with the LangGraph agent using Server-Sent Events.
 
-    return StreamingResponse(
-        stream_agent_response(request.message),
-        media_type="text/plain",
-        headers={
-            "Cache-Control": "no-cache",
-            "Connection": "keep-alive",
-            "Content-Type": "text/plain; charset=utf-8",
-        },
-    )
+    Send the last received event id back as Last-Event-ID to resume a dropped
+    stream from the buffer instead of starting a new agent turn.
+    """
+    if resume := _resume_point(last_event_id):
+        buffer, after = resume
+        logger.info(f"Resuming stream {buffer.channel} after event {after}")
+    else:
+        logger.info(f"Received streaming message: {request.message}")
+        _sweep_event_buffers()
+        buffer = _EventBuffer(uuid.uuid4().hex)
+        _event_buffers[buffer.channel] = buffer
+        buffer.task = asyncio.create_task(_run_agent_turn(buffer, request.message))
+        after = -1
+
+    async for event in buffer.follow(after):
+        yield event
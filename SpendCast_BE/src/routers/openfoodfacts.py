@@ -1,14 +1,21 @@
 """Open Food Facts API router."""
 
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, Header, HTTPException, Query, Response
 from typing import Dict, Any, List, Optional
+import hashlib
 import logging
+import re
+
+import orjson
 
 from src.crud.openfoodfacts import (
     fetch_product_by_barcode,
+    fetch_products_by_barcodes,
     search_products_by_query,
+    prefetch_next_search_page,
+    decode_search_cursor,
     find_healthy_alternatives,
-    analyze_product_nutrition,
+    compute_nutrition_analysis,
     OpenFoodFactsProduct,
     ProductSearchResult,
     HealthyAlternativesResult,
@@ -21,31 +28,165 @@ from src.models import (
     ProductResponse,
     SearchResponse,
     AlternativesResponse,
+    BatchProductRequest,
+    BatchProductResponse,
 )
 
 router = APIRouter(prefix="/api/v1/openfoodfacts", tags=["Open Food Facts"])
 
 logger = logging.getLogger(__name__)
 
-
-# Endpoints
-@router.get("/health")
-async def health_check():
-    """Health check for Open Food Facts API integration."""
-    return {
+# EAN-8 through GTIN-14; anything else is rejected before hitting upstream
+_BARCODE_RE = re.compile(r"^\d{8,14}$")
+
+
+# Static endpoint bodies, serialized once at import
+POPULAR_CATEGORIES = [
+    "beverages",
+    "snacks",
+    "dairy",
+    "bread",
+    "chocolate",
+    "cereals",
+    "fruits",
+    "vegetables",
+    "meat",
+    "fish",
+    "frozen-foods",
+    "condiments",
+    "desserts",
+    "pasta",
+    "rice",
+    "oils",
+    "cheese",
+    "yogurt",
+    "cookies",
+    "ice-cream",
+]
+
+POPULAR_BRANDS = [
+    "Nestle",
+    "Ferrero",
+    "Coca-Cola",
+    "Pepsi",
+    "Danone",
+    "Unilever",
+    "Kellogg's",
+    "Mars",
+    "Mondelez",
+    "Kraft",
+    "General Mills",
+    "L'Oreal",
+    "Barilla",
+    "Heinz",
+    "Campbell",
+    "Migros",
+    "Coop",
+    "Denner",
+]
+
+_HEALTH_JSON = orjson.dumps(
+    {
         "status": "healthy",
         "service": "Open Food Facts API Integration",
         "endpoints": [
             "/search - Search products",
             "/product/{barcode} - Get product by barcode",
+            "/products:batch - Get up to 100 products by barcode",
             "/analyze/{barcode} - Analyze product nutrition",
             "/alternatives/{barcode} - Find healthy alternatives",
         ],
     }
+)
 
+_CATEGORIES_JSON = orjson.dumps(
+    {
+        "success": True,
+        "categories": POPULAR_CATEGORIES,
+        "total": len(POPULAR_CATEGORIES),
+        "usage": "Use these categories as search terms in the /search endpoint",
+    }
+)
 
-@router.post("/search", response_model=SearchResponse)
-async def search_products(request: ProductSearchRequest):
+_BRANDS_JSON = orjson.dumps(
+    {
+        "success": True,
+        "brands": POPULAR_BRANDS,
+        "total": len(POPULAR_BRANDS),
+        "usage": "Use these brands as search terms in the /search endpoint",
+    }
+)
+
+_STATS_JSON = orjson.dumps(
+    {
+        "success": True,
+        "stats": {
+            "service": "Open Food Facts API Integration",
+            "version": "1.0.0",
+            "database": "Open Food Facts",
+            "api_base_url": "https://world.openfoodfacts.org/api/v2/",
+            "search_endpoint": "https://world.openfoodfacts.org/cgi/search.pl",
+            "features": [
+                "Product search by name/brand/category",
+                "Detailed product information by barcode",
+                "Nutritional analysis and health scores",
+                "Healthy alternatives recommendations",
+                "Multi-language support",
+                "Real-time data from Open Food Facts database",
+            ],
+            "supported_scores": {
+                "nutri_score": "Nutritional quality rating (A-E)",
+                "nova_group": "Food processing level (1-4)",
+                "eco_score": "Environmental impact rating (A-E)",
+            },
+            "data_coverage": "Over 2.8 million products worldwide",
+            "update_frequency": "Real-time updates from contributors",
+        },
+    }
+)
+
+
+# The suggestion lists only change on deploy, so browsers and CDNs may keep them
+STATIC_CACHE_CONTROL = "public, max-age=86400, immutable"
+
+# Unknown barcodes stay unknown for a while, so edges can absorb bogus floods
+NOT_FOUND_CACHE_CONTROL = "public, max-age=300"
+
+
+def _etag(body: bytes) -> str:
+    """Strong ETag for a precomputed response body."""
+    return f'"{hashlib.md5(body, usedforsecurity=False).hexdigest()}"'
+
+
+_CATEGORIES_ETAG = _etag(_CATEGORIES_JSON)
+_BRANDS_ETAG = _etag(_BRANDS_JSON)
+_STATS_ETAG = _etag(_STATS_JSON)
+
+
+def _static_json(body: bytes, etag: str, if_none_match: Optional[str]) -> Response:
+    """Serve a precomputed body with cache headers, or 304 if the client has it."""
+    headers = {"Cache-Control": STATIC_CACHE_CONTROL, "ETag": etag}
+    if if_none_match:
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        if etag in tags or "*" in tags:
+            return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+# Endpoints
+@router.get("/health")
+async def health_check():
+    """Health check for Open Food Facts API integration."""
+    return Response(content=_HEALTH_JSON, media_type="application/json")
+
+
+@router.get("/search", response_model=SearchResponse)
+async def search_products_get(
+    query: str = Query(..., min_length=2, description="Search query"),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    page: int = Query(1, ge=1, description="Page number"),
+    page_size: int = Query(10, ge=1, le=50, description="Results per page"),
+):
     """
     Search for food products by name, brand, or keywords.
 
@@ -56,38 +197,53 @@ async def search_products(request: ProductSearchRequest):
     - Search by product name: "nutella"
     - Search by brand: "ferrero"
     - Search by category: "chocolate"
+
+    Pass the returned `next_cursor` as `cursor` to fetch the following page.
     """
     try:
-        logger.info(f"Searching products with query: {request.query}")
+        logger.info("Searching products with query: %s", query)
+
+        if cursor:
+            try:
+                page = decode_search_cursor(cursor)
+            except ValueError:
+                raise HTTPException(status_code=400, detail="Invalid cursor")
 
         result = await search_products_by_query(
-            query=request.query, page=request.page, page_size=request.page_size
+            query=query, page=page, page_size=page_size
         )
+        prefetch_next_search_page(result)
 
-        message = f"Found {result.total_found} products matching '{request.query}'"
+        message = f"Found {result.total_found} products matching '{query}'"
 
-        return SearchResponse(success=True, message=message, data=result)
+        # Trusted crud output, so skip re-validating the product list
+        return SearchResponse.model_construct(
+            success=True, message=message, data=result
+        )
 
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Error searching products: {e}")
+        logger.error("Error searching products: %s", e, exc_info=True)
         raise HTTPException(
             status_code=500, detail=f"Failed to search products: {str(e)}"
         )
 
 
-@router.get("/search", response_model=SearchResponse)
-async def search_products_get(
-    query: str = Query(..., min_length=2, description="Search query"),
-    page: int = Query(1, ge=1, description="Page number"),
-    page_size: int = Query(10, ge=1, le=50, description="Results per page"),
-):
+@router.post("/search", response_model=SearchResponse, deprecated=True)
+async def search_products(request: ProductSearchRequest):
     """
-    Search for food products by name, brand, or keywords (GET method).
+    Search for food products by name, brand, or keywords (POST method).
 
-    Same as POST /search but using query parameters for easier testing.
+    Deprecated: same as GET /search, which skips parsing a JSON body and is
+    cacheable.
     """
-    request = ProductSearchRequest(query=query, page=page, page_size=page_size)
-    return await search_products(request)
+    return await search_products_get(
+        query=request.query,
+        cursor=request.cursor,
+        page=request.page,
+        page_size=request.page_size,
+    )
 
 
 @router.get("/product/{barcode}", response_model=ProductResponse)
@@ -103,29 +259,29 @@ async def get_product_by_barcode(barcode: str):
     - Product images and categories
 
     **Parameters:**
-    - barcode: Product barcode (EAN, UPC, etc.) - usually 8-13 digits
+    - barcode: Product barcode (EAN, UPC, etc.) - 8 to 14 digits
 
     **Example barcodes:**
     - 5449000011114 (Coca-Cola)
     - 3017620422003 (Nutella)
     """
     try:
-        logger.info(f"Fetching product with barcode: {barcode}")
-
-        if not barcode or not barcode.strip():
-            raise HTTPException(status_code=400, detail="Barcode is required")
+        logger.info("Fetching product with barcode: %s", barcode)
 
         clean_barcode = barcode.strip()
+        if not _BARCODE_RE.match(clean_barcode):
+            raise HTTPException(status_code=400, detail="Invalid barcode format")
+
         product = await fetch_product_by_barcode(clean_barcode)
 
         if not product:
-            return ProductResponse(
-                success=False,
-                message=f"Product with barcode {clean_barcode} not found in Open Food Facts database",
-                product=None,
+            raise HTTPException(
+                status_code=404,
+                detail=f"Product {clean_barcode} not found",
+                headers={"Cache-Control": NOT_FOUND_CACHE_CONTROL},
             )
 
-        return ProductResponse(
+        return ProductResponse.model_construct(
             success=True,
             message=f"Successfully retrieved product: {product.name}",
             product=product,
@@ -134,12 +290,54 @@ async def get_product_by_barcode(barcode: str):
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error fetching product by barcode {barcode}: {e}")
+        logger.error(
+            "Error fetching product by barcode %s: %s", barcode, e, exc_info=True
+        )
         raise HTTPException(
             status_code=500, detail=f"Failed to fetch product: {str(e)}"
         )
 
 
+@router.post("/products:batch", response_model=BatchProductResponse)
+async def get_products_batch(request: BatchProductRequest):
+    """
+    Get several products by barcode in one request.
+
+    Looks up to 100 barcodes concurrently, e.g. a whole scanned shopping cart.
+    Barcodes that are not in Open Food Facts map to null.
+
+    **Request body:**
+    - barcodes: List of product barcodes (8-14 digits each)
+    """
+    try:
+        logger.info("Fetching batch of %d products", len(request.barcodes))
+
+        barcodes = [barcode.strip() for barcode in request.barcodes]
+        invalid = [barcode for barcode in barcodes if not _BARCODE_RE.match(barcode)]
+        if invalid:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Invalid barcode format: {', '.join(invalid)}",
+            )
+
+        products = await fetch_products_by_barcodes(barcodes)
+        found = sum(product is not None for product in products.values())
+
+        return BatchProductResponse.model_construct(
+            success=True,
+            message=f"Found {found} of {len(products)} products",
+            products=products,
+        )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Error fetching product batch: %s", e, exc_info=True)
+        raise HTTPException(
+            status_code=500, detail=f"Failed to fetch products: {str(e)}"
+        )
+
+
 @router.get("/analyze/{barcode}", response_model=ProductAnalysisResponse)
 async def analyze_product(barcode: str):
     """
@@ -156,31 +354,42 @@ async def analyze_product(barcode: str):
     - barcode: Product barcode to analyze
     """
     try:
-        logger.info(f"Analyzing product with barcode: {barcode}")
+        logger.info("Analyzing product with barcode: %s", barcode)
 
-        if not barcode or not barcode.strip():
-            raise HTTPException(status_code=400, detail="Barcode is required")
+        clean_barcode = barcode.strip()
+        if not _BARCODE_RE.match(clean_barcode):
+            raise HTTPException(status_code=400, detail="Invalid barcode format")
 
-        result = await analyze_product_nutrition(barcode.strip())
+        # Analysis is pure, so a product cached by /product costs no upstream call
+        product = await fetch_product_by_barcode(clean_barcode)
 
-        if "error" in result:
+        if not product:
             return ProductAnalysisResponse(
-                success=False, error=result["error"], analysis=None
+                success=False,
+                error=f"Product with barcode {clean_barcode} not found",
+                analysis=None,
             )
 
-        return ProductAnalysisResponse(success=True, analysis=result["analysis"])
+        return ProductAnalysisResponse(
+            success=True, analysis=compute_nutrition_analysis(product)
+        )
 
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error analyzing product {barcode}: {e}")
+        logger.error("Error analyzing product %s: %s", barcode, e, exc_info=True)
         raise HTTPException(
             status_code=500, detail=f"Failed to analyze product: {str(e)}"
         )
 
 
-@router.post("/alternatives", response_model=AlternativesResponse)
-async def find_alternatives(request: HealthyAlternativesRequest):
+@router.get("/alternatives/{barcode}", response_model=AlternativesResponse)
+async def find_alternatives_get(
+    barcode: str,
+    criteria: str = Query(
+        "nutri_score", description="Criteria for healthier alternatives"
+    ),
+):
     """
     Find healthier alternatives to a given product.
 
@@ -189,176 +398,77 @@ async def find_alternatives(request: HealthyAlternativesRequest):
     - NOVA Group classifications (less processed)
     - Eco-Score ratings (more environmentally friendly)
 
-    **Request body:**
+    **Parameters:**
     - barcode: Product barcode to find alternatives for
     - criteria: "nutri_score", "nova_group", "eco_score", or "all"
     """
     try:
         logger.info(
-            f"Finding alternatives for barcode: {request.barcode} with criteria: {request.criteria}"
+            "Finding alternatives for barcode: %s with criteria: %s", barcode, criteria
         )
 
-        result = await find_healthy_alternatives(
-            barcode=request.barcode, criteria=request.criteria
-        )
+        result = await find_healthy_alternatives(barcode=barcode, criteria=criteria)
 
         if not result.original_product:
             return AlternativesResponse(
                 success=False,
-                message=f"Original product with barcode {request.barcode} not found",
+                message=f"Original product with barcode {barcode} not found",
                 data=result,
             )
 
         message = f"Found {result.total_alternatives_found} healthier alternatives to {result.original_product.name}"
 
-        return AlternativesResponse(success=True, message=message, data=result)
+        return AlternativesResponse.model_construct(
+            success=True, message=message, data=result
+        )
 
     except Exception as e:
-        logger.error(f"Error finding alternatives: {e}")
+        logger.error("Error finding alternatives: %s", e, exc_info=True)
         raise HTTPException(
             status_code=500, detail=f"Failed to find alternatives: {str(e)}"
         )
 
 
-@router.get("/alternatives/{barcode}", response_model=AlternativesResponse)
-async def find_alternatives_get(
-    barcode: str,
-    criteria: str = Query(
-        "nutri_score", description="Criteria for healthier alternatives"
-    ),
-):
+@router.post("/alternatives", response_model=AlternativesResponse, deprecated=True)
+async def find_alternatives(request: HealthyAlternativesRequest):
     """
-    Find healthier alternatives to a given product (GET method).
+    Find healthier alternatives to a given product (POST method).
 
-    Same as POST /alternatives but using path and query parameters.
+    Deprecated: same as GET /alternatives/{barcode}, which skips parsing a JSON
+    body and is cacheable.
     """
-    request = HealthyAlternativesRequest(barcode=barcode, criteria=criteria)
-    return await find_alternatives(request)
+    return await find_alternatives_get(
+        barcode=request.barcode, criteria=request.criteria
+    )
 
 
 @router.get("/categories")
-async def get_popular_categories():
+async def get_popular_categories(if_none_match: Optional[str] = Header(None)):
     """
     Get list of popular food categories for search suggestions.
 
     Returns commonly searched categories that can be used
     as search terms or filters.
     """
-    try:
-        popular_categories = [
-            "beverages",
-            "snacks",
-            "dairy",
-            "bread",
-            "chocolate",
-            "cereals",
-            "fruits",
-            "vegetables",
-            "meat",
-            "fish",
-            "frozen-foods",
-            "condiments",
-            "desserts",
-            "pasta",
-            "rice",
-            "oils",
-            "cheese",
-            "yogurt",
-            "cookies",
-            "ice-cream",
-        ]
-
-        return {
-            "success": True,
-            "categories": popular_categories,
-            "total": len(popular_categories),
-            "usage": "Use these categories as search terms in the /search endpoint",
-        }
-
-    except Exception as e:
-        logger.error(f"Error getting categories: {e}")
-        raise HTTPException(
-            status_code=500, detail=f"Failed to get categories: {str(e)}"
-        )
+    return _static_json(_CATEGORIES_JSON, _CATEGORIES_ETAG, if_none_match)
 
 
 @router.get("/brands")
-async def get_popular_brands():
+async def get_popular_brands(if_none_match: Optional[str] = Header(None)):
     """
     Get list of popular food brands for search suggestions.
 
     Returns commonly searched brands that can be used
     as search terms.
     """
-    try:
-        popular_brands = [
-            "Nestle",
-            "Ferrero",
-            "Coca-Cola",
-            "Pepsi",
-            "Danone",
-            "Unilever",
-            "Kellogg's",
-            "Mars",
-            "Mondelez",
-            "Kraft",
-            "General Mills",
-            "L'Oreal",
-            "Barilla",
-            "Heinz",
-            "Campbell",
-            "Migros",
-            "Coop",
-            "Denner",
-        ]
-
-        return {
-            "success": True,
-            "brands": popular_brands,
-            "total": len(popular_brands),
-            "usage": "Use these brands as search terms in the /search endpoint",
-        }
-
-    except Exception as e:
-        logger.error(f"Error getting brands: {e}")
-        raise HTTPException(status_code=500, detail=f"Failed to get brands: {str(e)}")
+    return _static_json(_BRANDS_JSON, _BRANDS_ETAG, if_none_match)
 
 
 @router.get("/stats")
-async def get_api_stats():
+async def get_api_stats(if_none_match: Optional[str] = Header(None)):
     """
     Get statistics and information about the Open Food Facts integration.
 
     Provides metadata about the service and usage statistics.
     """
-    try:
-        stats = {
-            "service": "Open Food Facts API Integration",
-            "version": "1.0.0",
-            "database": "Open Food Facts",
-            "api_base_url": "https://world.openfoodfacts.org/api/v2/",
-            "search_endpoint": "https://world.openfoodfacts.org/cgi/search.pl",
-            "features": [
-                "Product search by name/brand/category",
-                "Detailed product information by barcode",
-                "Nutritional analysis and health scores",
-                "Healthy alternatives recommendations",
-                "Multi-language support",
-                "Real-time data from Open Food Facts database",
-            ],
-            "supported_scores": {
-                "nutri_score": "Nutritional quality rating (A-E)",
-                "nova_group": "Food processing level (1-4)",
-                "eco_score": "Environmental impact rating (A-E)",
-            },
-            "data_coverage": "Over 2.8 million products worldwide",
-            "update_frequency": "Real-time updates from contributors",
-        }
-
-        return {"success": True, "stats": stats}
-
-    except Exception as e:
-        logger.error(f"Error getting API stats: {e}")
-        raise HTTPException(
-            status_code=500, detail=f"Failed to get API stats: {str(e)}"
-        )
+    return _static_json(_STATS_JSON, _STATS_ETAG, if_none_match)
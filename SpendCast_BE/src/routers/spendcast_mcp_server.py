@@ -1,17 +1,26 @@
 import asyncio
-import json
+import atexit
+import functools
+import heapq
 import logging
 import os
+import queue
+import re
+import time
 
-from typing import Any, Dict, List, Optional
-from urllib.parse import quote_plus
-from datetime import datetime
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from operator import itemgetter
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import quote_plus, urlencode
 
 
 import httpx
+import orjson
 from dotenv import load_dotenv
 from fastmcp import Context, FastMCP
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 
 # Configure logging
 logging.basicConfig(
@@ -45,6 +54,9 @@ class ProductNutrition(BaseModel):
 class OpenFoodFactsProduct(BaseModel):
     """Product information from Open Food Facts."""
 
+    # Products are shared through the lookup cache, so they must not change
+    model_config = ConfigDict(frozen=True)
+
     id: str
     barcode: str
     name: str
@@ -60,9 +72,15 @@ class OpenFoodFactsProduct(BaseModel):
     categories: Optional[str] = None
     countries: Optional[str] = None
 
+    @functools.cached_property
+    def as_dict(self) -> Dict[str, Any]:
+        """The product as a plain dict, dumped once per instance. Don't mutate it."""
+        return self.model_dump()
+
 
+@functools.lru_cache(maxsize=1)
 def get_config() -> GraphDBConfig:
-    """Loads configuration from environment variables."""
+    """Loads configuration from environment variables, once per process."""
     graphdb_url = os.getenv(
         "GRAPHDB_URL", "http://localhost:7200/repositories/spendcast"
     )
@@ -78,29 +96,129 @@ def get_config() -> GraphDBConfig:
     )
 
 
+@functools.lru_cache(maxsize=1)
+def get_graphdb_auth() -> httpx.BasicAuth:
+    """Build the GraphDB credentials once from the cached config."""
+    config = get_config()
+    return httpx.BasicAuth(config.username, config.password)
+
+
+# Shared by GraphDB and Open Food Facts calls so connections and TLS sessions persist
+_http_client: Optional[httpx.AsyncClient] = None
+
+# Tight connect timeouts fail fast on dead hosts without cutting slow reads short
+GRAPHDB_TIMEOUT = httpx.Timeout(30.0, connect=2.0, write=5.0)
+OFF_TIMEOUT = httpx.Timeout(10.0, connect=3.0)
+OFF_SEARCH_TIMEOUT = httpx.Timeout(15.0, connect=3.0)
+
+# Open Food Facts asks API clients to identify themselves; brotli isn't installed,
+# so only advertise encodings httpx can decode
+HTTP_HEADERS = {"Accept-Encoding": "gzip", "User-Agent": "SpendCast-MCP/1.0"}
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Return the shared HTTP client, creating it on first use."""
+    global _http_client
+    if _http_client is None:
+        # The transport retries failed connection attempts once
+        transport = httpx.AsyncHTTPTransport(
+            http2=True,
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+            retries=1,
+        )
+        _http_client = httpx.AsyncClient(
+            transport=transport, headers=HTTP_HEADERS, timeout=GRAPHDB_TIMEOUT
+        )
+    return _http_client
+
+
+async def close_http_client() -> None:
+    """Close the shared HTTP client, if one was created."""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
+@asynccontextmanager
+async def lifespan(server: FastMCP):
+    """Release the shared HTTP client when the server shuts down."""
+    try:
+        yield
+    finally:
+        await close_http_client()
+
+
+@functools.lru_cache(maxsize=1)
+def get_sparql_trace() -> Optional[logging.Logger]:
+    """
+    Return the opt-in SPARQL trace logger, or None unless SPARQL_TRACE=1.
+
+    File writes happen on a QueueListener thread, so tracing never blocks the loop.
+    """
+    if os.getenv("SPARQL_TRACE") != "1":
+        return None
+
+    handler = RotatingFileHandler(
+        os.getenv("SPARQL_TRACE_FILE", "/tmp/debug.txt"),
+        maxBytes=10 * 1024 * 1024,
+        backupCount=3,
+        encoding="utf-8",
+    )
+    handler.setFormatter(
+        logging.Formatter(
+            "[%(asctime)s] --- EXECUTING SPARQL QUERY ---\n%(message)s\n",
+            datefmt="%Y-%m-%d %H:%M:%S",
+        )
+    )
+    trace_queue = queue.SimpleQueue()
+    listener = QueueListener(trace_queue, handler)
+    listener.start()
+    atexit.register(listener.stop)
+
+    trace = logging.getLogger("sparql.trace")
+    trace.addHandler(QueueHandler(trace_queue))
+    trace.setLevel(logging.INFO)
+    trace.propagate = False
+    return trace
+
+
+def serialize_tool_result(result: Any) -> str:
+    """Encode a tool result as the text content of its MCP response."""
+    return orjson.dumps(result, default=str, option=orjson.OPT_NON_STR_KEYS).decode()
+
+
 mcp = FastMCP(
     name="spendcast-mcp",
     instructions="MCP server for executing SPARQL queries against a financial data triple store and accessing Open Food Facts nutritional data",
+    lifespan=lifespan,
+    tool_serializer=serialize_tool_result,
 )
 
 
 # --- Tool Definition ---
-async def _execute_sparql_impl(ctx: Context, query: str) -> Dict[str, Any]:
+# Tool queries are mostly fixed templates, so their form encoding is reused
+@functools.lru_cache(maxsize=256)
+def _encode_sparql_query(query: str) -> str:
+    """Form-encode a query for the SPARQL protocol POST body."""
+    return urlencode({"query": query})
+
+
+async def _execute_sparql_impl(
+    ctx: Context, query: str, bindings: Optional[Dict[str, str]] = None
+) -> Dict[str, Any]:
     """
     Internal implementation of SPARQL query execution.
 
     :param ctx: The tool context (unused in this implementation).
     :param query: The SPARQL query string to execute.
+    :param bindings: Values for query variables, as N-Triples terms (see
+        _sparql_literal). GraphDB binds them before evaluation, so the query text
+        stays constant and user input can't alter it.
     :return: The JSON result from GraphDB or an error dictionary.
     """
-    log_file_path = "/tmp/debug.txt"
-    try:
-        with open(log_file_path, "a", encoding="utf-8") as f:
-            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            log_entry = f"[{timestamp}] --- EXECUTING SPARQL QUERY ---\n{query}\n\n"
-            f.write(log_entry)
-    except IOError as e:
-        logging.error(f"Failed to write to log file {log_file_path}: {e}")
+    if (trace := get_sparql_trace()) is not None:
+        trace.info(f"{query}\n{bindings}" if bindings else query)
 
     config = get_config()
     logging.info(f"Executing SPARQL query on {config.url}")
@@ -109,16 +227,22 @@ async def _execute_sparql_impl(ctx: Context, query: str) -> Dict[str, Any]:
         "Content-Type": "application/x-www-form-urlencoded",
         "Accept": "application/sparql-results+json",
     }
-    data = {"query": query}
-    auth = httpx.BasicAuth(config.username, config.password)
+    body = _encode_sparql_query(query)
+    if bindings:
+        # RDF4J protocol: $<name> pre-binds ?<name>
+        body += "&" + urlencode({f"${name}": value for name, value in bindings.items()})
+    auth = get_graphdb_auth()
 
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                config.url, headers=headers, data=data, auth=auth, timeout=30.0
-            )
-            response.raise_for_status()
-            return response.json()
+        response = await get_http_client().post(
+            config.url,
+            headers=headers,
+            content=body.encode(),
+            auth=auth,
+            timeout=GRAPHDB_TIMEOUT,
+        )
+        response.raise_for_status()
+        return orjson.loads(response.content)
     except httpx.HTTPStatusError as e:
         error_msg = f"HTTP error occurred: {e.response.status_code} - {e.response.text}"
         logging.error(error_msg)
@@ -127,67 +251,164 @@ async def _execute_sparql_impl(ctx: Context, query: str) -> Dict[str, Any]:
         error_msg = f"An error occurred while connecting to GraphDB: {e}"
         logging.error(error_msg)
         return {"error": error_msg}
-    except json.JSONDecodeError:
+    except orjson.JSONDecodeError:
         logging.error("Failed to decode JSON response from GraphDB.")
         return {"error": "Invalid JSON response from GraphDB."}
 
 
+XSD_DATE = "http://www.w3.org/2001/XMLSchema#date"
+_NTRIPLES_ESCAPES = str.maketrans({"\\": "\\\\", '"': '\\"', "\n": "\\n", "\r": "\\r"})
+
+
+def _sparql_literal(value: str, datatype: Optional[str] = None) -> str:
+    """
+    Encode a string as an N-Triples literal for use as a query binding.
+
+    :param value: The literal's lexical form
+    :param datatype: Optional datatype IRI, e.g. XSD_DATE
+    :return: The escaped literal, typed when a datatype is given
+    """
+    literal = f'"{value.translate(_NTRIPLES_ESCAPES)}"'
+    return f"{literal}^^<{datatype}>" if datatype else literal
+
+
 # --- Open Food Facts Utilities ---
+# Only the keys _build_product reads; full product documents are ~10x larger
+OFF_FIELDS = ",".join(
+    [
+        "code",
+        "product_name",
+        "brands",
+        "ingredients_text",
+        "allergens",
+        "nutriscore_grade",
+        "nova_group",
+        "ecoscore_grade",
+        "image_url",
+        "labels",
+        "categories",
+        "countries",
+        "nutriments",
+    ]
+)
+
+
+# ProductNutrition field -> Open Food Facts nutriment key (per 100 g)
+NUTRIMENT_FIELDS = (
+    ("energy", "energy-kcal_100g"),
+    ("fat", "fat_100g"),
+    ("saturated_fat", "saturated-fat_100g"),
+    ("carbohydrates", "carbohydrates_100g"),
+    ("sugars", "sugars_100g"),
+    ("proteins", "proteins_100g"),
+    ("salt", "salt_100g"),
+    ("fiber", "fiber_100g"),
+)
+
+
+def _upper_or_none(data: Dict[str, Any], key: str) -> Optional[str]:
+    """Return ``data[key]`` upper-cased, or None when it is missing, null or empty."""
+    value = data.get(key)
+    return value.upper() if value else None
+
+
+def _build_product(
+    product_data: Dict[str, Any], barcode: Optional[str] = None
+) -> OpenFoodFactsProduct:
+    """
+    Map a raw Open Food Facts product to our model without re-validating it.
+
+    :param product_data: Product object from the Open Food Facts API
+    :param barcode: Barcode the product was looked up by; defaults to its code
+    :return: Product information
+    """
+    # Extract nutritional information
+    nutrition = None
+    if "nutriments" in product_data:
+        nutriments = product_data["nutriments"]
+        nutrition = ProductNutrition.model_construct(
+            **{field: nutriments.get(key) for field, key in NUTRIMENT_FIELDS}
+        )
+
+    code = barcode or product_data.get("code", "")
+    return OpenFoodFactsProduct.model_construct(
+        id=code,
+        barcode=code,
+        name=product_data.get("product_name", ""),
+        brands=product_data.get("brands", ""),
+        ingredients=product_data.get("ingredients_text", ""),
+        allergens=product_data.get("allergens", ""),
+        nutri_score=_upper_or_none(product_data, "nutriscore_grade"),
+        nova_group=product_data.get("nova_group"),
+        eco_score=_upper_or_none(product_data, "ecoscore_grade"),
+        image_url=product_data.get("image_url", ""),
+        nutrition_facts=nutrition,
+        labels=product_data.get("labels", ""),
+        categories=product_data.get("categories", ""),
+        countries=product_data.get("countries", ""),
+    )
+
+
+# Barcodes are stable, so lookups are cached; misses expire sooner in case they appear
+PRODUCT_CACHE_TTL = 86400
+MISSING_PRODUCT_TTL = 600
+PRODUCT_CACHE_SIZE = 10000
+_CacheEntry = Tuple[float, Optional[OpenFoodFactsProduct]]
+_product_cache: OrderedDict[str, _CacheEntry] = OrderedDict()
+# Lookups in progress, awaited by every concurrent caller for the same barcode
+_product_inflight: Dict[str, asyncio.Future] = {}
+# Bounds concurrent upstream lookups so batches stay polite to Open Food Facts
+OFF_CONCURRENCY = 20
+_off_slots = asyncio.Semaphore(OFF_CONCURRENCY)
+MAX_BATCH_BARCODES = 100
+
+
+def _cached_product(barcode: str) -> Optional[_CacheEntry]:
+    """Return the unexpired cache entry for a barcode, if any."""
+    entry = _product_cache.get(barcode)
+    if entry is None:
+        return None
+    if entry[0] <= time.monotonic():
+        del _product_cache[barcode]
+        return None
+    # Hits refresh recency so the least recently used barcode is evicted first
+    _product_cache.move_to_end(barcode)
+    return entry
+
+
 async def _fetch_openfoodfacts_product(barcode: str) -> Optional[OpenFoodFactsProduct]:
     """
-    Fetch product information from Open Food Facts API by barcode.
+    Fetch product information by barcode, from cache when possible.
+
+    Concurrent lookups of the same barcode share one upstream request.
 
     :param barcode: Product barcode
     :return: Product information or None if not found
     """
-    url = f"https://world.openfoodfacts.org/api/v2/product/{barcode}.json"
+    if (entry := _cached_product(barcode)) is not None:
+        return entry[1]
 
-    try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, timeout=10.0)
-            response.raise_for_status()
-            data = response.json()
-
-            if data.get("status") != 1 or "product" not in data:
-                return None
-
-            product_data = data["product"]
-
-            # Extract nutritional information
-            nutrition = None
-            if "nutriments" in product_data:
-                nutriments = product_data["nutriments"]
-                nutrition = ProductNutrition(
-                    energy=nutriments.get("energy-kcal_100g"),
-                    fat=nutriments.get("fat_100g"),
-                    saturated_fat=nutriments.get("saturated-fat_100g"),
-                    carbohydrates=nutriments.get("carbohydrates_100g"),
-                    sugars=nutriments.get("sugars_100g"),
-                    proteins=nutriments.get("proteins_100g"),
-                    salt=nutriments.get("salt_100g"),
-                    fiber=nutriments.get("fiber_100g"),
-                )
+    inflight = _product_inflight.get(barcode)
+    if inflight is None:
+        inflight = asyncio.ensure_future(_load_openfoodfacts_product(barcode))
+        _product_inflight[barcode] = inflight
+        inflight.add_done_callback(lambda _: _product_inflight.pop(barcode, None))
+    # Shielded so one caller being cancelled doesn't cancel the shared lookup
+    return await asyncio.shield(inflight)
 
-            # Create product object
-            product = OpenFoodFactsProduct(
-                id=barcode,
-                barcode=barcode,
-                name=product_data.get("product_name", ""),
-                brands=product_data.get("brands", ""),
-                ingredients=product_data.get("ingredients_text", ""),
-                allergens=product_data.get("allergens", ""),
-                nutri_score=product_data.get("nutriscore_grade", "").upper(),
-                nova_group=product_data.get("nova_group"),
-                eco_score=product_data.get("ecoscore_grade", "").upper(),
-                image_url=product_data.get("image_url", ""),
-                nutrition_facts=nutrition,
-                labels=product_data.get("labels", ""),
-                categories=product_data.get("categories", ""),
-                countries=product_data.get("countries", ""),
-            )
 
-            return product
+async def _load_openfoodfacts_product(
+    barcode: str,
+) -> Optional[OpenFoodFactsProduct]:
+    """
+    Fetch a product from Open Food Facts and cache the answer.
 
+    :param barcode: Product barcode
+    :return: Product information, or None if not found or the lookup failed
+    """
+    try:
+        async with _off_slots:
+            product = await _request_openfoodfacts_product(barcode)
     except httpx.HTTPStatusError as e:
         logging.error(
             f"HTTP error fetching product {barcode}: {e.response.status_code}"
@@ -200,16 +421,74 @@ async def _fetch_openfoodfacts_product(barcode: str) -> Optional[OpenFoodFactsPr
         logging.error(f"Unexpected error fetching product {barcode}: {e}")
         return None
 
+    # Only definitive answers are cached; failures are retried next time
+    ttl = PRODUCT_CACHE_TTL if product is not None else MISSING_PRODUCT_TTL
+    _product_cache[barcode] = (time.monotonic() + ttl, product)
+    _product_cache.move_to_end(barcode)
+    if len(_product_cache) > PRODUCT_CACHE_SIZE:
+        _product_cache.popitem(last=False)
+    return product
+
+
+async def _fetch_openfoodfacts_products(
+    barcodes: List[str],
+) -> List[Optional[OpenFoodFactsProduct]]:
+    """
+    Fetch several products concurrently, preserving the order of ``barcodes``.
+
+    :param barcodes: Product barcodes
+    :return: One product, or None if not found, per barcode
+    """
+    return await asyncio.gather(*map(_fetch_openfoodfacts_product, barcodes))
+
+
+async def _request_openfoodfacts_product(
+    barcode: str,
+) -> Optional[OpenFoodFactsProduct]:
+    """
+    Fetch product information from Open Food Facts API by barcode.
+
+    :param barcode: Product barcode
+    :return: Product information or None if not found
+    :raises httpx.HTTPError: If Open Food Facts could not be reached
+    """
+    url = f"https://world.openfoodfacts.org/api/v2/product/{barcode}.json"
+
+    response = await get_http_client().get(
+        url, params={"fields": OFF_FIELDS}, timeout=OFF_TIMEOUT
+    )
+    # Open Food Facts answers unknown barcodes with a 404
+    if response.status_code == 404:
+        return None
+    response.raise_for_status()
+    data = orjson.loads(response.content)
+
+    if data.get("status") != 1 or "product" not in data:
+        return None
+
+    return _build_product(data["product"], barcode)
+
 
 async def _search_openfoodfacts_products(
-    query: str, page: int = 1, page_size: int = 10
+    query: str,
+    page: int = 1,
+    page_size: int = 10,
+    max_nutri: Optional[str] = None,
+    max_nova: Optional[int] = None,
+    max_eco: Optional[str] = None,
 ) -> List[OpenFoodFactsProduct]:
     """
     Search for products in Open Food Facts by name or brand.
 
+    The grade limits are applied by Open Food Facts, so products outside them are
+    never transferred. Products without a grade are not excluded.
+
     :param query: Search query
     :param page: Page number (1-based)
     :param page_size: Number of results per page
+    :param max_nutri: Worst Nutri-Score grade to return, e.g. "B"
+    :param max_nova: Highest NOVA group to return
+    :param max_eco: Worst Eco-Score grade to return, e.g. "B"
     :return: List of products
     """
     encoded_query = quote_plus(query)
@@ -222,52 +501,29 @@ async def _search_openfoodfacts_products(
         "json": 1,
         "page": page,
         "page_size": min(page_size, 50),  # API limit
+        "fields": OFF_FIELDS,
     }
 
+    excluded = []
+    if max_nutri is not None:
+        excluded += [("nutrition_grades", g) for g in "abcde" if g > max_nutri.lower()]
+    if max_nova is not None:
+        excluded += [("nova_groups", str(g)) for g in range(max_nova + 1, 5)]
+    if max_eco is not None:
+        excluded += [("ecoscore", g) for g in "abcde" if g > max_eco.lower()]
+    for i, (tagtype, tag) in enumerate(excluded):
+        params[f"tagtype_{i}"] = tagtype
+        params[f"tag_contains_{i}"] = "does_not_contain"
+        params[f"tag_{i}"] = tag
+
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, params=params, timeout=15.0)
-            response.raise_for_status()
-            data = response.json()
-
-            products = []
-            if "products" in data:
-                for product_data in data["products"]:
-                    # Extract nutritional information
-                    nutrition = None
-                    if "nutriments" in product_data:
-                        nutriments = product_data["nutriments"]
-                        nutrition = ProductNutrition(
-                            energy=nutriments.get("energy-kcal_100g"),
-                            fat=nutriments.get("fat_100g"),
-                            saturated_fat=nutriments.get("saturated-fat_100g"),
-                            carbohydrates=nutriments.get("carbohydrates_100g"),
-                            sugars=nutriments.get("sugars_100g"),
-                            proteins=nutriments.get("proteins_100g"),
-                            salt=nutriments.get("salt_100g"),
-                            fiber=nutriments.get("fiber_100g"),
-                        )
-
-                    # Create product object
-                    product = OpenFoodFactsProduct(
-                        id=product_data.get("code", ""),
-                        barcode=product_data.get("code", ""),
-                        name=product_data.get("product_name", ""),
-                        brands=product_data.get("brands", ""),
-                        ingredients=product_data.get("ingredients_text", ""),
-                        allergens=product_data.get("allergens", ""),
-                        nutri_score=product_data.get("nutriscore_grade", "").upper(),
-                        nova_group=product_data.get("nova_group"),
-                        eco_score=product_data.get("ecoscore_grade", "").upper(),
-                        image_url=product_data.get("image_url", ""),
-                        nutrition_facts=nutrition,
-                        labels=product_data.get("labels", ""),
-                        categories=product_data.get("categories", ""),
-                        countries=product_data.get("countries", ""),
-                    )
-                    products.append(product)
+        response = await get_http_client().get(
+            url, params=params, timeout=OFF_SEARCH_TIMEOUT
+        )
+        response.raise_for_status()
+        data = orjson.loads(response.content)
 
-            return products
+        return [_build_product(item) for item in data.get("products", [])]
 
     except httpx.HTTPStatusError as e:
         logging.error(f"HTTP error searching products: {e.response.status_code}")
@@ -281,7 +537,7 @@ async def _search_openfoodfacts_products(
 
 
 @mcp.tool()
-def get_schema_help() -> Dict[str, Any]:
+async def get_schema_help() -> Dict[str, Any]:
     """
     Get schema documentation and query examples for the financial data store.
 
@@ -290,25 +546,11 @@ def get_schema_help() -> Dict[str, Any]:
 
     :return: Dictionary containing schema content and examples
     """
-    return {
-        "schema_summary": get_schema_summary.fn(),
-        "example_queries": get_example_queries.fn(),
-        "ontology": get_ontology_content.fn(),
-        "description": "Complete schema information and examples for writing SPARQL queries",
-        "quick_tips": [
-            "Use exs: prefix for schema properties (e.g., exs:hasAccount)",
-            "Use ex: prefix for data instances (e.g., ex:Swiss_franc)",
-            "Transactions use accounts, not cards directly",
-            "Check the schema_summary for entity relationships",
-            "See example_queries for working SPARQL patterns",
-        ],
-        "note": "All content is included directly - no need to access separate resources",
-        "ontology_source": "Local files with online fallback at https://static.rwpz.net/spendcast/schema#",
-    }
+    return _schema_help_payload()
 
 
 @mcp.tool()
-def get_schema_content(resource_name: str = "schema_summary") -> Dict[str, Any]:
+async def get_schema_content(resource_name: str = "schema_summary") -> Dict[str, Any]:
     """
     Get the actual content of schema resources instead of just the URIs.
 
@@ -318,39 +560,16 @@ def get_schema_content(resource_name: str = "schema_summary") -> Dict[str, Any]:
     :param resource_name: Which resource to read. Options: "schema_summary", "example_queries", "ontology"
     :return: Dictionary containing the resource content and metadata
     """
-    resource_map = {
-        "schema_summary": ("internal://schema_summary.md", get_schema_summary.fn),
-        "example_queries": ("internal://example_queries.md", get_example_queries.fn),
-        "ontology": (
-            "https://static.rwpz.net/spendcast/schema#",
-            get_ontology_content.fn,
-        ),
-    }
+    payloads = _schema_content_payloads()
 
-    if resource_name not in resource_map:
+    if resource_name not in payloads:
         return {
             "error": f"Unknown resource: {resource_name}",
-            "available_resources": list(resource_map.keys()),
+            "available_resources": list(payloads.keys()),
             "suggestion": "Use one of the available resource names",
         }
 
-    uri, resource_func = resource_map[resource_name]
-
-    try:
-        content = resource_func()
-        return {
-            "resource_name": resource_name,
-            "uri": uri,
-            "content": content,
-            "content_length": len(content),
-            "note": "This is the actual content, not just a URI reference",
-        }
-    except Exception as e:
-        return {
-            "error": f"Failed to read resource {resource_name}: {str(e)}",
-            "resource_name": resource_name,
-            "uri": uri,
-        }
+    return payloads[resource_name]
 
 
 @mcp.tool()
@@ -662,7 +881,13 @@ ORDER BY DESC(?date)
     mime_type="text/turtle",
 )
 def get_ontology_content() -> str:
-    """Read the ontology.ttl file content with online fallback."""
+    """Read the ontology.ttl file content."""
+    return _read_ontology()
+
+
+@functools.lru_cache(maxsize=1)
+def _read_ontology() -> str:
+    """Load the ontology once; the file does not change while the server runs."""
     try:
         # Try data/ontology.ttl first (for development)
         ontology_path = os.path.join(
@@ -677,36 +902,78 @@ def get_ontology_content() -> str:
         with open(ontology_path, "r", encoding="utf-8") as f:
             return f.read()
     except FileNotFoundError:
-        # Fallback to online ontology
-        try:
-            # Create a simple async function to fetch the online ontology
-            async def fetch_online_ontology():
-                async with httpx.AsyncClient() as client:
-                    response = await client.get(
-                        "https://static.rwpz.net/spendcast/schema#", timeout=10.0
-                    )
-                    response.raise_for_status()
-                    return response.text
-
-            # Run the async function in a new event loop if needed
-            try:
-                loop = asyncio.get_event_loop()
-                if loop.is_running():
-                    # If we're already in an async context, we can't use run_until_complete
-                    return "# Ontology file not found locally. Online ontology available at: https://static.rwpz.net/spendcast/schema#"
-                else:
-                    return loop.run_until_complete(fetch_online_ontology())
-            except RuntimeError:
-                # No event loop available, return the URL
-                return "# Ontology file not found locally. Online ontology available at: https://static.rwpz.net/spendcast/schema#"
-
-        except Exception as fetch_error:
-            return f"# Ontology file not found locally. Online ontology available at: https://static.rwpz.net/spendcast/schema#\n# Error fetching online version: {str(fetch_error)}"
+        return "# Ontology file not found locally. Online ontology available at: https://static.rwpz.net/spendcast/schema#"
     except Exception as e:
         return f"# Error reading ontology file: {str(e)}\n# Online ontology available at: https://static.rwpz.net/spendcast/schema#"
 
 
+# --- Prebuilt Schema Payloads ---
+# The schema tools return constants, so each payload is assembled only once
+@functools.lru_cache(maxsize=1)
+def _schema_help_payload() -> Dict[str, Any]:
+    """Build the get_schema_help response."""
+    return {
+        "schema_summary": get_schema_summary.fn(),
+        "example_queries": get_example_queries.fn(),
+        "ontology": get_ontology_content.fn(),
+        "description": "Complete schema information and examples for writing SPARQL queries",
+        "quick_tips": [
+            "Use exs: prefix for schema properties (e.g., exs:hasAccount)",
+            "Use ex: prefix for data instances (e.g., ex:Swiss_franc)",
+            "Transactions use accounts, not cards directly",
+            "Check the schema_summary for entity relationships",
+            "See example_queries for working SPARQL patterns",
+        ],
+        "note": "All content is included directly - no need to access separate resources",
+        "ontology_source": "Local files; published at https://static.rwpz.net/spendcast/schema#",
+    }
+
+
+@functools.lru_cache(maxsize=1)
+def _schema_content_payloads() -> Dict[str, Dict[str, Any]]:
+    """Build the get_schema_content response for every known resource."""
+    resource_map = {
+        "schema_summary": ("internal://schema_summary.md", get_schema_summary.fn),
+        "example_queries": ("internal://example_queries.md", get_example_queries.fn),
+        "ontology": (
+            "https://static.rwpz.net/spendcast/schema#",
+            get_ontology_content.fn,
+        ),
+    }
+
+    payloads = {}
+    for resource_name, (uri, resource_func) in resource_map.items():
+        try:
+            content = resource_func()
+            payloads[resource_name] = {
+                "resource_name": resource_name,
+                "uri": uri,
+                "content": content,
+                "content_length": len(content),
+                "note": "This is the actual content, not just a URI reference",
+            }
+        except Exception as e:
+            payloads[resource_name] = {
+                "error": f"Failed to read resource {resource_name}: {str(e)}",
+                "resource_name": resource_name,
+                "uri": uri,
+            }
+    return payloads
+
+
+def _invalidate_schema_cache() -> None:
+    """Forget the loaded ontology and schema payloads so they are rebuilt."""
+    _read_ontology.cache_clear()
+    _schema_help_payload.cache_clear()
+    _schema_content_payloads.cache_clear()
+
+
 # --- Query Validation ---
+REQUIRED_PREFIXES = ["exs:", "ex:"]
+_SPARQL_PREFIX_RE = re.compile(r"exs?:")
+_SPARQL_FORM_RE = re.compile(r"\s*(?:SELECT|ASK|CONSTRUCT|DESCRIBE)\b", re.IGNORECASE)
+
+
 def validate_sparql_query(query: str) -> tuple[bool, str]:
     """
     Basic SPARQL query validation.
@@ -715,26 +982,23 @@ def validate_sparql_query(query: str) -> tuple[bool, str]:
     :return: Tuple of (is_valid, error_message)
     """
     # Check for required prefixes
-    required_prefixes = ["exs:", "ex:"]
-    missing_prefixes = []
-
-    for prefix in required_prefixes:
-        if prefix not in query:
-            missing_prefixes.append(prefix)
+    found_prefixes = set(_SPARQL_PREFIX_RE.findall(query))
+    missing_prefixes = [p for p in REQUIRED_PREFIXES if p not in found_prefixes]
 
     if missing_prefixes:
         return False, f"Missing required prefixes: {', '.join(missing_prefixes)}"
 
     # Check for basic SPARQL syntax
-    if not query.strip().upper().startswith(("SELECT", "ASK", "CONSTRUCT", "DESCRIBE")):
+    if not _SPARQL_FORM_RE.match(query):
         return False, "Query must start with SELECT, ASK, CONSTRUCT, or DESCRIBE"
 
     # Check for balanced braces
-    if query.count("{") != query.count("}"):
+    open_braces = query.count("{")
+    if open_braces != query.count("}"):
         return False, "Unbalanced braces in SPARQL query"
 
     # Check for basic WHERE clause
-    if "{" not in query or "}" not in query:
+    if not open_braces:
         return False, "Missing WHERE clause with braces"
 
     return True, "Query is valid"
@@ -772,6 +1036,19 @@ async def execute_sparql_validated(ctx: Context, query: str) -> Dict[str, Any]:
 
 
 # --- Open Food Facts Tools ---
+def _search_error(message: str) -> Dict[str, Any]:
+    """Build a search_food_products error response."""
+    return {"error": message, "products": [], "total_found": 0}
+
+
+def _product_error(message: str, barcode: Optional[str] = None) -> Dict[str, Any]:
+    """Build a get_food_product_by_barcode error response."""
+    response = {"error": message, "product": None}
+    if barcode is not None:
+        response["barcode"] = barcode
+    return response
+
+
 @mcp.tool()
 async def search_food_products(
     ctx: Context, query: str, page: int = 1, page_size: int = 10
@@ -792,23 +1069,13 @@ async def search_food_products(
     :return: Dictionary containing search results and metadata
     """
     if not query or len(query.strip()) < 2:
-        return {
-            "error": "Search query must be at least 2 characters long",
-            "products": [],
-            "total_found": 0,
-        }
+        return _search_error("Search query must be at least 2 characters long")
 
     try:
         products = await _search_openfoodfacts_products(query.strip(), page, page_size)
 
         # Convert products to dictionaries for JSON serialization
-        products_data = []
-        for product in products:
-            product_dict = product.dict()
-            # Convert nutrition facts to dict if present
-            if product_dict["nutrition_facts"]:
-                product_dict["nutrition_facts"] = product_dict["nutrition_facts"]
-            products_data.append(product_dict)
+        products_data = [product.as_dict for product in products]
 
         return {
             "products": products_data,
@@ -821,11 +1088,7 @@ async def search_food_products(
 
     except Exception as e:
         logging.error(f"Error searching food products: {e}")
-        return {
-            "error": f"Failed to search products: {str(e)}",
-            "products": [],
-            "total_found": 0,
-        }
+        return _search_error(f"Failed to search products: {str(e)}")
 
 
 @mcp.tool()
@@ -846,7 +1109,7 @@ async def get_food_product_by_barcode(ctx: Context, barcode: str) -> Dict[str, A
     :return: Dictionary containing detailed product information
     """
     if not barcode or not barcode.strip():
-        return {"error": "Barcode is required", "product": None}
+        return _product_error("Barcode is required")
 
     # Clean the barcode
     clean_barcode = barcode.strip()
@@ -854,15 +1117,14 @@ async def get_food_product_by_barcode(ctx: Context, barcode: str) -> Dict[str, A
     try:
         product = await _fetch_openfoodfacts_product(clean_barcode)
 
-        if not product:
-            return {
-                "error": f"Product with barcode {clean_barcode} not found in Open Food Facts database",
-                "product": None,
-                "barcode": clean_barcode,
-            }
+        if product is None:
+            return _product_error(
+                f"Product with barcode {clean_barcode} not found in Open Food Facts database",
+                clean_barcode,
+            )
 
         # Convert to dictionary for JSON serialization
-        product_dict = product.dict()
+        product_dict = product.as_dict
 
         return {
             "product": product_dict,
@@ -872,12 +1134,87 @@ async def get_food_product_by_barcode(ctx: Context, barcode: str) -> Dict[str, A
 
     except Exception as e:
         logging.error(f"Error fetching product by barcode {clean_barcode}: {e}")
+        return _product_error(f"Failed to fetch product: {str(e)}", clean_barcode)
+
+
+@mcp.tool()
+async def get_products_by_barcodes(ctx: Context, barcodes: List[str]) -> Dict[str, Any]:
+    """
+    Get food product information for several barcodes in one call.
+
+    Lookups run concurrently, so this is much faster than calling
+    get_food_product_by_barcode once per barcode.
+
+    :param ctx: The tool context (unused in this implementation).
+    :param barcodes: Product barcodes (EAN, UPC, etc.), at most 100
+    :return: Dictionary with the products found and the barcodes not found
+    """
+    clean_barcodes = list(dict.fromkeys(b.strip() for b in barcodes if b and b.strip()))
+    if not clean_barcodes:
+        return {"error": "At least one barcode is required", "products": []}
+    if len(clean_barcodes) > MAX_BATCH_BARCODES:
         return {
-            "error": f"Failed to fetch product: {str(e)}",
-            "product": None,
-            "barcode": clean_barcode,
+            "error": f"At most {MAX_BATCH_BARCODES} barcodes can be looked up at once",
+            "products": [],
         }
 
+    products = await _fetch_openfoodfacts_products(clean_barcodes)
+
+    found = []
+    not_found = []
+    for barcode, product in zip(clean_barcodes, products):
+        if product is None:
+            not_found.append(barcode)
+        else:
+            found.append(product.as_dict)
+
+    return {
+        "products": found,
+        "not_found": not_found,
+        "total_requested": len(clean_barcodes),
+        "message": f"Retrieved {len(found)} of {len(clean_barcodes)} products",
+    }
+
+
+# Shares of spending above which analyze_nutrition_spending recommends a change
+UNHEALTHY_SPENDING_SHARE = 0.3
+ULTRA_PROCESSED_SPENDING_SHARE = 0.4
+
+# NOVA groups as the keys of nova_group_spending
+NOVA_KEYS = {group: str(group) for group in range(1, 5)}
+
+# Aggregate line-item spending per EAN so only one row per product returns.
+# The customer and dates are bound by GraphDB, never spliced into the text.
+NUTRITION_SPENDING_QUERY = """
+PREFIX exs: <https://static.rwpz.net/spendcast/schema#>
+
+SELECT ?ean (SUM(?amount) AS ?spent) (COUNT(*) AS ?lineItems) WHERE {
+    ?person exs:hasName ?customerName .
+    ?person exs:hasAccount ?account .
+
+    ?transaction a exs:FinancialTransaction ;
+                exs:hasTransactionDate ?date .
+    FILTER(?date >= ?startDate && ?date <= ?endDate)
+
+    ?transaction exs:hasParticipant ?payerRole ;
+                exs:hasMonetaryAmount ?amount_uri ;
+                exs:hasReceipt ?receipt .
+
+    ?payerRole a exs:Payer ;
+              exs:isPlayedBy ?account .
+
+    ?amount_uri exs:hasAmount ?amount .
+
+    ?receipt exs:hasLineItem ?lineItem .
+    ?lineItem exs:hasProduct ?product ;
+             exs:quantity ?quantity .
+
+    ?product exs:name ?productName .
+    OPTIONAL { ?product exs:hasEAN ?ean . }
+}
+GROUP BY ?ean
+"""
+
 
 @mcp.tool()
 async def analyze_nutrition_spending(
@@ -910,41 +1247,16 @@ async def analyze_nutrition_spending(
         }
 
     try:
-        # First, get customer transactions with products that have EAN codes
-        sparql_query = f"""
-        PREFIX exs: <https://static.rwpz.net/spendcast/schema#>
-        PREFIX ex: <https://static.rwpz.net/spendcast/>
-        PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
-        
-        SELECT ?transaction ?amount ?date ?productName ?ean WHERE {{
-            ?person exs:hasName "{customer_name}" .
-            ?person exs:hasAccount ?account .
-            
-            ?transaction a exs:FinancialTransaction ;
-                        exs:hasParticipant ?payerRole ;
-                        exs:hasMonetaryAmount ?amount_uri ;
-                        exs:hasTransactionDate ?date ;
-                        exs:hasReceipt ?receipt .
-            
-            ?payerRole a exs:Payer ;
-                      exs:isPlayedBy ?account .
-            
-            ?amount_uri exs:hasAmount ?amount .
-            
-            ?receipt exs:hasLineItem ?lineItem .
-            ?lineItem exs:hasProduct ?product ;
-                     exs:quantity ?quantity .
-            
-            ?product exs:name ?productName .
-            OPTIONAL {{ ?product exs:hasEAN ?ean . }}
-            
-            FILTER(?date >= "{start_date}"^^xsd:date && ?date <= "{end_date}"^^xsd:date)
-        }}
-        ORDER BY ?date
-        """
-
         # Execute SPARQL query
-        sparql_result = await _execute_sparql_impl(ctx, sparql_query)
+        sparql_result = await _execute_sparql_impl(
+            ctx,
+            NUTRITION_SPENDING_QUERY,
+            bindings={
+                "customerName": _sparql_literal(customer_name),
+                "startDate": _sparql_literal(start_date, XSD_DATE),
+                "endDate": _sparql_literal(end_date, XSD_DATE),
+            },
+        )
 
         if "error" in sparql_result:
             return {
@@ -963,7 +1275,7 @@ async def analyze_nutrition_spending(
             }
 
         # Process transactions and enrich with Open Food Facts data
-        transactions = sparql_result["results"]["bindings"]
+        rows = sparql_result["results"]["bindings"]
         nutrition_analysis = {
             "nutri_score_spending": {
                 "A": 0,
@@ -988,88 +1300,73 @@ async def analyze_nutrition_spending(
             "products_with_ean": 0,
         }
 
-        # Process each transaction
-        for transaction in transactions:
-            amount = float(transaction["amount"]["value"])
-            product_name = transaction["productName"]["value"]
+        # Look up every distinct EAN concurrently before categorizing
+        eans = list(
+            dict.fromkeys(
+                row["ean"]["value"]
+                for row in rows
+                if "ean" in row and row["ean"]["value"]
+            )
+        )
+        off_products = dict(zip(eans, await _fetch_openfoodfacts_products(eans)))
+
+        nutri_spending = nutrition_analysis["nutri_score_spending"]
+        nova_spending = nutrition_analysis["nova_group_spending"]
+        eco_spending = nutrition_analysis["eco_score_spending"]
+
+        # Process each EAN's aggregated spending
+        for row in rows:
+            amount = float(row["spent"]["value"])
+            line_items = int(row["lineItems"]["value"])
 
             nutrition_analysis["total_amount"] += amount
-            nutrition_analysis["analyzed_products"] += 1
+            nutrition_analysis["analyzed_products"] += line_items
 
+            off_product = None
             # Check if EAN code is available
-            if "ean" in transaction and transaction["ean"]["value"]:
-                ean = transaction["ean"]["value"]
-                nutrition_analysis["products_with_ean"] += 1
-
-                # Fetch nutrition data from Open Food Facts
-                off_product = await _fetch_openfoodfacts_product(ean)
-
-                if off_product:
-                    nutrition_analysis["products_with_nutrition_data"] += 1
-
-                    # Categorize by Nutri-Score
-                    nutri_score = off_product.nutri_score or "unknown"
-                    if nutri_score.lower() in ["a", "b", "c", "d", "e"]:
-                        nutrition_analysis["nutri_score_spending"][
-                            nutri_score.upper()
-                        ] += amount
-                    else:
-                        nutrition_analysis["nutri_score_spending"]["unknown"] += amount
-
-                    # Categorize by Nova Group
-                    nova_group = (
-                        str(off_product.nova_group)
-                        if off_product.nova_group
-                        else "unknown"
-                    )
-                    if nova_group in ["1", "2", "3", "4"]:
-                        nutrition_analysis["nova_group_spending"][nova_group] += amount
-                    else:
-                        nutrition_analysis["nova_group_spending"]["unknown"] += amount
-
-                    # Categorize by Eco-Score
-                    eco_score = off_product.eco_score or "unknown"
-                    if eco_score.lower() in ["a", "b", "c", "d", "e"]:
-                        nutrition_analysis["eco_score_spending"][eco_score.upper()] += (
-                            amount
-                        )
-                    else:
-                        nutrition_analysis["eco_score_spending"]["unknown"] += amount
-                else:
-                    # No nutrition data available for this EAN
-                    nutrition_analysis["nutri_score_spending"]["unknown"] += amount
-                    nutrition_analysis["nova_group_spending"]["unknown"] += amount
-                    nutrition_analysis["eco_score_spending"]["unknown"] += amount
+            if "ean" in row and row["ean"]["value"]:
+                nutrition_analysis["products_with_ean"] += line_items
+                off_product = off_products[row["ean"]["value"]]
+
+            if off_product is not None:
+                nutrition_analysis["products_with_nutrition_data"] += line_items
+                # Grades are upper-cased by _build_product; anything else is unknown
+                nutri_score = off_product.nutri_score
+                nova_group = NOVA_KEYS.get(off_product.nova_group)
+                eco_score = off_product.eco_score
             else:
-                # No EAN code available
-                nutrition_analysis["nutri_score_spending"]["unknown"] += amount
-                nutrition_analysis["nova_group_spending"]["unknown"] += amount
-                nutrition_analysis["eco_score_spending"]["unknown"] += amount
+                # No EAN code or no nutrition data available for it
+                nutri_score = nova_group = eco_score = "unknown"
+
+            for spending, grade in (
+                (nutri_spending, nutri_score),
+                (nova_spending, nova_group),
+                (eco_spending, eco_score),
+            ):
+                spending[grade if grade in spending else "unknown"] += amount
 
         # Generate recommendations based on the analysis
         recommendations = []
+        total = nutrition_analysis["total_amount"]
 
-        if nutrition_analysis["total_amount"] > 0:
+        if total > 0:
             # Nutri-Score recommendations
-            unhealthy_spending = (
-                nutrition_analysis["nutri_score_spending"]["D"]
-                + nutrition_analysis["nutri_score_spending"]["E"]
-            )
-            if unhealthy_spending > nutrition_analysis["total_amount"] * 0.3:
+            unhealthy_spending = nutri_spending["D"] + nutri_spending["E"]
+            if unhealthy_spending > total * UNHEALTHY_SPENDING_SHARE:
                 recommendations.append(
                     {
                         "type": "nutri_score",
-                        "message": f"You spend {unhealthy_spending:.2f} CHF ({unhealthy_spending / nutrition_analysis['total_amount'] * 100:.1f}%) on products with poor Nutri-Scores (D/E). Consider choosing more A/B rated products.",
+                        "message": f"You spend {unhealthy_spending:.2f} CHF ({unhealthy_spending / total * 100:.1f}%) on products with poor Nutri-Scores (D/E). Consider choosing more A/B rated products.",
                     }
                 )
 
             # Nova Group recommendations
-            ultra_processed_spending = nutrition_analysis["nova_group_spending"]["4"]
-            if ultra_processed_spending > nutrition_analysis["total_amount"] * 0.4:
+            ultra_processed_spending = nova_spending["4"]
+            if ultra_processed_spending > total * ULTRA_PROCESSED_SPENDING_SHARE:
                 recommendations.append(
                     {
                         "type": "nova_group",
-                        "message": f"You spend {ultra_processed_spending:.2f} CHF ({ultra_processed_spending / nutrition_analysis['total_amount'] * 100:.1f}%) on ultra-processed foods (Nova Group 4). Try to include more minimally processed alternatives.",
+                        "message": f"You spend {ultra_processed_spending:.2f} CHF ({ultra_processed_spending / total * 100:.1f}%) on ultra-processed foods (Nova Group 4). Try to include more minimally processed alternatives.",
                     }
                 )
 
@@ -1094,9 +1391,31 @@ async def analyze_nutrition_spending(
         }
 
 
+# Lower ranks are better; missing or unrecognised scores rank below every grade
+GRADE_RANKS = {"A": 0, "B": 1, "C": 2, "D": 3, "E": 4}
+NOVA_RANKS = {1: 1, 2: 2, 3: 3, 4: 4}
+UNRANKED = 5
+
+# Scores compared for each get_healthy_alternatives criteria: the field, its ranks
+# and how a missing score is shown
+ALTERNATIVE_CRITERIA = {
+    "nutri_score": (("nutri_score", GRADE_RANKS, "Z"),),
+    "nova_group": (("nova_group", NOVA_RANKS, 5),),
+    "eco_score": (("eco_score", GRADE_RANKS, "Z"),),
+    "all": (
+        ("nutri_score", GRADE_RANKS, "Z"),
+        ("nova_group", NOVA_RANKS, 5),
+        ("eco_score", GRADE_RANKS, "Z"),
+    ),
+}
+
+
 @mcp.tool()
 async def get_healthy_alternatives(
-    ctx: Context, barcode: str, criteria: str = "nutri_score"
+    ctx: Context,
+    barcode: str,
+    criteria: str = "nutri_score",
+    category_hint: Optional[str] = None,
 ) -> Dict[str, Any]:
     """
     Find healthier alternatives to a given product using Open Food Facts data.
@@ -1109,36 +1428,74 @@ async def get_healthy_alternatives(
     :param ctx: The tool context (unused in this implementation).
     :param barcode: Barcode of the product to find alternatives for
     :param criteria: Criteria for "healthier" - "nutri_score", "nova_group", "eco_score", or "all"
+    :param category_hint: Category to search for alternatives in, if already known;
+        lets the product lookup and the search run concurrently
     :return: Dictionary containing healthier alternatives
     """
     if not barcode or not barcode.strip():
         return {"error": "Barcode is required", "alternatives": []}
 
+    category_hint = category_hint.strip() if category_hint else ""
+
     try:
-        # First, get the original product
-        original_product = await _fetch_openfoodfacts_product(barcode.strip())
+        # Without a hint the search category comes from the original product
+        alternative_products = None
+        if category_hint:
+            original_product, alternative_products = await asyncio.gather(
+                _fetch_openfoodfacts_product(barcode.strip()),
+                _search_openfoodfacts_products(category_hint, page=1, page_size=20),
+            )
+        else:
+            original_product = await _fetch_openfoodfacts_product(barcode.strip())
 
-        if not original_product:
+        if original_product is None:
             return {
                 "error": f"Original product with barcode {barcode} not found",
                 "alternatives": [],
             }
 
-        # Extract main category for searching alternatives
-        categories = original_product.categories or ""
-        main_category = categories.split(",")[0].strip() if categories else ""
-
-        if not main_category:
-            return {
-                "error": "Cannot find alternatives - original product has no category information",
-                "original_product": original_product.dict(),
-                "alternatives": [],
-            }
+        if alternative_products is None:
+            # Extract main category for searching alternatives
+            categories = original_product.categories or ""
+            main_category = categories.split(",")[0].strip() if categories else ""
+
+            if not main_category:
+                return {
+                    "error": "Cannot find alternatives - original product has no category information",
+                    "original_product": original_product.as_dict,
+                    "alternatives": [],
+                }
+
+            # With a single criterion, let Open Food Facts drop products that are
+            # not strictly better; "all" accepts an improvement on any score
+            max_nutri = max_nova = max_eco = None
+            if (
+                criteria == "nutri_score"
+                and original_product.nutri_score in GRADE_RANKS
+            ):
+                max_nutri = chr(ord(original_product.nutri_score) - 1)
+            elif criteria == "nova_group" and original_product.nova_group:
+                max_nova = original_product.nova_group - 1
+            elif criteria == "eco_score" and original_product.eco_score in GRADE_RANKS:
+                max_eco = chr(ord(original_product.eco_score) - 1)
+
+            # Search for products in the same category
+            alternative_products = await _search_openfoodfacts_products(
+                main_category,
+                page=1,
+                page_size=20,
+                max_nutri=max_nutri,
+                max_nova=max_nova,
+                max_eco=max_eco,
+            )
 
-        # Search for products in the same category
-        alternative_products = await _search_openfoodfacts_products(
-            main_category, page=1, page_size=20
-        )
+        # Resolve the original's scores and ranks once
+        checks = []
+        for field, ranks, missing in ALTERNATIVE_CRITERIA.get(criteria, ()):
+            orig_score = getattr(original_product, field)
+            checks.append(
+                (field, ranks, missing, orig_score, ranks.get(orig_score, UNRANKED))
+            )
 
         # Filter and rank alternatives based on criteria
         better_alternatives = []
@@ -1147,46 +1504,29 @@ async def get_healthy_alternatives(
             if alt_product.barcode == original_product.barcode:
                 continue  # Skip the original product
 
-            is_better = False
             score_comparison = {}
+            for field, ranks, missing, orig_score, orig_rank in checks:
+                alt_score = getattr(alt_product, field)
+                if ranks.get(alt_score, UNRANKED) < orig_rank:
+                    score_comparison[field] = (
+                        f"{orig_score or missing} → {alt_score or missing}"
+                    )
 
-            # Compare based on criteria
-            if criteria in ["nutri_score", "all"]:
-                orig_nutri = original_product.nutri_score or "Z"
-                alt_nutri = alt_product.nutri_score or "Z"
-                if alt_nutri < orig_nutri:  # A < B < C < D < E
-                    is_better = True
-                    score_comparison["nutri_score"] = f"{orig_nutri} → {alt_nutri}"
-
-            if criteria in ["nova_group", "all"]:
-                orig_nova = original_product.nova_group or 5
-                alt_nova = alt_product.nova_group or 5
-                if alt_nova < orig_nova:  # Lower Nova group is better
-                    is_better = True
-                    score_comparison["nova_group"] = f"{orig_nova} → {alt_nova}"
-
-            if criteria in ["eco_score", "all"]:
-                orig_eco = original_product.eco_score or "Z"
-                alt_eco = alt_product.eco_score or "Z"
-                if alt_eco < orig_eco:  # A < B < C < D < E
-                    is_better = True
-                    score_comparison["eco_score"] = f"{orig_eco} → {alt_eco}"
-
-            if is_better:
-                alt_dict = alt_product.dict()
-                alt_dict["improvement_reason"] = score_comparison
-                better_alternatives.append(alt_dict)
-
-        # Sort alternatives by number of improvements
-        better_alternatives.sort(
-            key=lambda x: len(x["improvement_reason"]), reverse=True
-        )
+            if score_comparison:
+                better_alternatives.append(
+                    (len(score_comparison), alt_product, score_comparison)
+                )
 
-        # Limit to top 5 alternatives
-        better_alternatives = better_alternatives[:5]
+        # Keep the top 5 by number of improvements; only those are serialized
+        better_alternatives = [
+            {**alt_product.as_dict, "improvement_reason": score_comparison}
+            for _, alt_product, score_comparison in heapq.nlargest(
+                5, better_alternatives, key=itemgetter(0)
+            )
+        ]
 
         return {
-            "original_product": original_product.dict(),
+            "original_product": original_product.as_dict,
             "alternatives": better_alternatives,
             "criteria_used": criteria,
             "total_alternatives_found": len(better_alternatives),
@@ -1,16 +1,24 @@
 """Transaction management and analytics API router using GraphDB SPARQL queries."""
 
-from fastapi import APIRouter, HTTPException, Query
-from typing import Dict, Any, List, Optional
+from fastapi import APIRouter, Header, HTTPException, Query, Response
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+import asyncio
+import hashlib
 import logging
+from operator import itemgetter
+from urllib.parse import quote
 import httpx
+import orjson
+from pydantic import TypeAdapter
 from datetime import datetime, date
 
+from src.cache import SingleFlight, TTLCache
 from src.config import settings
+from src.sparql import XSD_DATE, ParamQuery, sparql_iri, sparql_literal
 from src.models import (
     TransactionBasic,
+    TransactionBatchRequest,
     TransactionDetailsAPI as TransactionDetails,
-    ReceiptItemAPI as ReceiptItem,
     ReceiptDetailsAPI as ReceiptDetails,
     SpendingAnalyticsAPI as SpendingAnalytics,
 )
@@ -19,27 +27,323 @@ router = APIRouter(prefix="/api/v1/transactions", tags=["transactions"])
 
 logger = logging.getLogger(__name__)
 
+# Analytics endpoints issue several queries each, so GraphDB connections are pooled
+# and, behind a TLS frontend, multiplexed over HTTP/2
+GRAPHDB_LIMITS = httpx.Limits(max_connections=64, max_keepalive_connections=32)
+GRAPHDB_TIMEOUT = httpx.Timeout(30.0)
+# GraphDB aborts queries itself (RDF4J "timeout", in seconds) before the client
+# gives up, so abandoned queries don't keep running on the server
+GRAPHDB_QUERY_TIMEOUT = 25
+_graphdb_client: Optional[httpx.AsyncClient] = None
+
+# Dashboards poll the same aggregations; briefly stale figures are acceptable
+ANALYTICS_CACHE_TTL = 120
+_analytics_cache = TTLCache(maxsize=512, ttl=ANALYTICS_CACHE_TTL)
+_analytics_inflight = SingleFlight()
+
+_TRANSACTIONS_ADAPTER = TypeAdapter(List[TransactionBasic])
+
+# Transactions are loaded into GraphDB outside this service, so list ETags carry a
+# fingerprint of the data itself, probed at most once per max-age
+TRANSACTIONS_MAX_AGE = 30
+TRANSACTIONS_CACHE_CONTROL = f"private, max-age={TRANSACTIONS_MAX_AGE}"
+_data_version_cache = TTLCache(maxsize=1, ttl=TRANSACTIONS_MAX_AGE)
+
+# Query templates are constant text; user input is only ever bound as ?p_ values,
+# so GraphDB sees the same query string (and can reuse its parse) on every call
+LIST_TRANSACTIONS_QUERY = ParamQuery("""
+PREFIX exs: <https://static.rwpz.net/spendcast/schema#>
+
+SELECT ?transaction ?amount ?date ?transaction_type WHERE {
+    #PARAMS
+    ?transaction a exs:FinancialTransaction .
+    ?transaction exs:hasMonetaryAmount ?amount_uri .
+    ?amount_uri exs:hasAmount ?amount .
+    ?transaction exs:hasTransactionDate ?date .
+
+    OPTIONAL { ?transaction exs:transactionType ?transaction_type }
+
+    FILTER(!BOUND(?p_type) || ?transaction_type = ?p_type)
+    FILTER(!BOUND(?p_start) || ?date >= ?p_start)
+    FILTER(!BOUND(?p_end) || ?date <= ?p_end)
+}
+ORDER BY DESC(?date)
+""")
+
+# Cheap aggregate that changes whenever transactions are added or removed
+DATA_VERSION_QUERY = """
+PREFIX exs: <https://static.rwpz.net/spendcast/schema#>
+
+SELECT (COUNT(?transaction) AS ?count) (MAX(?date) AS ?latest) WHERE {
+    ?transaction a exs:FinancialTransaction .
+    ?transaction exs:hasTransactionDate ?date .
+}
+"""
+
+TRANSACTION_DETAILS_QUERY = ParamQuery("""
+PREFIX exs: <https://static.rwpz.net/spendcast/schema#>
+PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+
+SELECT ?transaction ?amount ?currency ?date ?value_date ?transaction_type ?receipt
+       ?role_type ?participant_name ?participant_label WHERE {
+    #PARAMS
+    BIND(?p_transaction AS ?transaction)
+
+    ?transaction a exs:FinancialTransaction .
+    ?transaction exs:hasMonetaryAmount ?amount_uri .
+    ?amount_uri exs:hasAmount ?amount .
+    ?amount_uri exs:hasCurrency ?currency .
+    ?transaction exs:hasTransactionDate ?date .
+
+    OPTIONAL { ?transaction exs:valueDate ?value_date }
+    OPTIONAL { ?transaction exs:transactionType ?transaction_type }
+    OPTIONAL { ?transaction exs:hasReceipt ?receipt }
+
+    # Payer and payee are walked once, one row per role, and folded in Python
+    OPTIONAL {
+        VALUES ?role_type { exs:Payer exs:Payee }
+        ?transaction exs:hasParticipant ?role .
+        ?role a ?role_type .
+        ?role exs:isPlayedBy ?participant .
+        OPTIONAL { ?participant exs:hasName ?participant_name }
+        OPTIONAL { ?participant rdfs:label ?participant_label }
+    }
+}
+""")
+
+PAYER_ROLE = "https://static.rwpz.net/spendcast/schema#Payer"
+PAYEE_ROLE = "https://static.rwpz.net/spendcast/schema#Payee"
+
+TRANSACTION_RECEIPT_QUERY = ParamQuery("""
+PREFIX exs: <https://static.rwpz.net/spendcast/schema#>
+
+SELECT ?receipt WHERE {
+    #PARAMS
+    ?p_transaction exs:hasReceipt ?receipt .
+}
+""")
+
+RECEIPT_DETAILS_QUERY = ParamQuery("""
+PREFIX exs: <https://static.rwpz.net/spendcast/schema#>
+PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+
+SELECT ?receipt ?total_amount ?receipt_date ?receipt_time ?payment_method
+       ?merchant ?vat_number WHERE {
+    #PARAMS
+    BIND(?p_receipt AS ?receipt)
+
+    OPTIONAL { ?receipt exs:hasTotalAmount ?total_amount_uri . ?total_amount_uri exs:hasAmount ?total_amount }
+    OPTIONAL { ?receipt exs:receiptDate ?receipt_date }
+    OPTIONAL { ?receipt exs:receiptTime ?receipt_time }
+    OPTIONAL { ?receipt exs:paymentMethod ?payment_method }
+    OPTIONAL { ?receipt exs:vatNumber ?vat_number }
+
+    OPTIONAL {
+        ?receipt exs:hasParticipant ?merchantRole .
+        ?merchantRole exs:isPlayedBy ?merchant .
+        ?merchant rdfs:label ?merchant .
+    }
+}
+""")
+
+RECEIPT_ITEMS_QUERY = ParamQuery("""
+PREFIX exs: <https://static.rwpz.net/spendcast/schema#>
+PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+
+SELECT ?item_description ?quantity ?unit_price ?line_subtotal
+       ?product_name ?category_label WHERE {
+    #PARAMS
+    ?p_receipt exs:hasLineItem ?line_item .
+
+    OPTIONAL { ?line_item exs:itemDescription ?item_description }
+    OPTIONAL { ?line_item exs:quantity ?quantity }
+    OPTIONAL { ?line_item exs:unitPrice ?unit_price }
+    OPTIONAL { ?line_item exs:lineSubtotal ?line_subtotal }
+
+    OPTIONAL {
+        ?line_item exs:hasProduct ?product .
+        ?product exs:name ?product_name .
+        OPTIONAL {
+            ?product exs:category ?category .
+            ?category rdfs:label ?category_label .
+        }
+    }
+}
+ORDER BY ?item_description
+""")
+
+# Marks where the analytics queries join ?account (the payer) to the customer
+# named ?p_customer; a comment, so the unscoped templates stay valid as they are
+CUSTOMER = "#CUSTOMER"
+CUSTOMER_PATTERN = (
+    "?account exs:hasAccountHolder ?holderRole . "
+    "?holderRole exs:isPlayedBy ?customer . "
+    "?customer exs:hasName ?p_customer ."
+)
+
+
+def _by_customer(query: ParamQuery) -> ParamQuery:
+    """Return the variant of an analytics query scoped to one customer."""
+    # Joined into the pattern rather than filtered, so the name narrows the scan
+    return ParamQuery(query.template.replace(CUSTOMER, CUSTOMER_PATTERN))
+
+
+# One round trip: totals per type, top categories and top merchants are
+# independent sub-selects over the same payer/date skeleton, tagged by ?bucket
+SPENDING_OVERVIEW_QUERY = ParamQuery("""
+PREFIX exs: <https://static.rwpz.net/spendcast/schema#>
+PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+
+SELECT ?bucket ?label ?total ?count WHERE {
+    {
+        SELECT ("type" AS ?bucket) (STR(?transaction_type) AS ?label)
+               (SUM(?amount) AS ?total) (COUNT(?transaction) AS ?count) WHERE {
+            #PARAMS
+            ?transaction a exs:FinancialTransaction .
+            ?transaction exs:hasParticipant ?payerRole .
+            ?payerRole a exs:Payer .
+            ?payerRole exs:isPlayedBy ?account .
+            #CUSTOMER
+
+            ?transaction exs:hasMonetaryAmount ?amount_uri .
+            ?amount_uri exs:hasAmount ?amount .
+            ?transaction exs:hasTransactionDate ?date .
+            ?transaction exs:transactionType ?transaction_type .
+
+            FILTER(!BOUND(?p_start) || ?date >= ?p_start)
+            FILTER(!BOUND(?p_end) || ?date <= ?p_end)
+        }
+        GROUP BY ?transaction_type
+    }
+    UNION
+    {
+        SELECT ("category" AS ?bucket) (?category_label AS ?label)
+               (SUM(?amount) AS ?total) (COUNT(?transaction) AS ?count) WHERE {
+            #PARAMS
+            ?transaction a exs:FinancialTransaction .
+            ?transaction exs:hasParticipant ?payerRole .
+            ?payerRole a exs:Payer .
+            ?payerRole exs:isPlayedBy ?account .
+            #CUSTOMER
+
+            ?transaction exs:hasReceipt ?receipt .
+            ?receipt exs:hasLineItem ?line_item .
+            ?line_item exs:hasProduct ?product .
+            ?product exs:category ?category .
+            ?category rdfs:label ?category_label .
+
+            ?transaction exs:hasMonetaryAmount ?amount_uri .
+            ?amount_uri exs:hasAmount ?amount .
+            ?transaction exs:hasTransactionDate ?date .
+
+            FILTER(!BOUND(?p_start) || ?date >= ?p_start)
+            FILTER(!BOUND(?p_end) || ?date <= ?p_end)
+        }
+        GROUP BY ?category_label
+        ORDER BY DESC(?total)
+        LIMIT 10
+    }
+    UNION
+    {
+        SELECT ("merchant" AS ?bucket) (?merchant_name AS ?label)
+               (SUM(?amount) AS ?total) (COUNT(?transaction) AS ?count) WHERE {
+            #PARAMS
+            ?transaction a exs:FinancialTransaction .
+            ?transaction exs:hasParticipant ?payerRole .
+            ?payerRole a exs:Payer .
+            ?payerRole exs:isPlayedBy ?account .
+            #CUSTOMER
+
+            ?transaction exs:hasParticipant ?payeeRole .
+            ?payeeRole a exs:Payee .
+            ?payeeRole exs:isPlayedBy ?merchant .
+            ?merchant rdfs:label ?merchant_name .
+
+            ?transaction exs:hasMonetaryAmount ?amount_uri .
+            ?amount_uri exs:hasAmount ?amount .
+            ?transaction exs:hasTransactionDate ?date .
+            ?transaction exs:transactionType "expense" .
+
+            FILTER(!BOUND(?p_start) || ?date >= ?p_start)
+            FILTER(!BOUND(?p_end) || ?date <= ?p_end)
+        }
+        GROUP BY ?merchant_name
+        ORDER BY DESC(?total)
+        LIMIT 10
+    }
+}
+""")
+
+MONTHLY_TRENDS_QUERY = ParamQuery("""
+PREFIX exs: <https://static.rwpz.net/spendcast/schema#>
+
+SELECT ?month
+       (SUM(IF(STR(?transaction_type) = "expense", ?amount, 0)) AS ?spending)
+       (SUM(IF(STR(?transaction_type) = "income", ?amount, 0)) AS ?income)
+       (COUNT(?transaction) AS ?count) WHERE {
+    #PARAMS
+    ?transaction a exs:FinancialTransaction .
+    ?transaction exs:hasParticipant ?payerRole .
+    ?payerRole a exs:Payer .
+    ?payerRole exs:isPlayedBy ?account .
+    #CUSTOMER
+
+    ?transaction exs:hasMonetaryAmount ?amount_uri .
+    ?amount_uri exs:hasAmount ?amount .
+    ?transaction exs:hasTransactionDate ?date .
+    ?transaction exs:transactionType ?transaction_type .
+
+    FILTER(?date >= ?p_start && ?date <= ?p_end)
+    BIND(SUBSTR(STR(?date), 1, 7) AS ?month)
+}
+GROUP BY ?month
+ORDER BY ?month
+""")
+
+SPENDING_OVERVIEW_BY_CUSTOMER_QUERY = _by_customer(SPENDING_OVERVIEW_QUERY)
+MONTHLY_TRENDS_BY_CUSTOMER_QUERY = _by_customer(MONTHLY_TRENDS_QUERY)
+
+
+def get_graphdb_client() -> httpx.AsyncClient:
+    """Return the shared GraphDB client so queries reuse its connections."""
+    global _graphdb_client
+    if _graphdb_client is None:
+        _graphdb_client = httpx.AsyncClient(
+            http2=True,
+            auth=httpx.BasicAuth(settings.graphdb_user, settings.graphdb_password),
+            headers={
+                "Accept": "application/sparql-results+json",
+                "Accept-Encoding": "gzip",
+            },
+            limits=GRAPHDB_LIMITS,
+            timeout=GRAPHDB_TIMEOUT,
+        )
+    return _graphdb_client
+
+
+async def close_graphdb_client() -> None:
+    """Close the shared GraphDB client, if one was created."""
+    global _graphdb_client
+    if _graphdb_client is not None:
+        await _graphdb_client.aclose()
+        _graphdb_client = None
+
 
 async def execute_sparql_query(query: str) -> Dict[str, Any]:
     """Execute SPARQL query against GraphDB."""
     try:
-        headers = {
-            "Content-Type": "application/x-www-form-urlencoded",
-            "Accept": "application/sparql-results+json",
-        }
-        data = {"query": query}
-        auth = httpx.BasicAuth(settings.graphdb_user, settings.graphdb_password)
-
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                settings.graphdb_url,
-                headers=headers,
-                data=data,
-                auth=auth,
-                timeout=30.0,
-            )
-            response.raise_for_status()
-            return response.json()
+        # Every pattern matches explicitly typed data, so skip the inferred statements
+        response = await get_graphdb_client().post(
+            settings.graphdb_url,
+            data={
+                "query": query,
+                "timeout": str(GRAPHDB_QUERY_TIMEOUT),
+                "infer": "false",
+            },
+        )
+        response.raise_for_status()
+        # Result sets run to thousands of bindings; orjson parses them much faster
+        return orjson.loads(response.content)
 
     except httpx.HTTPStatusError as e:
         logger.error(
@@ -51,13 +355,59 @@ async def execute_sparql_query(query: str) -> Dict[str, Any]:
     except httpx.RequestError as e:
         logger.error(f"GraphDB connection error: {e}")
         raise HTTPException(status_code=500, detail="Failed to connect to GraphDB")
+    except orjson.JSONDecodeError:
+        logger.error("Failed to decode JSON response from GraphDB")
+        raise HTTPException(
+            status_code=500, detail="Invalid JSON response from GraphDB"
+        )
     except Exception as e:
         logger.error(f"Unexpected error in SPARQL query: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
+def _transaction_local_name(transaction_id: str) -> str:
+    """Return the IRI local name of a transaction ID as requested by a client."""
+    # IDs are minted from merchant names with non-ASCII characters percent-encoded
+    # (e.g. %C3%96V_Abo_...); a client that sent the escapes unquoted in the path
+    # arrives decoded, so encode them back
+    return "".join(c if c.isascii() else quote(c) for c in transaction_id)
+
+
+def _transaction_iris(transaction_id: str) -> List[str]:
+    """
+    Return the IRIs a transaction ID may be minted under.
+
+    :param transaction_id: Local name of the transaction
+    :return: Candidate IRIs, encoded for binding
+    :raises HTTPException: If the ID contains characters not allowed in an IRI
+    """
+    local_name = _transaction_local_name(transaction_id)
+    try:
+        return [
+            sparql_iri(f"https://static.rwpz.net/spendcast/{local_name}"),
+            sparql_iri(f"https://static.rwpz.net/spendcast/tx/{local_name}"),
+        ]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid transaction ID")
+
+
+async def _data_version() -> str:
+    """Return a fingerprint of the loaded transactions for list ETags."""
+    if (version := _data_version_cache.get("version")) is not None:
+        return version
+
+    async def load():
+        result = await execute_sparql_query(DATA_VERSION_QUERY)
+        version = repr(result.get("results", {}).get("bindings", []))
+        _data_version_cache.set("version", version)
+        return version
+
+    return await _analytics_inflight.run("data-version", load)
+
+
 @router.get("/", response_model=List[TransactionBasic])
 async def list_transactions(
+    response: Response,
     transaction_type: Optional[str] = Query(
         None, description="Filter by transaction type"
     ),
@@ -65,113 +415,120 @@ async def list_transactions(
     end_date: Optional[str] = Query(None, description="End date (YYYY-MM-DD)"),
     limit: int = Query(50, ge=1, le=500),
     offset: int = Query(0, ge=0),
+    if_none_match: Optional[str] = Header(None),
 ):
     """Get list of transactions with optional filters."""
-    filters = []
-
-    if transaction_type:
-        filters.append(f'FILTER(?transaction_type = "{transaction_type}")')
-
-    if start_date and end_date:
-        filters.append(
-            f'FILTER(?date >= "{start_date}"^^xsd:date && ?date <= "{end_date}"^^xsd:date)'
-        )
-    elif start_date:
-        filters.append(f'FILTER(?date >= "{start_date}"^^xsd:date)')
-    elif end_date:
-        filters.append(f'FILTER(?date <= "{end_date}"^^xsd:date)')
-
-    filter_clause = " ".join(filters)
-
-    query = f"""
-    PREFIX exs: <https://static.rwpz.net/spendcast/schema#>
-    PREFIX ex: <https://static.rwpz.net/spendcast/>
-    
-    SELECT ?transaction ?amount ?date ?transaction_type WHERE {{
-        ?transaction a exs:FinancialTransaction .
-        ?transaction exs:hasMonetaryAmount ?amount_uri .
-        ?amount_uri exs:hasAmount ?amount .
-        ?transaction exs:hasTransactionDate ?date .
-        
-        OPTIONAL {{ ?transaction exs:transactionType ?transaction_type }}
-        
-        {filter_clause}
-    }}
-    ORDER BY DESC(?date)
-    LIMIT {limit}
-    OFFSET {offset}
-    """
+    # The list only changes when data is loaded, so polls revalidate by ETag
+    # without running the list query
+    version = await _data_version()
+    key = (transaction_type, start_date, end_date, limit, offset, version)
+    digest = hashlib.blake2b(repr(key).encode(), digest_size=8).hexdigest()
+    etag = f'W/"{digest}"'
+    headers = {"Cache-Control": TRANSACTIONS_CACHE_CONTROL, "ETag": etag}
+    if if_none_match:
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        if etag.removeprefix("W/") in tags or "*" in tags:
+            return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+
+    query = LIST_TRANSACTIONS_QUERY.bind(
+        type=sparql_literal(transaction_type) if transaction_type else None,
+        start=sparql_literal(start_date, XSD_DATE) if start_date else None,
+        end=sparql_literal(end_date, XSD_DATE) if end_date else None,
+    )
+    query += f"LIMIT {limit}\nOFFSET {offset}\n"
 
     result = await execute_sparql_query(query)
-    transactions = []
-
-    for binding in result.get("results", {}).get("bindings", []):
-        transaction = TransactionBasic(
-            transaction_id=binding["transaction"]["value"].split("/")[-1],
-            amount=float(binding["amount"]["value"]),
-            date=binding["date"]["value"],
-            status="settled",
-            transaction_type=binding.get("transaction_type", {}).get("value"),
-        )
-        transactions.append(transaction)
+    # Rows are validated in one pass; amounts stay strings for Pydantic to coerce
+    rows = [
+        {
+            "transaction_id": binding["transaction"]["value"].rsplit("/", 1)[-1],
+            "amount": binding["amount"]["value"],
+            "date": binding["date"]["value"],
+            "status": "settled",
+            "transaction_type": binding.get("transaction_type", {}).get("value"),
+        }
+        for binding in result.get("results", {}).get("bindings", [])
+    ]
 
-    return transactions
+    return _TRANSACTIONS_ADAPTER.validate_python(rows)
 
 
 @router.get("/{transaction_id}", response_model=TransactionDetails)
 async def get_transaction_details(transaction_id: str):
     """Get detailed information about a specific transaction."""
-    query = f"""
-    PREFIX exs: <https://static.rwpz.net/spendcast/schema#>
-    PREFIX ex: <https://static.rwpz.net/spendcast/>
-    PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
-    
-    SELECT ?transaction ?amount ?currency ?date ?value_date ?transaction_type 
-           ?payer_name ?payee_name ?merchant_name ?receipt WHERE {{
-        VALUES ?transaction {{ ex:{transaction_id} <https://static.rwpz.net/spendcast/tx/{transaction_id}> }}
-        
-        ?transaction a exs:FinancialTransaction .
-        ?transaction exs:hasMonetaryAmount ?amount_uri .
-        ?amount_uri exs:hasAmount ?amount .
-        ?amount_uri exs:hasCurrency ?currency .
-        ?transaction exs:hasTransactionDate ?date .
-        
-        OPTIONAL {{ ?transaction exs:valueDate ?value_date }}
-        OPTIONAL {{ ?transaction exs:transactionType ?transaction_type }}
-        OPTIONAL {{ ?transaction exs:hasReceipt ?receipt }}
-        
-        OPTIONAL {{
-            ?transaction exs:hasParticipant ?payerRole .
-            ?payerRole a exs:Payer .
-            ?payerRole exs:isPlayedBy ?payer .
-            ?payer exs:hasName ?payer_name .
-        }}
-        
-        OPTIONAL {{
-            ?transaction exs:hasParticipant ?payeeRole .
-            ?payeeRole a exs:Payee .
-            ?payeeRole exs:isPlayedBy ?payee .
-            ?payee exs:hasName ?payee_name .
-        }}
-        
-        OPTIONAL {{
-            ?transaction exs:hasParticipant ?payeeRole .
-            ?payeeRole a exs:Payee .
-            ?payeeRole exs:isPlayedBy ?merchant .
-            ?merchant rdfs:label ?merchant_name .
-        }}
-    }}
-    """
+    query = TRANSACTION_DETAILS_QUERY.bind(
+        transaction=_transaction_iris(transaction_id)
+    )
 
     result = await execute_sparql_query(query)
-    bindings = result.get("results", {}).get("bindings", [])
+    transactions = _group_transaction_rows(result)
 
-    if not bindings:
+    if not transactions:
         raise HTTPException(status_code=404, detail="Transaction not found")
 
-    data = bindings[0]
+    return _transaction_details(next(iter(transactions.values())))
+
+
+@router.post("/batch", response_model=List[TransactionDetails])
+async def get_transactions_batch(request: TransactionBatchRequest):
+    """Get details for several transactions in one query; unknown IDs are skipped."""
+    # Rows come back keyed by local name, so look them up by the encoded ID
+    local_names = []
+    iris = []
+    for local_name in dict.fromkeys(map(_transaction_local_name, request.ids)):
+        try:
+            iris += _transaction_iris(local_name)
+        except HTTPException:
+            continue  # Can't name a transaction, so skipped like unknown IDs
+        local_names.append(local_name)
+
+    if not iris:
+        return []
+
+    query = TRANSACTION_DETAILS_QUERY.bind(transaction=iris)
+
+    result = await execute_sparql_query(query)
+    transactions = _group_transaction_rows(result)
+
+    return [
+        _transaction_details(transactions[name])
+        for name in local_names
+        if name in transactions
+    ]
+
+
+def _group_transaction_rows(
+    result: Dict[str, Any],
+) -> Dict[str, List[Dict[str, Any]]]:
+    """Group transaction details bindings (one per participant role) by ID."""
+    transactions: Dict[str, List[Dict[str, Any]]] = {}
+    for binding in result.get("results", {}).get("bindings", []):
+        transaction_id = binding["transaction"]["value"].rsplit("/", 1)[-1]
+        transactions.setdefault(transaction_id, []).append(binding)
+    return transactions
 
-    transaction_details = TransactionDetails(
+
+def _transaction_details(rows: List[Dict[str, Any]]) -> TransactionDetails:
+    """Map a transaction's details bindings to the API model."""
+    data = rows[0]
+
+    # Payers are named by exs:hasName; payees by exs:hasName and, as merchants,
+    # by rdfs:label
+    names = {}
+    for row in rows:
+        role_type = row.get("role_type", {}).get("value")
+        name = row.get("participant_name", {}).get("value")
+        label = row.get("participant_label", {}).get("value")
+        if role_type == PAYER_ROLE and name:
+            names.setdefault("payer_name", name)
+        elif role_type == PAYEE_ROLE:
+            if name:
+                names.setdefault("payee_name", name)
+            if label:
+                names.setdefault("merchant", label)
+
+    return TransactionDetails(
         transaction_id=data["transaction"]["value"].split("/")[-1],
         amount=float(data["amount"]["value"]),
         currency=data["currency"]["value"].split("/")[-1],
@@ -179,31 +536,21 @@ async def get_transaction_details(transaction_id: str):
         value_date=data.get("value_date", {}).get("value"),
         status="settled",
         transaction_type=data.get("transaction_type", {}).get("value"),
-        payer_name=data.get("payer_name", {}).get("value"),
-        payee_name=data.get("payee_name", {}).get("value"),
-        merchant=data.get("merchant_name", {}).get("value"),
         receipt_id=data.get("receipt", {}).get("value", "").split("/")[-1]
         if data.get("receipt")
         else None,
         has_receipt=bool(data.get("receipt")),
+        **names,
     )
 
-    return transaction_details
-
 
 @router.get("/{transaction_id}/receipt", response_model=ReceiptDetails)
 async def get_transaction_receipt(transaction_id: str):
     """Get receipt details for a transaction."""
     # First check if transaction has a receipt
-    receipt_query = f"""
-    PREFIX exs: <https://static.rwpz.net/spendcast/schema#>
-    PREFIX ex: <https://static.rwpz.net/spendcast/>
-    
-    SELECT ?receipt WHERE {{
-        VALUES ?transaction {{ ex:{transaction_id} <https://static.rwpz.net/spendcast/tx/{transaction_id}> }}
-        ?transaction exs:hasReceipt ?receipt .
-    }}
-    """
+    receipt_query = TRANSACTION_RECEIPT_QUERY.bind(
+        transaction=_transaction_iris(transaction_id)
+    )
 
     receipt_result = await execute_sparql_query(receipt_query)
     receipt_bindings = receipt_result.get("results", {}).get("bindings", [])
@@ -216,82 +563,36 @@ async def get_transaction_receipt(transaction_id: str):
     receipt_uri = receipt_bindings[0]["receipt"]["value"]
     receipt_id = receipt_uri.split("/")[-1]
 
-    # Get receipt details
-    receipt_details_query = f"""
-    PREFIX exs: <https://static.rwpz.net/spendcast/schema#>
-    PREFIX ex: <https://static.rwpz.net/spendcast/>
-    PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
-    
-    SELECT ?receipt ?total_amount ?receipt_date ?receipt_time ?payment_method 
-           ?merchant ?vat_number WHERE {{
-        VALUES ?receipt {{ <{receipt_uri}> }}
-        
-        OPTIONAL {{ ?receipt exs:hasTotalAmount ?total_amount_uri . ?total_amount_uri exs:hasAmount ?total_amount }}
-        OPTIONAL {{ ?receipt exs:receiptDate ?receipt_date }}
-        OPTIONAL {{ ?receipt exs:receiptTime ?receipt_time }}
-        OPTIONAL {{ ?receipt exs:paymentMethod ?payment_method }}
-        OPTIONAL {{ ?receipt exs:vatNumber ?vat_number }}
-        
-        OPTIONAL {{
-            ?receipt exs:hasParticipant ?merchantRole .
-            ?merchantRole exs:isPlayedBy ?merchant .
-            ?merchant rdfs:label ?merchant .
-        }}
-    }}
-    """
+    # Get receipt details and line items
+    receipt_term = sparql_iri(receipt_uri)
+    receipt_details_query = RECEIPT_DETAILS_QUERY.bind(receipt=receipt_term)
+    items_query = RECEIPT_ITEMS_QUERY.bind(receipt=receipt_term)
 
-    details_result = await execute_sparql_query(receipt_details_query)
+    # Details and line items both hang off the receipt, so fetch them together
+    details_result, items_result = await asyncio.gather(
+        execute_sparql_query(receipt_details_query),
+        execute_sparql_query(items_query),
+    )
     details_bindings = details_result.get("results", {}).get("bindings", [])
 
     if not details_bindings:
         raise HTTPException(status_code=404, detail="Receipt details not found")
 
     receipt_data = details_bindings[0]
-
-    # Get receipt line items
-    items_query = f"""
-    PREFIX exs: <https://static.rwpz.net/spendcast/schema#>
-    PREFIX ex: <https://static.rwpz.net/spendcast/>
-    PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
-    
-    SELECT ?item_description ?quantity ?unit_price ?line_subtotal 
-           ?product_name ?category_label WHERE {{
-        VALUES ?receipt {{ <{receipt_uri}> }}
-        
-        ?receipt exs:hasLineItem ?line_item .
-        
-        OPTIONAL {{ ?line_item exs:itemDescription ?item_description }}
-        OPTIONAL {{ ?line_item exs:quantity ?quantity }}
-        OPTIONAL {{ ?line_item exs:unitPrice ?unit_price }}
-        OPTIONAL {{ ?line_item exs:lineSubtotal ?line_subtotal }}
-        
-        OPTIONAL {{
-            ?line_item exs:hasProduct ?product .
-            ?product exs:name ?product_name .
-            OPTIONAL {{
-                ?product exs:category ?category .
-                ?category rdfs:label ?category_label .
-            }}
-        }}
-    }}
-    ORDER BY ?item_description
-    """
-
-    items_result = await execute_sparql_query(items_query)
-    receipt_items = []
-
-    for binding in items_result.get("results", {}).get("bindings", []):
-        item = ReceiptItem(
-            item_description=binding.get("item_description", {}).get(
+    # Plain rows, validated together with the receipt below
+    receipt_items = [
+        {
+            "item_description": binding.get("item_description", {}).get(
                 "value", "Unknown item"
             ),
-            quantity=int(binding.get("quantity", {}).get("value", 1)),
-            unit_price=float(binding.get("unit_price", {}).get("value", 0.0)),
-            line_subtotal=float(binding.get("line_subtotal", {}).get("value", 0.0)),
-            product_name=binding.get("product_name", {}).get("value"),
-            category=binding.get("category_label", {}).get("value"),
-        )
-        receipt_items.append(item)
+            "quantity": binding.get("quantity", {}).get("value", 1),
+            "unit_price": binding.get("unit_price", {}).get("value", 0.0),
+            "line_subtotal": binding.get("line_subtotal", {}).get("value", 0.0),
+            "product_name": binding.get("product_name", {}).get("value"),
+            "category": binding.get("category_label", {}).get("value"),
+        }
+        for binding in items_result.get("results", {}).get("bindings", [])
+    ]
 
     receipt_details = ReceiptDetails(
         receipt_id=receipt_id,
@@ -307,6 +608,36 @@ async def get_transaction_receipt(transaction_id: str):
     return receipt_details
 
 
+@router.post("/analytics/cache/invalidate")
+async def invalidate_analytics_cache():
+    """Drop cached analytics and the list data version, e.g. after a data load."""
+    _data_version_cache.clear()
+    invalidated = len(_analytics_cache)
+    _analytics_cache.clear()
+    return {"invalidated": invalidated}
+
+
+async def _cached_analytics(
+    key: Tuple[Any, ...], compute: Callable[[], Awaitable[Any]]
+) -> Any:
+    """
+    Return a cached analytics result, computing it at most once per key at a time.
+
+    :param key: Endpoint name followed by its filter values
+    :param compute: Coroutine function producing the result on a miss
+    :return: The analytics result
+    """
+    if (result := _analytics_cache.get(key)) is not None:
+        return result
+
+    async def load():
+        result = await compute()
+        _analytics_cache.set(key, result)
+        return result
+
+    return await _analytics_inflight.run(key, load)
+
+
 @router.get("/analytics/overview")
 async def get_spending_overview(
     start_date: Optional[str] = Query(None, description="Start date (YYYY-MM-DD)"),
@@ -314,152 +645,58 @@ async def get_spending_overview(
     customer_name: Optional[str] = Query(None, description="Filter by customer name"),
 ):
     """Get overall spending analytics."""
-    # Build filters
-    filters = []
-    customer_filter = ""
+    return await _cached_analytics(
+        ("overview", start_date, end_date, customer_name),
+        lambda: _compute_spending_overview(start_date, end_date, customer_name),
+    )
 
-    if start_date and end_date:
-        filters.append(
-            f'FILTER(?date >= "{start_date}"^^xsd:date && ?date <= "{end_date}"^^xsd:date)'
-        )
-    elif start_date:
-        filters.append(f'FILTER(?date >= "{start_date}"^^xsd:date)')
-    elif end_date:
-        filters.append(f'FILTER(?date <= "{end_date}"^^xsd:date)')
 
+async def _compute_spending_overview(
+    start_date: Optional[str], end_date: Optional[str], customer_name: Optional[str]
+) -> SpendingAnalytics:
+    """Aggregate spending, income and top categories/merchants from GraphDB."""
+    params = {
+        "start": sparql_literal(start_date, XSD_DATE) if start_date else None,
+        "end": sparql_literal(end_date, XSD_DATE) if end_date else None,
+    }
+    overview_query = SPENDING_OVERVIEW_QUERY
     if customer_name:
-        customer_filter = f"""
-        ?account exs:hasAccountHolder ?holderRole .
-        ?holderRole exs:isPlayedBy ?customer .
-        ?customer exs:hasName "{customer_name}" .
-        """
-
-    filter_clause = " ".join(filters)
-
-    # Get spending by transaction type
-    overview_query = f"""
-    PREFIX exs: <https://static.rwpz.net/spendcast/schema#>
-    PREFIX ex: <https://static.rwpz.net/spendcast/>
-    
-    SELECT ?transaction_type (SUM(?amount) AS ?total) (COUNT(?transaction) AS ?count) WHERE {{
-        ?transaction a exs:FinancialTransaction .
-        ?transaction exs:hasParticipant ?payerRole .
-        ?payerRole a exs:Payer .
-        ?payerRole exs:isPlayedBy ?account .
-        
-        {customer_filter}
-        
-        ?transaction exs:hasMonetaryAmount ?amount_uri .
-        ?amount_uri exs:hasAmount ?amount .
-        ?transaction exs:hasTransactionDate ?date .
-        ?transaction exs:transactionType ?transaction_type .
-        
-        {filter_clause}
-    }}
-    GROUP BY ?transaction_type
-    """
+        overview_query = SPENDING_OVERVIEW_BY_CUSTOMER_QUERY
+        params["customer"] = sparql_literal(customer_name)
+    overview_query = overview_query.bind(**params)
 
-    overview_result = await execute_sparql_query(overview_query)
+    result = await execute_sparql_query(overview_query)
 
     total_spending = 0.0
     total_income = 0.0
     transaction_count = 0
+    top_categories = []
+    top_merchants = []
 
-    for binding in overview_result.get("results", {}).get("bindings", []):
+    for binding in result.get("results", {}).get("bindings", []):
+        bucket = binding["bucket"]["value"]
+        label = binding["label"]["value"]
         amount = float(binding["total"]["value"])
         count = int(binding["count"]["value"])
-        trans_type = binding["transaction_type"]["value"]
-
-        transaction_count += count
-
-        if trans_type == "expense":
-            total_spending += amount
-        elif trans_type == "income":
-            total_income += amount
-
-    # Get top categories
-    categories_query = f"""
-    PREFIX exs: <https://static.rwpz.net/spendcast/schema#>
-    PREFIX ex: <https://static.rwpz.net/spendcast/>
-    PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
-    
-    SELECT ?category_label (SUM(?amount) AS ?total_spent) (COUNT(?transaction) AS ?transaction_count) WHERE {{
-        ?transaction a exs:FinancialTransaction .
-        ?transaction exs:hasParticipant ?payerRole .
-        ?payerRole a exs:Payer .
-        ?payerRole exs:isPlayedBy ?account .
-        
-        {customer_filter}
-        
-        ?transaction exs:hasReceipt ?receipt .
-        ?receipt exs:hasLineItem ?line_item .
-        ?line_item exs:hasProduct ?product .
-        ?product exs:category ?category .
-        ?category rdfs:label ?category_label .
-        
-        ?transaction exs:hasMonetaryAmount ?amount_uri .
-        ?amount_uri exs:hasAmount ?amount .
-        ?transaction exs:hasTransactionDate ?date .
-        
-        {filter_clause}
-    }}
-    GROUP BY ?category_label
-    ORDER BY DESC(?total_spent)
-    LIMIT 10
-    """
-
-    categories_result = await execute_sparql_query(categories_query)
-    top_categories = []
-
-    for binding in categories_result.get("results", {}).get("bindings", []):
-        category = {
-            "category": binding["category_label"]["value"],
-            "total_spent": float(binding["total_spent"]["value"]),
-            "transaction_count": int(binding["transaction_count"]["value"]),
-        }
-        top_categories.append(category)
-
-    # Get top merchants
-    merchants_query = f"""
-    PREFIX exs: <https://static.rwpz.net/spendcast/schema#>
-    PREFIX ex: <https://static.rwpz.net/spendcast/>
-    PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
-    
-    SELECT ?merchant_name (SUM(?amount) AS ?total_spent) (COUNT(?transaction) AS ?transaction_count) WHERE {{
-        ?transaction a exs:FinancialTransaction .
-        ?transaction exs:hasParticipant ?payerRole .
-        ?payerRole a exs:Payer .
-        ?payerRole exs:isPlayedBy ?account .
-        
-        {customer_filter}
-        
-        ?transaction exs:hasParticipant ?payeeRole .
-        ?payeeRole a exs:Payee .
-        ?payeeRole exs:isPlayedBy ?merchant .
-        ?merchant rdfs:label ?merchant_name .
-        
-        ?transaction exs:hasMonetaryAmount ?amount_uri .
-        ?amount_uri exs:hasAmount ?amount .
-        ?transaction exs:hasTransactionDate ?date .
-        ?transaction exs:transactionType "expense" .
-        
-        {filter_clause}
-    }}
-    GROUP BY ?merchant_name
-    ORDER BY DESC(?total_spent)
-    LIMIT 10
-    """
 
-    merchants_result = await execute_sparql_query(merchants_query)
-    top_merchants = []
+        if bucket == "type":
+            transaction_count += count
+            if label == "expense":
+                total_spending += amount
+            elif label == "income":
+                total_income += amount
+        elif bucket == "category":
+            top_categories.append(
+                {"category": label, "total_spent": amount, "transaction_count": count}
+            )
+        elif bucket == "merchant":
+            top_merchants.append(
+                {"merchant": label, "total_spent": amount, "transaction_count": count}
+            )
 
-    for binding in merchants_result.get("results", {}).get("bindings", []):
-        merchant = {
-            "merchant": binding["merchant_name"]["value"],
-            "total_spent": float(binding["total_spent"]["value"]),
-            "transaction_count": int(binding["transaction_count"]["value"]),
-        }
-        top_merchants.append(merchant)
+    # UNION doesn't preserve the sub-selects' ordering
+    top_categories.sort(key=itemgetter("total_spent"), reverse=True)
+    top_merchants.sort(key=itemgetter("total_spent"), reverse=True)
 
     analytics = SpendingAnalytics(
         total_spending=total_spending,
@@ -480,77 +717,43 @@ async def get_monthly_trends(
     customer_name: Optional[str] = Query(None, description="Filter by customer name"),
 ):
     """Get monthly spending trends."""
-    customer_filter = ""
+    return await _cached_analytics(
+        ("monthly-trends", year, customer_name),
+        lambda: _compute_monthly_trends(year, customer_name),
+    )
+
+
+async def _compute_monthly_trends(
+    year: int, customer_name: Optional[str]
+) -> Dict[str, Any]:
+    """Group a year's spending and income by month from GraphDB."""
+    params = {
+        "start": sparql_literal(f"{year}-01-01", XSD_DATE),
+        "end": sparql_literal(f"{year}-12-31", XSD_DATE),
+    }
+    query = MONTHLY_TRENDS_QUERY
     if customer_name:
-        customer_filter = f"""
-        ?account exs:hasAccountHolder ?holderRole .
-        ?holderRole exs:isPlayedBy ?customer .
-        ?customer exs:hasName "{customer_name}" .
-        """
-
-    query = f"""
-    PREFIX exs: <https://static.rwpz.net/spendcast/schema#>
-    PREFIX ex: <https://static.rwpz.net/spendcast/>
-    
-    SELECT ?month ?transaction_type (SUM(?amount) AS ?total) (COUNT(?transaction) AS ?count) WHERE {{
-        ?transaction a exs:FinancialTransaction .
-        ?transaction exs:hasParticipant ?payerRole .
-        ?payerRole a exs:Payer .
-        ?payerRole exs:isPlayedBy ?account .
-        
-        {customer_filter}
-        
-        ?transaction exs:hasMonetaryAmount ?amount_uri .
-        ?amount_uri exs:hasAmount ?amount .
-        ?transaction exs:hasTransactionDate ?date .
-        ?transaction exs:transactionType ?transaction_type .
-        
-        FILTER(?date >= "{year}-01-01"^^xsd:date && ?date <= "{year}-12-31"^^xsd:date)
-        BIND(CONCAT(STR(YEAR(?date)), "-", IF(MONTH(?date) < 10, "0", ""), STR(MONTH(?date))) AS ?month)
-    }}
-    GROUP BY ?month ?transaction_type
-    ORDER BY ?month ?transaction_type
-    """
+        query = MONTHLY_TRENDS_BY_CUSTOMER_QUERY
+        params["customer"] = sparql_literal(customer_name)
+    query = query.bind(**params)
 
     result = await execute_sparql_query(query)
 
-    # Organize data by month
-    monthly_data = {}
-
+    # One row per month, already aggregated and ordered by GraphDB
+    trends = []
     for binding in result.get("results", {}).get("bindings", []):
-        # Safely get required values, skip if not present
-        if "month" not in binding or "transaction_type" not in binding:
-            continue
-
-        month = binding["month"]["value"]
-        trans_type = binding["transaction_type"]["value"]
-        amount = float(binding["total"]["value"])
-        count = int(binding["count"]["value"])
-
-        if month not in monthly_data:
-            monthly_data[month] = {
-                "month": month,
-                "spending": 0.0,
-                "income": 0.0,
-                "transaction_count": 0,
-                "net": 0.0,
+        spending = float(binding["spending"]["value"])
+        income = float(binding["income"]["value"])
+        trends.append(
+            {
+                "month": binding["month"]["value"],
+                "spending": spending,
+                "income": income,
+                "transaction_count": int(binding["count"]["value"]),
+                "net": income - spending,
             }
-
-        monthly_data[month]["transaction_count"] += count
-
-        if trans_type == "expense":
-            monthly_data[month]["spending"] += amount
-        elif trans_type == "income":
-            monthly_data[month]["income"] += amount
-
-        monthly_data[month]["net"] = (
-            monthly_data[month]["income"] - monthly_data[month]["spending"]
         )
 
-    # Convert to list and sort
-    trends = list(monthly_data.values())
-    trends.sort(key=lambda x: x["month"])
-
     return {
         "year": year,
         "customer_name": customer_name,
@@ -0,0 +1,66 @@
+"""Parameterized SPARQL queries.
+
+Queries are constant templates whose ``?p_<name>`` variables are bound by a VALUES
+block, so user input is always an escaped RDF term and never query syntax.
+"""
+
+import re
+from itertools import product
+from typing import Optional, Sequence, Union
+
+XSD_DATE = "http://www.w3.org/2001/XMLSchema#date"
+
+# Marks where a group pattern receives the VALUES block; a comment, so templates
+# stay valid SPARQL on their own
+PARAMS = "#PARAMS"
+
+_LITERAL_ESCAPES = str.maketrans({"\\": "\\\\", '"': '\\"', "\n": "\\n", "\r": "\\r"})
+_IRI_INVALID_RE = re.compile(r'[\x00-\x20<>"{}|^`\\]')
+
+
+def sparql_literal(value: str, datatype: Optional[str] = None) -> str:
+    """
+    Encode a string as a SPARQL literal.
+
+    :param value: The literal's lexical form
+    :param datatype: Optional datatype IRI, e.g. XSD_DATE
+    :return: The escaped literal, typed when a datatype is given
+    """
+    literal = f'"{value.translate(_LITERAL_ESCAPES)}"'
+    return f"{literal}^^<{datatype}>" if datatype else literal
+
+
+def sparql_iri(iri: str) -> str:
+    """
+    Encode an IRI as a SPARQL IRI reference.
+
+    :param iri: Absolute IRI
+    :return: The IRI in angle brackets
+    :raises ValueError: If the IRI contains characters not allowed in an IRIREF
+    """
+    if _IRI_INVALID_RE.search(iri):
+        raise ValueError(f"Invalid IRI: {iri!r}")
+    return f"<{iri}>"
+
+
+class ParamQuery:
+    """A constant SPARQL template whose ``?p_<name>`` parameters are bound on use."""
+
+    def __init__(self, template: str):
+        self.template = template
+
+    def bind(self, **params: Union[Optional[str], Sequence[str]]) -> str:
+        """
+        Bind parameters into every ``#PARAMS`` marker of the template.
+
+        :param params: Encoded RDF terms (see sparql_literal/sparql_iri) by name;
+            None leaves the parameter unbound and a list binds each alternative
+        :return: The query text
+        """
+        names = " ".join(f"?p_{name}" for name in params)
+        alternatives = (
+            terms if isinstance(terms, (list, tuple)) else [terms or "UNDEF"]
+            for terms in params.values()
+        )
+        rows = " ".join(f"({' '.join(row)})" for row in product(*alternatives))
+        return self.template.replace(PARAMS, f"VALUES ({names}) {{ {rows} }}")
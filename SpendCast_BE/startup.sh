@@ -1,4 +1,4 @@
-uvicorn main:app --reload
+uvicorn main:app --reload --loop uvloop --http httptools
 set -a
 source .env
 set +a
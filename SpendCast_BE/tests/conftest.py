@@ -24,6 +24,26 @@ def test_settings():
     )
 
 
+@pytest.fixture(autouse=True)
+def no_cache_warming(monkeypatch):
+    """Keep app startup from calling Open Food Facts in tests."""
+    from src.config import settings
+
+    monkeypatch.setattr(settings, "warm_cache", False)
+
+
+@pytest.fixture(autouse=True)
+def fresh_mcp_session(monkeypatch):
+    """Give every test its own MCP session so mocked tools don't leak."""
+    from src.routers import langgraph_agent
+
+    monkeypatch.setattr(
+        langgraph_agent,
+        "mcp_session",
+        langgraph_agent.MCPSessionManager(langgraph_agent.server_params),
+    )
+
+
 @pytest.fixture
 def client():
     """FastAPI test client fixture."""
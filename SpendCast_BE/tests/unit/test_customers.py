@@ -98,6 +98,11 @@ async def test_get_customer_details_success(
         assert data["account_count"] == 2
 
         assert mock_query.call_count == 2
+        # The name is bound into the constant templates, once per #PARAMS marker
+        for call, bindings in zip(mock_query.call_args_list, (1, 2)):
+            query = call[0][0]
+            assert query.count('VALUES (?p_name) { ("John Doe") }') == bindings
+            assert "#PARAMS" not in query
 
 
 @pytest.mark.unit
@@ -306,3 +311,67 @@ async def test_execute_sparql_query_connection_error():
 
         assert exc_info.value.status_code == 500
         assert "Failed to connect to GraphDB" in str(exc_info.value.detail)
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_get_customer_details_rejects_unsafe_name(client):
+    """Test that names with SPARQL metacharacters are rejected before querying."""
+    with patch(
+        "src.routers.customers.execute_sparql_query", new_callable=AsyncMock
+    ) as mock_query:
+        response = client.get('/api/v1/customers/Evil%22%20%7D%20%23')
+
+        assert response.status_code == 422
+        mock_query.assert_not_called()
+
+
+@pytest.mark.unit
+def test_sparql_literal():
+    """Test escaping of backslashes and quotes for SPARQL string literals."""
+    from src.sparql import sparql_literal
+
+    assert sparql_literal("John Doe") == '"John Doe"'
+    assert sparql_literal('a"b') == '"a\\"b"'
+    assert sparql_literal("a\\b") == '"a\\\\b"'
+
+
+@pytest.mark.unit
+def test_uri_local_name():
+    """Test extracting the local name from slash and hash URIs."""
+    from src.routers.customers import uri_local_name
+
+    assert uri_local_name("https://static.rwpz.net/spendcast/account1") == "account1"
+    assert (
+        uri_local_name("https://static.rwpz.net/spendcast/schema#CheckingAccount")
+        == "CheckingAccount"
+    )
+    assert uri_local_name("CHF") == "CHF"
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_get_customer_details_uses_sparql_total(
+    client, mock_customer_details_response, mock_customer_accounts_response
+):
+    """Test that the total computed by GraphDB is used instead of summing rows."""
+    accounts_response = {
+        "results": {
+            "bindings": [{"total_balance": {"value": "6500.5"}}]
+            + mock_customer_accounts_response["results"]["bindings"]
+        }
+    }
+
+    with patch(
+        "src.routers.customers.execute_sparql_query", new_callable=AsyncMock
+    ) as mock_query:
+        mock_query.side_effect = [mock_customer_details_response, accounts_response]
+
+        response = client.get("/api/v1/customers/John%20Doe")
+
+        assert response.status_code == 200
+        data = response.json()
+
+        assert data["total_balance"] == 6500.5
+        assert data["account_count"] == 2
+        assert "SUM(?sum_balance)" in mock_query.call_args_list[1][0][0]
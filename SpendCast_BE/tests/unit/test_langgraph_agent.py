@@ -1,11 +1,16 @@
 """Unit tests for the LangGraph agent router."""
 
+import asyncio
+import base64
 import json
-from unittest.mock import AsyncMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 
+from fastapi.sse import ServerSentEvent
 from fastapi.testclient import TestClient
+from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage
 
 from main import app
+from src.routers import langgraph_agent
 
 client = TestClient(app)
 
@@ -29,13 +34,338 @@ def test_chat_with_agent_without_audio():
         assert response_json["audio_content"] is None
 
 
+def test_chat_with_agent_warms_up_agent_during_transcription():
+    """Test that audio chats start the agent while the audio is transcribed."""
+    with (
+        patch(
+            "src.routers.langgraph_agent.transcribe_audio", new_callable=AsyncMock
+        ) as mock_transcribe,
+        patch(
+            "src.routers.langgraph_agent.call_agent", new_callable=AsyncMock
+        ) as mock_call_agent,
+        patch.object(
+            langgraph_agent.mcp_session, "get_agent", new_callable=AsyncMock
+        ) as mock_get_agent,
+    ):
+        mock_transcribe.return_value = "Transcribed question"
+        mock_call_agent.return_value = "This is a test response."
+
+        response = client.post(
+            "/api/v1/agent/chat",
+            json={"message": "YXVkaW8=", "include_audio": True},
+        )
+
+        assert response.status_code == 200
+        assert response.json()["response"] == "This is a test response."
+        mock_transcribe.assert_awaited_once_with("YXVkaW8=")
+        mock_get_agent.assert_awaited_once_with("chat")
+        mock_call_agent.assert_awaited_once_with("Transcribed question")
+
+
+def test_openai_client_is_shared():
+    """Test that audio helpers reuse one OpenAI client until it is closed."""
+    with patch.object(langgraph_agent, "_openai_client", None):
+        client_a = langgraph_agent.get_openai_client()
+        assert langgraph_agent.get_openai_client() is client_a
+
+        asyncio.run(langgraph_agent.close_openai_client())
+        assert langgraph_agent._openai_client is None
+
+
+def test_chat_audio_stream():
+    """Test the /chat/audio-stream endpoint streams MP3 chunks."""
+
+    async def mock_stream_audio(text):
+        yield b"ID3"
+        yield b"frame"
+
+    with (
+        patch(
+            "src.routers.langgraph_agent.call_agent", new_callable=AsyncMock
+        ) as mock_call_agent,
+        patch(
+            "src.routers.langgraph_agent.stream_audio", side_effect=mock_stream_audio
+        ) as mock_stream,
+    ):
+        mock_call_agent.return_value = "This is a test response."
+
+        response = client.post(
+            "/api/v1/agent/chat/audio-stream", json={"message": "Hello"}
+        )
+
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "audio/mpeg"
+        assert response.content == b"ID3frame"
+        mock_stream.assert_called_once_with("This is a test response.")
+
+
+def test_chat_audio_stream_tts_error():
+    """Test that a failing TTS request is reported before streaming starts."""
+
+    async def failing_stream_audio(text):
+        raise RuntimeError("TTS down")
+        yield b""
+
+    with (
+        patch(
+            "src.routers.langgraph_agent.call_agent", new_callable=AsyncMock
+        ) as mock_call_agent,
+        patch(
+            "src.routers.langgraph_agent.stream_audio",
+            side_effect=failing_stream_audio,
+        ),
+    ):
+        mock_call_agent.return_value = "This is a test response."
+
+        response = client.post(
+            "/api/v1/agent/chat/audio-stream", json={"message": "Hello"}
+        )
+
+        assert response.status_code == 500
+        assert "TTS down" in response.json()["detail"]
+
+
+def test_split_tts_segments():
+    """Test that podcast text is packed into sentence-aligned segments."""
+    text = "First sentence. Second one!\n\nA new paragraph? " + "Long " * 30 + "end."
+
+    segments = langgraph_agent.split_tts_segments(text, max_chars=40)
+
+    assert segments[0] == "First sentence. Second one!"
+    assert segments[1] == "A new paragraph?"
+    assert segments[2].startswith("Long Long")
+    assert langgraph_agent.split_tts_segments("  \n\n ") == []
+
+
+def test_podcast_synthesizes_segments_concurrently():
+    """Test that the podcast joins per-segment audio in script order."""
+
+    async def fake_generate_audio(segment):
+        # Finish the first segment last to prove ordering survives gather
+        await asyncio.sleep(0.01 if segment.startswith("Hello") else 0)
+        return segment[:5].encode()
+
+    script = "Hello listeners. " + "Money talk. " * 100
+
+    with (
+        patch(
+            "src.routers.langgraph_agent.generate_podcast_text",
+            new_callable=AsyncMock,
+        ) as mock_text,
+        patch(
+            "src.routers.langgraph_agent.generate_audio",
+            side_effect=fake_generate_audio,
+        ) as mock_audio,
+    ):
+        mock_text.return_value = script
+
+        response = client.get("/api/v1/agent/podcast")
+
+        assert response.status_code == 200
+        segments = langgraph_agent.split_tts_segments(script)
+        assert len(segments) > 1
+        assert mock_audio.call_count == len(segments)
+        audio = base64.b64decode(response.json()["response"])
+        assert audio == b"".join(segment[:5].encode() for segment in segments)
+
+
+def test_chat_audio_upload():
+    """Test the /chat/audio endpoint transcribes a multipart upload."""
+    with (
+        patch(
+            "src.routers.langgraph_agent.transcribe_audio_bytes",
+            new_callable=AsyncMock,
+        ) as mock_transcribe,
+        patch(
+            "src.routers.langgraph_agent.call_agent", new_callable=AsyncMock
+        ) as mock_call_agent,
+        patch("src.routers.langgraph_agent._warm_up_agent", new_callable=AsyncMock),
+    ):
+        mock_transcribe.return_value = "Transcribed question"
+        mock_call_agent.return_value = "This is a test response."
+
+        response = client.post(
+            "/api/v1/agent/chat/audio",
+            files={"audio": ("question.webm", b"webm-bytes", "audio/webm")},
+        )
+
+        assert response.status_code == 200
+        assert response.json()["response"] == "This is a test response."
+        mock_transcribe.assert_awaited_once_with(b"webm-bytes", "question.webm")
+        mock_call_agent.assert_awaited_once_with("Transcribed question")
+
+
+def test_chat_audio_upload_streams_audio_answer():
+    """Test that /chat/audio answers with audio/mpeg when asked to."""
+
+    async def mock_stream_audio(text):
+        yield b"ID3frame"
+
+    with (
+        patch(
+            "src.routers.langgraph_agent.transcribe_audio_bytes",
+            new_callable=AsyncMock,
+        ),
+        patch(
+            "src.routers.langgraph_agent.call_agent", new_callable=AsyncMock
+        ) as mock_call_agent,
+        patch("src.routers.langgraph_agent._warm_up_agent", new_callable=AsyncMock),
+        patch(
+            "src.routers.langgraph_agent.stream_audio", side_effect=mock_stream_audio
+        ),
+    ):
+        mock_call_agent.return_value = "This is a test response."
+
+        response = client.post(
+            "/api/v1/agent/chat/audio",
+            files={"audio": ("question.webm", b"webm-bytes", "audio/webm")},
+            data={"response_as_audio": "true"},
+        )
+
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "audio/mpeg"
+        assert response.content == b"ID3frame"
+
+
+def _completion(content):
+    """Build a minimal chat completion response."""
+    message = MagicMock(content=content)
+    return MagicMock(choices=[MagicMock(message=message)])
+
+
+def test_route_turn():
+    """Test that the router model's one-word answer picks the path."""
+    openai_client = MagicMock()
+    create = AsyncMock()
+    openai_client.with_options.return_value.chat.completions.create = create
+
+    with patch(
+        "src.routers.langgraph_agent.get_openai_client", return_value=openai_client
+    ):
+        create.side_effect = [_completion("direct"), _completion(" Agent\n")]
+        assert asyncio.run(langgraph_agent.route_turn("Hi there!")) == "direct"
+        assert asyncio.run(langgraph_agent.route_turn("My balance?")) == "agent"
+
+        # When the router is unavailable, fall back to the full agent
+        create.side_effect = RuntimeError("rate limited")
+        assert asyncio.run(langgraph_agent.route_turn("Hi there!")) == "agent"
+
+
+def test_call_agent_answers_small_talk_directly():
+    """Test that direct turns skip the MCP agent entirely."""
+    with (
+        patch(
+            "src.routers.langgraph_agent.route_turn", new_callable=AsyncMock
+        ) as mock_route,
+        patch(
+            "src.routers.langgraph_agent.answer_directly", new_callable=AsyncMock
+        ) as mock_direct,
+        patch.object(
+            langgraph_agent.mcp_session, "get_agent", new_callable=AsyncMock
+        ) as mock_get_agent,
+    ):
+        mock_route.return_value = "direct"
+        mock_direct.return_value = "Hello Jeanine!"
+
+        assert asyncio.run(langgraph_agent.call_agent("Hi")) == "Hello Jeanine!"
+        mock_get_agent.assert_not_awaited()
+
+
+def test_event_buffer_overflow_for_slow_client():
+    """Test that a client behind the ring buffer gets an overflow event."""
+    buffer = langgraph_agent._EventBuffer("slow-client", maxlen=2)
+
+    async def collect():
+        for n in range(4):
+            await buffer.append(langgraph_agent.sse_event({"n": n}))
+        await buffer.finish()
+        return [event async for event in buffer.follow(-1)]
+
+    events = asyncio.run(collect())
+
+    assert events == [langgraph_agent.OVERFLOW_EVENT]
+
+
+def test_podcast_stream_pipelines_paragraphs():
+    """Test that /podcast/stream speaks paragraphs while the script streams in."""
+
+    def model_event(name, **data):
+        return {"event": f"on_chat_model_{name}", "data": data}
+
+    tool_call = AIMessageChunk(
+        content="", tool_call_chunks=[{"name": "query", "args": "", "id": "1"}]
+    )
+
+    async def mock_astream_events(input_data, version, include_types):
+        # Tool-calling turns whose text must not end up in the podcast
+        yield model_event("start")
+        yield model_event("stream", chunk=AIMessageChunk(content="Let me check"))
+        yield model_event("end", output=MagicMock(tool_calls=[{"name": "query"}]))
+        yield model_event("start")
+        yield model_event("stream", chunk=AIMessageChunk(content="One moment.\n\n"))
+        yield model_event("stream", chunk=tool_call)
+        yield model_event("stream", chunk=AIMessageChunk(content="\n\nStill here."))
+        yield model_event("end", output=MagicMock(tool_calls=[{"name": "query"}]))
+        # The script itself, split mid-chunk on a paragraph boundary
+        yield model_event("start")
+        yield model_event("stream", chunk=AIMessageChunk(content="Hello listeners!\n"))
+        yield model_event("stream", chunk=AIMessageChunk(content="\nMoney talk."))
+        yield model_event("end", output=MagicMock(tool_calls=[]))
+
+    async def fake_generate_audio(segment):
+        return f"[{segment}]".encode()
+
+    agent = MagicMock()
+    agent.astream_events = mock_astream_events
+
+    with (
+        patch.object(
+            langgraph_agent.mcp_session,
+            "get_agent",
+            new_callable=AsyncMock,
+            return_value=agent,
+        ),
+        patch(
+            "src.routers.langgraph_agent.generate_audio",
+            side_effect=fake_generate_audio,
+        ),
+    ):
+        response = client.get("/api/v1/agent/podcast/stream")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "audio/mpeg"
+        assert response.content == b"[Hello listeners!][Money talk.]"
+
+
+def test_podcast_stream_agent_error():
+    """Test that an agent failure before any audio is reported as a 500."""
+    with patch.object(
+        langgraph_agent.mcp_session,
+        "get_agent",
+        new_callable=AsyncMock,
+        side_effect=RuntimeError("MCP down"),
+    ):
+        response = client.get("/api/v1/agent/podcast/stream")
+
+        assert response.status_code == 500
+        assert "MCP down" in response.json()["detail"]
+
+
+def test_final_content():
+    """Test that the agent's last message is extracted from its state."""
+    state = {"messages": [HumanMessage(content="Hi"), AIMessage(content="Hello!")]}
+
+    assert langgraph_agent.final_content(state) == "Hello!"
+    assert langgraph_agent.final_content({"messages": []}) == "{'messages': []}"
+
+
 def test_stream_chat_with_agent():
     """Test the /chat/stream endpoint."""
 
     async def mock_stream_generator():
-        yield f"data: {json.dumps({'content': 'Hello', 'type': 'message'})}\n\n"
-        yield f"data: {json.dumps({'content': ' world', 'type': 'message'})}\n\n"
-        yield f"data: {json.dumps({'type': 'end'})}\n\n"
+        yield ServerSentEvent(data={"content": "Hello", "type": "message"})
+        yield ServerSentEvent(data={"content": " world", "type": "message"})
+        yield ServerSentEvent(data={"type": "end"})
 
     with patch(
         "src.routers.langgraph_agent.stream_agent_response",
@@ -47,12 +377,53 @@ def test_stream_chat_with_agent():
         )
 
         assert response.status_code == 200
-        assert response.headers["content-type"] == "text/plain; charset=utf-8"
+        assert response.headers["content-type"].startswith("text/event-stream")
+        assert response.headers["cache-control"] == "no-cache"
 
-        # Check the streamed content
+        # Check the streamed content, each event tagged with a resumable id
+        channel = response.text.split("id: ", 1)[1].split(":", 1)[0]
         expected_content = (
-            f"data: {json.dumps({'content': 'Hello', 'type': 'message'})}\n\n"
-            f"data: {json.dumps({'content': ' world', 'type': 'message'})}\n\n"
-            f"data: {json.dumps({'type': 'end'})}\n\n"
+            f"data: {json.dumps({'content': 'Hello', 'type': 'message'})}\n"
+            f"id: {channel}:0\n\n"
+            f"data: {json.dumps({'content': ' world', 'type': 'message'})}\n"
+            f"id: {channel}:1\n\n"
+            f"data: {json.dumps({'type': 'end'})}\n"
+            f"id: {channel}:2\n\n"
         )
         assert response.text == expected_content
+
+
+def test_stream_chat_resumes_from_last_event_id():
+    """Test that Last-Event-ID replays the buffer instead of re-running the agent."""
+    buffer = langgraph_agent._EventBuffer("resume-test")
+
+    async def fill_buffer():
+        for content in ("Hello", " world"):
+            await buffer.append(
+                ServerSentEvent(data={"content": content, "type": "message"})
+            )
+        await buffer.append(ServerSentEvent(data={"type": "end"}))
+        await buffer.finish()
+
+    asyncio.run(fill_buffer())
+
+    with (
+        patch.dict(langgraph_agent._event_buffers, {"resume-test": buffer}),
+        patch(
+            "src.routers.langgraph_agent.stream_agent_response"
+        ) as mock_stream_agent_response,
+    ):
+        response = client.post(
+            "/api/v1/agent/chat/stream",
+            json={"message": "Hello"},
+            headers={"Last-Event-ID": "resume-test:0"},
+        )
+
+        assert response.status_code == 200
+        assert response.text == (
+            f"data: {json.dumps({'content': ' world', 'type': 'message'})}\n"
+            "id: resume-test:1\n\n"
+            f"data: {json.dumps({'type': 'end'})}\n"
+            "id: resume-test:2\n\n"
+        )
+        mock_stream_agent_response.assert_not_called()
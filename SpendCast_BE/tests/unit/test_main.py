@@ -2,6 +2,7 @@
 
 import pytest
 from fastapi.testclient import TestClient
+from unittest.mock import AsyncMock, patch
 
 
 @pytest.mark.unit
@@ -51,3 +52,30 @@ def test_cors_headers(client):
     response = client.get("/", headers={"Origin": "http://localhost:3000"})
 
     assert response.status_code == 200
+
+
+@pytest.mark.unit
+def test_large_responses_are_gzipped(client):
+    """Test that large bodies are compressed and small ones are not."""
+    response = client.get("/openapi.json", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert "paths" in response.json()
+
+    response = client.get("/health", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+
+    async def mp3(text):
+        yield b"\xff" * 4096
+
+    with (
+        patch("src.routers.langgraph_agent.call_agent", new_callable=AsyncMock),
+        patch("src.routers.langgraph_agent.stream_audio", side_effect=mp3),
+    ):
+        response = client.post(
+            "/api/v1/agent/chat/audio-stream",
+            json={"message": "Hello"},
+            headers={"Accept-Encoding": "gzip"},
+        )
+    assert response.headers["content-type"] == "audio/mpeg"
+    assert response.headers["content-encoding"] == "identity"
+    assert response.content == b"\xff" * 4096
@@ -0,0 +1,527 @@
+"""Unit tests for the Open Food Facts integration."""
+
+import asyncio
+
+import httpx
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from src.cache import SingleFlight, TTLCache
+from src.crud import openfoodfacts
+from src.models import (
+    HealthyAlternativesResult,
+    OpenFoodFactsProduct,
+    ProductSearchResult,
+)
+
+
+@pytest.fixture(autouse=True)
+def empty_product_cache():
+    """Start every test with cold in-process product and search caches."""
+    openfoodfacts._product_cache.clear()
+    openfoodfacts._search_cache.clear()
+    yield
+    openfoodfacts._product_cache.clear()
+    openfoodfacts._search_cache.clear()
+
+
+@pytest.fixture
+def sample_product():
+    """Sample Open Food Facts product."""
+    return OpenFoodFactsProduct(
+        id="3017620422003",
+        barcode="3017620422003",
+        name="Nutella",
+        brands="Ferrero",
+        nutri_score="E",
+        nova_group=4,
+    )
+
+
+@pytest.fixture
+def fake_redis():
+    """Redis stand-in backed by a dict."""
+    store = {}
+    redis = AsyncMock()
+    redis.get.side_effect = lambda key: store.get(key)
+    redis.set.side_effect = lambda key, value, ex=None: store.__setitem__(key, value)
+    redis.store = store
+    return redis
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_fetch_product_served_from_redis(sample_product, fake_redis):
+    """Test that a cached product skips the Open Food Facts request."""
+    with (
+        patch("src.crud.openfoodfacts.get_redis", return_value=fake_redis),
+        patch(
+            "src.crud.openfoodfacts._fetch_product_from_api", new_callable=AsyncMock
+        ) as mock_fetch,
+    ):
+        mock_fetch.return_value = sample_product
+
+        first = await openfoodfacts.fetch_product_by_barcode("3017620422003")
+        second = await openfoodfacts.fetch_product_by_barcode("3017620422003")
+
+        assert first == second == sample_product
+        mock_fetch.assert_awaited_once_with("3017620422003")
+        assert "off:product:3017620422003" in fake_redis.store
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_fetch_product_without_redis(sample_product):
+    """Test that lookups go upstream when no cache is configured."""
+    with (
+        patch("src.crud.openfoodfacts.get_redis", return_value=None),
+        patch(
+            "src.crud.openfoodfacts._fetch_product_from_api", new_callable=AsyncMock
+        ) as mock_fetch,
+    ):
+        mock_fetch.return_value = None
+
+        assert await openfoodfacts.fetch_product_by_barcode("0000") is None
+        mock_fetch.assert_awaited_once_with("0000")
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_fetch_product_served_from_memory(sample_product):
+    """Test that hot barcodes are answered in process without Redis."""
+    with (
+        patch("src.crud.openfoodfacts.get_redis", return_value=None),
+        patch(
+            "src.crud.openfoodfacts._fetch_product_from_api", new_callable=AsyncMock
+        ) as mock_fetch,
+    ):
+        mock_fetch.return_value = sample_product
+
+        for _ in range(3):
+            product = await openfoodfacts.fetch_product_by_barcode("3017620422003")
+
+        assert product is sample_product
+        mock_fetch.assert_awaited_once()
+
+
+@pytest.mark.unit
+def test_ttl_cache_evicts_and_expires():
+    """Test LRU eviction and TTL expiry of the in-process cache."""
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # "a" is now most recently used
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert len(cache) == 2
+
+    with patch("src.cache.time.monotonic", return_value=10**9):
+        assert cache.get("a") is None
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize(
+    "endpoint,key", [("categories", "categories"), ("brands", "brands")]
+)
+def test_static_suggestion_endpoints(client, endpoint, key):
+    """Test the precomputed suggestion endpoints."""
+    response = client.get(f"/api/v1/openfoodfacts/{endpoint}")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/json"
+    data = response.json()
+    assert data["success"] is True
+    assert data["total"] == len(data[key]) > 0
+
+
+@pytest.mark.unit
+def test_get_product_by_barcode_endpoint(client, sample_product):
+    """Test that the product endpoint serializes the typed product model."""
+    with patch(
+        "src.routers.openfoodfacts.fetch_product_by_barcode", new_callable=AsyncMock
+    ) as mock_fetch:
+        mock_fetch.return_value = sample_product
+
+        response = client.get("/api/v1/openfoodfacts/product/3017620422003")
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["success"] is True
+        assert data["product"] == sample_product.model_dump()
+        mock_fetch.assert_awaited_once_with("3017620422003")
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_concurrent_lookups_share_one_upstream_call(sample_product):
+    """Test that a burst of identical lookups makes a single upstream request."""
+
+    async def slow_fetch(barcode):
+        await asyncio.sleep(0.01)
+        return sample_product
+
+    with (
+        patch("src.crud.openfoodfacts.get_redis", return_value=None),
+        patch(
+            "src.crud.openfoodfacts._fetch_product_from_api", side_effect=slow_fetch
+        ) as mock_fetch,
+    ):
+        results = await asyncio.gather(
+            *(openfoodfacts.fetch_product_by_barcode("3017620422003") for _ in range(5))
+        )
+
+        assert results == [sample_product] * 5
+        mock_fetch.assert_called_once_with("3017620422003")
+        assert len(openfoodfacts._inflight) == 0
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_single_flight_survives_cancelled_caller():
+    """Test that cancelling one waiter does not cancel the shared call."""
+    flight = SingleFlight()
+    release = asyncio.Event()
+
+    async def work():
+        await release.wait()
+        return "done"
+
+    first = asyncio.create_task(flight.run("key", work))
+    second = asyncio.create_task(flight.run("key", work))
+    await asyncio.sleep(0)
+    first.cancel()
+    release.set()
+
+    assert await second == "done"
+    assert first.cancelled()
+
+
+def search_page(query, page, page_size, count):
+    """Build a search result page holding `count` products."""
+    products = [
+        OpenFoodFactsProduct(id=str(i), barcode=str(i), name=f"{query} {i}")
+        for i in range(count)
+    ]
+    return ProductSearchResult(
+        products=products,
+        total_found=count,
+        page=page,
+        page_size=page_size,
+        query=query,
+        next_cursor=(
+            openfoodfacts.encode_search_cursor(page + 1) if count == page_size else None
+        ),
+    )
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_next_search_page_is_prefetched():
+    """Test that a full page warms the cache for the following page."""
+    with (
+        patch("src.crud.openfoodfacts.get_redis", return_value=None),
+        patch(
+            "src.crud.openfoodfacts._search_products_from_api",
+            side_effect=lambda q, p, n: search_page(q, p, n, n),
+        ) as mock_search,
+    ):
+        first = await openfoodfacts.search_products_by_query("chocolate", 1, 2)
+        openfoodfacts.prefetch_next_search_page(first)
+        await asyncio.gather(*openfoodfacts._prefetch_tasks)
+
+        second = await openfoodfacts.search_products_by_query("chocolate", 2, 2)
+
+        assert second.page == 2
+        assert [call.args for call in mock_search.call_args_list] == [
+            ("chocolate", 1, 2),
+            ("chocolate", 2, 2),
+        ]
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_last_search_page_is_not_prefetched():
+    """Test that a short page does not trigger a prefetch."""
+    openfoodfacts.prefetch_next_search_page(search_page("chocolate", 3, 10, 4))
+
+    assert not openfoodfacts._prefetch_tasks
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("endpoint", ["product", "analyze"])
+@pytest.mark.parametrize("barcode", ["123", "abcdefghij", "3017620422003'--"])
+def test_invalid_barcode_rejected_before_lookup(client, endpoint, barcode):
+    """Test that malformed barcodes get a 400 without any upstream call."""
+    with patch(
+        "src.routers.openfoodfacts.fetch_product_by_barcode", new_callable=AsyncMock
+    ) as mock_fetch:
+        response = client.get(f"/api/v1/openfoodfacts/{endpoint}/{barcode}")
+
+        assert response.status_code == 400
+        assert response.json()["detail"] == "Invalid barcode format"
+        mock_fetch.assert_not_awaited()
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_off_client_shared_until_closed():
+    """Test that lookups reuse one pooled client that shutdown closes."""
+    with patch("src.crud.openfoodfacts.httpx.AsyncClient") as mock_client_cls:
+        mock_client_cls.side_effect = lambda **kwargs: MagicMock(aclose=AsyncMock())
+
+        client = openfoodfacts.get_off_client()
+        assert openfoodfacts.get_off_client() is client
+        mock_client_cls.assert_called_once()
+        assert mock_client_cls.call_args.kwargs["http2"] is True
+
+        await openfoodfacts.close_off_client()
+
+        client.aclose.assert_awaited_once()
+        assert openfoodfacts._off_client is None
+
+
+@pytest.mark.unit
+def test_search_cursor_round_trip():
+    """Test that cursors decode to the page they encode and reject garbage."""
+    cursor = openfoodfacts.encode_search_cursor(7)
+    assert openfoodfacts.decode_search_cursor(cursor) == 7
+
+    for cursor in ["", "not-base64!", openfoodfacts.encode_search_cursor(0)]:
+        with pytest.raises(ValueError):
+            openfoodfacts.decode_search_cursor(cursor)
+
+
+@pytest.mark.unit
+def test_search_endpoint_follows_cursor(client):
+    """Test that a cursor selects the page and an invalid one is a 400."""
+    with (
+        patch(
+            "src.routers.openfoodfacts.search_products_by_query",
+            new_callable=AsyncMock,
+        ) as mock_search,
+        patch("src.routers.openfoodfacts.prefetch_next_search_page"),
+    ):
+        mock_search.return_value = search_page("chocolate", 3, 2, 2)
+        cursor = openfoodfacts.encode_search_cursor(3)
+
+        response = client.get(
+            "/api/v1/openfoodfacts/search",
+            params={"query": "chocolate", "cursor": cursor, "page_size": 2},
+        )
+
+        assert response.status_code == 200
+        assert response.json()["data"]["next_cursor"] == (
+            openfoodfacts.encode_search_cursor(4)
+        )
+        mock_search.assert_awaited_once_with(query="chocolate", page=3, page_size=2)
+
+        response = client.get(
+            "/api/v1/openfoodfacts/search",
+            params={"query": "chocolate", "cursor": "bogus"},
+        )
+        assert response.status_code == 400
+
+
+@pytest.mark.unit
+def test_alternatives_endpoint_serializes_constructed_response(client, sample_product):
+    """Test that the unvalidated success response still serializes fully."""
+    result = HealthyAlternativesResult(
+        original_product=sample_product,
+        alternatives=[{"name": "Hazelnut spread", "improvement_reason": {}}],
+        total_alternatives_found=1,
+        criteria_used="nutri_score",
+    )
+    with patch(
+        "src.routers.openfoodfacts.find_healthy_alternatives", new_callable=AsyncMock
+    ) as mock_find:
+        mock_find.return_value = result
+
+        response = client.get("/api/v1/openfoodfacts/alternatives/3017620422003")
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["success"] is True
+        assert data["data"] == result.model_dump()
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_batch_lookup_bounds_upstream_fanout(sample_product):
+    """Test that batch lookups dedupe barcodes and cap concurrent fetches."""
+    running = 0
+    peak = 0
+
+    async def slow_fetch(barcode):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return sample_product if barcode == "3017620422003" else None
+
+    barcodes = [f"{n:08d}" for n in range(40)] + ["3017620422003"] * 2
+    with (
+        patch("src.crud.openfoodfacts.get_redis", return_value=None),
+        patch(
+            "src.crud.openfoodfacts._fetch_product_from_api", side_effect=slow_fetch
+        ) as mock_fetch,
+    ):
+        products = await openfoodfacts.fetch_products_by_barcodes(barcodes)
+
+    assert list(products) == barcodes[:41]
+    assert products["3017620422003"] == sample_product
+    assert products["00000000"] is None
+    assert mock_fetch.call_count == 41
+    assert peak <= openfoodfacts.BATCH_CONCURRENCY
+
+
+@pytest.mark.unit
+def test_batch_endpoint(client, sample_product):
+    """Test the batch endpoint result map and barcode validation."""
+    with patch(
+        "src.routers.openfoodfacts.fetch_products_by_barcodes", new_callable=AsyncMock
+    ) as mock_fetch:
+        mock_fetch.return_value = {"3017620422003": sample_product, "12345678": None}
+
+        response = client.post(
+            "/api/v1/openfoodfacts/products:batch",
+            json={"barcodes": ["3017620422003", " 12345678 "]},
+        )
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["products"]["3017620422003"]["name"] == "Nutella"
+        assert data["products"]["12345678"] is None
+        mock_fetch.assert_awaited_once_with(["3017620422003", "12345678"])
+
+        response = client.post(
+            "/api/v1/openfoodfacts/products:batch",
+            json={"barcodes": ["3017620422003", "nope"]},
+        )
+        assert response.status_code == 400
+
+        response = client.post(
+            "/api/v1/openfoodfacts/products:batch",
+            json={"barcodes": ["12345678"] * 101},
+        )
+        assert response.status_code == 422
+
+
+@pytest.mark.unit
+def test_post_search_delegates_to_get(client):
+    """Test that the deprecated POST search returns the same as GET."""
+    with (
+        patch(
+            "src.routers.openfoodfacts.search_products_by_query",
+            new_callable=AsyncMock,
+        ) as mock_search,
+        patch("src.routers.openfoodfacts.prefetch_next_search_page"),
+    ):
+        mock_search.return_value = search_page("chocolate", 1, 10, 3)
+
+        posted = client.post(
+            "/api/v1/openfoodfacts/search", json={"query": "chocolate"}
+        )
+        fetched = client.get(
+            "/api/v1/openfoodfacts/search", params={"query": "chocolate"}
+        )
+
+        assert posted.status_code == fetched.status_code == 200
+        assert posted.json() == fetched.json()
+        assert mock_search.await_count == 2
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("endpoint", ["categories", "brands", "stats"])
+def test_static_endpoints_are_cacheable(client, endpoint):
+    """Test cache headers and conditional requests on the constant endpoints."""
+    url = f"/api/v1/openfoodfacts/{endpoint}"
+    response = client.get(url)
+
+    assert response.status_code == 200
+    assert response.headers["cache-control"] == "public, max-age=86400, immutable"
+    etag = response.headers["etag"]
+
+    response = client.get(url, headers={"If-None-Match": f'"stale", {etag}'})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+
+    response = client.get(url, headers={"If-None-Match": '"stale"'})
+    assert response.status_code == 200
+
+
+@pytest.mark.unit
+def test_analyze_reuses_cached_product(client, sample_product):
+    """Test that analysis after a product lookup needs no second upstream call."""
+    with (
+        patch("src.crud.openfoodfacts.get_redis", return_value=None),
+        patch(
+            "src.crud.openfoodfacts._fetch_product_from_api", new_callable=AsyncMock
+        ) as mock_fetch,
+    ):
+        mock_fetch.return_value = sample_product
+
+        client.get("/api/v1/openfoodfacts/product/3017620422003")
+        response = client.get("/api/v1/openfoodfacts/analyze/3017620422003")
+
+        assert response.status_code == 200
+        analysis = response.json()["analysis"]
+        assert analysis["health_scores"]["nutri_score"]["grade"] == "E"
+        assert analysis["product"] == sample_product.model_dump()
+        mock_fetch.assert_awaited_once()
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_warm_cache_fetches_products_and_searches():
+    """Test that warming looks up every barcode and query, tolerating failures."""
+    with (
+        patch(
+            "src.crud.openfoodfacts.fetch_product_by_barcode", new_callable=AsyncMock
+        ) as mock_fetch,
+        patch(
+            "src.crud.openfoodfacts.search_products_by_query", new_callable=AsyncMock
+        ) as mock_search,
+    ):
+        mock_fetch.side_effect = [None, RuntimeError("upstream down")]
+
+        await openfoodfacts.warm_cache(["3017620422003", "5449000011114"], ["snacks"])
+
+        assert [call.args for call in mock_fetch.call_args_list] == [
+            ("3017620422003",),
+            ("5449000011114",),
+        ]
+        mock_search.assert_awaited_once_with("snacks")
+
+
+@pytest.mark.unit
+def test_missing_product_is_cacheable_404(client):
+    """Test that an unknown barcode is a 404 that edges may cache briefly."""
+    with patch(
+        "src.routers.openfoodfacts.fetch_product_by_barcode", new_callable=AsyncMock
+    ) as mock_fetch:
+        mock_fetch.return_value = None
+
+        response = client.get("/api/v1/openfoodfacts/product/12345678")
+
+        assert response.status_code == 404
+        assert response.json()["detail"] == "Product 12345678 not found"
+        assert response.headers["cache-control"] == "public, max-age=300"
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_upstream_errors_are_not_reported_as_missing(httpx_mock):
+    """Test that only an upstream 404 means not found; other failures raise."""
+    url = "https://world.openfoodfacts.org/api/v2/product/12345678.json"
+    httpx_mock.add_response(url=url, status_code=404, json={"status": 0})
+    httpx_mock.add_response(url=url, status_code=503)
+
+    async with httpx.AsyncClient() as off_client:
+        with patch("src.crud.openfoodfacts.get_off_client", return_value=off_client):
+            assert await openfoodfacts._fetch_product_from_api("12345678") is None
+            with pytest.raises(httpx.HTTPStatusError):
+                await openfoodfacts._fetch_product_from_api("12345678")
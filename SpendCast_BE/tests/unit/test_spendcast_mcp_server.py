@@ -0,0 +1,219 @@
+"""Unit tests for the SpendCast MCP server's Open Food Facts tools."""
+
+import re
+from urllib.parse import parse_qs
+
+import pytest
+
+from src.routers import spendcast_mcp_server as server
+
+SEARCH_URL = re.compile(r"https://world\.openfoodfacts\.org/cgi/search\.pl\?.*")
+
+
+def product_url(barcode):
+    """Match the product lookup URL of a barcode, whatever its query string."""
+    return re.compile(
+        rf"https://world\.openfoodfacts\.org/api/v2/product/{barcode}\.json\?.*"
+    )
+
+
+def off_product(code, nutri=None, nova=None, eco=None):
+    """Build a raw Open Food Facts product with the given grades."""
+    return {
+        "code": code,
+        "product_name": f"Product {code}",
+        "categories": "Breakfast cereals, Cereals",
+        "nutriscore_grade": nutri,
+        "nova_group": nova,
+        "ecoscore_grade": eco,
+    }
+
+
+def excluded_tags(request):
+    """Return the (tagtype, tag) pairs a search request excludes."""
+    params = request.url.params
+    tags = set()
+    i = 0
+    while f"tagtype_{i}" in params:
+        assert params[f"tag_contains_{i}"] == "does_not_contain"
+        tags.add((params[f"tagtype_{i}"], params[f"tag_{i}"]))
+        i += 1
+    return tags
+
+
+@pytest.fixture(autouse=True)
+async def fresh_server_state():
+    """Start every test with an empty product cache and a new HTTP client."""
+    server._product_cache.clear()
+    yield
+    server._product_cache.clear()
+    await server.close_http_client()
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize(
+    "limits, expected",
+    [
+        ({}, set()),
+        (
+            {"max_nutri": "B"},
+            {("nutrition_grades", g) for g in "cde"},
+        ),
+        ({"max_nova": 2}, {("nova_groups", "3"), ("nova_groups", "4")}),
+        ({"max_eco": "C"}, {("ecoscore", "d"), ("ecoscore", "e")}),
+        (
+            {"max_nutri": "A", "max_nova": 1},
+            {("nutrition_grades", g) for g in "bcde"}
+            | {("nova_groups", g) for g in "234"},
+        ),
+    ],
+)
+async def test_search_pushes_grade_limits_down(httpx_mock, limits, expected):
+    """Test that grade limits become ANDed does_not_contain tag clauses."""
+    httpx_mock.add_response(
+        url=SEARCH_URL, json={"products": [off_product("1", nutri="a")]}
+    )
+
+    products = await server._search_openfoodfacts_products(
+        "cereals", page=1, page_size=20, **limits
+    )
+
+    assert [p.nutri_score for p in products] == ["A"]
+    request = httpx_mock.get_request()
+    assert request.url.params["search_terms"] == "cereals"
+    assert request.url.params["page_size"] == "20"
+    assert excluded_tags(request) == expected
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize(
+    "criteria, original, expected, better",
+    [
+        (
+            "nutri_score",
+            {"nutri": "c"},
+            {("nutrition_grades", g) for g in "cde"},
+            ["2"],
+        ),
+        (
+            "nova_group",
+            {"nova": 3},
+            {("nova_groups", "3"), ("nova_groups", "4")},
+            ["2"],
+        ),
+        (
+            "eco_score",
+            {"eco": "b"},
+            {("ecoscore", g) for g in "bcde"},
+            ["2"],
+        ),
+        # "all" accepts an improvement on any one score, so nothing is pushed down
+        ("all", {"nutri": "c", "nova": 3, "eco": "b"}, set(), ["2"]),
+        # Nothing beats the top grades: every grade is excluded upstream
+        (
+            "nutri_score",
+            {"nutri": "a"},
+            {("nutrition_grades", g) for g in "abcde"},
+            [],
+        ),
+        (
+            "nova_group",
+            {"nova": 1},
+            {("nova_groups", g) for g in "1234"},
+            [],
+        ),
+    ],
+)
+async def test_healthy_alternatives_push_criteria_down(
+    httpx_mock, criteria, original, expected, better
+):
+    """Test that each criterion limits the search to strictly better grades."""
+    httpx_mock.add_response(
+        url=product_url("1"),
+        json={"status": 1, "product": off_product("1", **original)},
+    )
+    # Ungraded products pass the upstream filter and are dropped in Python
+    httpx_mock.add_response(
+        url=SEARCH_URL,
+        json={
+            "products": [
+                off_product("1", **original),
+                off_product("2", nutri="a", nova=1, eco="a"),
+                off_product("3"),
+            ]
+        },
+    )
+
+    result = await server.get_healthy_alternatives.fn(
+        None, barcode="1", criteria=criteria
+    )
+
+    assert [alt["barcode"] for alt in result["alternatives"]] == better
+    search = httpx_mock.get_request(url=SEARCH_URL)
+    assert search.url.params["search_terms"] == "Breakfast cereals"
+    assert excluded_tags(search) == expected
+
+
+@pytest.mark.unit
+async def test_nutrition_spending_counts_aggregated_rows(httpx_mock):
+    """Test that per-EAN SUM/COUNT rows are weighted by spend and line items."""
+    graphdb_url = server.get_config().url
+    httpx_mock.add_response(
+        url=graphdb_url,
+        method="POST",
+        json={
+            "results": {
+                "bindings": [
+                    {
+                        "ean": {"value": "111"},
+                        "spent": {"value": "30.0"},
+                        "lineItems": {"value": "3"},
+                    },
+                    {
+                        "ean": {"value": "222"},
+                        "spent": {"value": "10.0"},
+                        "lineItems": {"value": "1"},
+                    },
+                    # Line items without an EAN are grouped into one unbound row
+                    {"spent": {"value": "5.0"}, "lineItems": {"value": "2"}},
+                ]
+            }
+        },
+    )
+    httpx_mock.add_response(
+        url=product_url("111"),
+        json={"status": 1, "product": off_product("111", nutri="d", nova=4, eco="b")},
+    )
+    httpx_mock.add_response(url=product_url("222"), status_code=404)
+
+    result = await server.analyze_nutrition_spending.fn(
+        None,
+        customer_name="Jeanine Marie Blumenthal",
+        start_date="2025-01-01",
+        end_date="2025-03-31",
+    )
+
+    analysis = result["analysis"]
+    assert analysis["total_amount"] == 45.0
+    assert analysis["analyzed_products"] == 6
+    assert analysis["products_with_ean"] == 4
+    assert analysis["products_with_nutrition_data"] == 3
+    assert analysis["nutri_score_spending"]["D"] == 30.0
+    assert analysis["nutri_score_spending"]["unknown"] == 15.0
+    assert analysis["nova_group_spending"]["4"] == 30.0
+    assert analysis["eco_score_spending"]["B"] == 30.0
+    assert [r["type"] for r in result["recommendations"]] == [
+        "nutri_score",
+        "nova_group",
+    ]
+    assert result["summary"]["nutrition_data_coverage"] == (
+        "3/4 products with EAN codes"
+    )
+
+    # The template is sent unchanged; user input travels as RDF4J bindings
+    body = parse_qs(httpx_mock.get_request(url=graphdb_url).content.decode())
+    assert body["query"] == [server.NUTRITION_SPENDING_QUERY]
+    assert body["$customerName"] == ['"Jeanine Marie Blumenthal"']
+    assert body["$startDate"] == [
+        '"2025-01-01"^^<http://www.w3.org/2001/XMLSchema#date>'
+    ]
@@ -3,6 +3,7 @@
 import json
 import pytest
 from unittest.mock import AsyncMock, MagicMock, patch
+from fastapi.sse import ServerSentEvent
 from fastapi.testclient import TestClient
 
 from main import app
@@ -19,22 +20,9 @@ class MockMessage:
         self.content = content
 
 
-class MockChunk:
-    """Mock chunk for streaming response."""
-
-    def __init__(self, messages=None, end=False):
-        if messages:
-            self.data = {"messages": messages}
-        elif end:
-            self.data = {"__end__": True}
-        else:
-            self.data = {}
-
-    def __contains__(self, key):
-        return key in self.data
-
-    def __getitem__(self, key):
-        return self.data[key]
+def model_stream_event(message):
+    """Wrap a message chunk as an astream_events v2 chat model stream event."""
+    return {"event": "on_chat_model_stream", "data": {"chunk": message}}
 
 
 @pytest.fixture
@@ -82,16 +70,16 @@ class TestStreamingEndpoint:
         """Test successful streaming response."""
         # Mock agent streaming response
         mock_chunks = [
-            (MockMessage("Hello"), {"langgraph_node": "agent"}),
-            (MockMessage(" from tool"), {"langgraph_node": "tools"}),
-            (MockMessage(" world"), {"langgraph_node": "agent"}),
+            model_stream_event(MockMessage("Hello")),
+            {"event": "on_chat_model_end", "data": {"output": MockMessage("Hi")}},
+            model_stream_event(MockMessage(" world")),
         ]
 
-        async def mock_astream(input_data, stream_mode):
+        async def mock_astream_events(input_data, version, include_types):
             for chunk in mock_chunks:
                 yield chunk
 
-        mock_agent.astream = mock_astream
+        mock_agent.astream_events = mock_astream_events
 
         # Collect streaming response
         response_chunks = []
@@ -102,18 +90,18 @@ class TestStreamingEndpoint:
         assert len(response_chunks) == 3
 
         # Check first message chunk
-        assert response_chunks[0].startswith("data: ")
-        data1 = json.loads(response_chunks[0][6:].strip())
+        assert isinstance(response_chunks[0], ServerSentEvent)
+        data1 = json.loads(response_chunks[0].raw_data)
         assert data1["content"] == "Hello"
         assert data1["type"] == "message"
 
         # Check second message chunk
-        data2 = json.loads(response_chunks[1][6:].strip())
+        data2 = json.loads(response_chunks[1].raw_data)
         assert data2["content"] == " world"
         assert data2["type"] == "message"
 
         # Check end chunk
-        data3 = json.loads(response_chunks[2][6:].strip())
+        data3 = json.loads(response_chunks[2].raw_data)
         assert data3["type"] == "end"
 
     @pytest.mark.asyncio
@@ -128,9 +116,8 @@ class TestStreamingEndpoint:
 
             # Should have one error chunk
             assert len(response_chunks) == 1
-            assert response_chunks[0].startswith("data: ")
 
-            data = json.loads(response_chunks[0][6:].strip())
+            data = json.loads(response_chunks[0].raw_data)
             assert data["type"] == "error"
             assert "Test error" in data["error"]
 
@@ -140,14 +127,14 @@ class TestStreamingEndpoint:
     ):
         """Test streaming response with empty messages."""
         mock_chunks = [
-            (MockMessage(""), {"langgraph_node": "agent"}),  # Empty message
+            model_stream_event(MockMessage("")),  # Empty message
         ]
 
-        async def mock_astream(input_data, stream_mode):
+        async def mock_astream_events(input_data, version, include_types):
             for chunk in mock_chunks:
                 yield chunk
 
-        mock_agent.astream = mock_astream
+        mock_agent.astream_events = mock_astream_events
 
         response_chunks = []
         async for chunk in stream_agent_response("test message"):
@@ -155,7 +142,7 @@ class TestStreamingEndpoint:
 
         # Should only have end chunk (no content chunks)
         assert len(response_chunks) == 1
-        data = json.loads(response_chunks[0][6:].strip())
+        data = json.loads(response_chunks[0].raw_data)
         assert data["type"] == "end"
 
     @pytest.mark.asyncio
@@ -166,14 +153,14 @@ class TestStreamingEndpoint:
             content = None
 
         mock_chunks = [
-            (MockMessageNoContent(), {"langgraph_node": "agent"}),
+            model_stream_event(MockMessageNoContent()),
         ]
 
-        async def mock_astream(input_data, stream_mode):
+        async def mock_astream_events(input_data, version, include_types):
             for chunk in mock_chunks:
                 yield chunk
 
-        mock_agent.astream = mock_astream
+        mock_agent.astream_events = mock_astream_events
 
         response_chunks = []
         async for chunk in stream_agent_response("test message"):
@@ -181,9 +168,51 @@ class TestStreamingEndpoint:
 
         # Should only have end chunk (no content chunks)
         assert len(response_chunks) == 1
-        data = json.loads(response_chunks[0][6:].strip())
+        data = json.loads(response_chunks[0].raw_data)
         assert data["type"] == "end"
 
+    @pytest.mark.asyncio
+    async def test_stream_agent_response_reuses_mcp_session(
+        self, mock_agent, mock_mcp_session
+    ):
+        """Test that consecutive streams share one MCP server process."""
+        from src.routers import langgraph_agent
+
+        async def mock_astream_events(input_data, version, include_types):
+            yield model_stream_event(MockMessage("Hi"))
+
+        mock_agent.astream_events = mock_astream_events
+
+        for _ in range(2):
+            async for _chunk in stream_agent_response("test message"):
+                pass
+
+        assert langgraph_agent.stdio_client.call_count == 1
+        assert mock_mcp_session.initialize.await_count == 1
+
+        await langgraph_agent.mcp_session.close()
+        assert langgraph_agent.mcp_session.tools is None
+
+    @pytest.mark.asyncio
+    async def test_agent_graph_cached_per_name(self, mock_mcp_session):
+        """Test that each registered agent graph is compiled once per session."""
+        from src.routers import langgraph_agent
+
+        with patch("src.routers.langgraph_agent.create_react_agent") as mock_create:
+            session = langgraph_agent.mcp_session
+            chat_agent = await session.get_agent("chat")
+            assert await session.get_agent("chat") is chat_agent
+            await session.get_agent("stream")
+            assert mock_create.call_count == 2
+            assert (
+                mock_create.call_args_list[0].kwargs["prompt"]
+                is langgraph_agent.PREPROMPT_MSG
+            )
+
+            await session.close()
+            await session.get_agent("chat")
+            assert mock_create.call_count == 3
+
 
 class TestStreamingIntegration:
     """Integration tests for streaming endpoint."""
@@ -211,18 +240,17 @@ class TestStreamingIntegration:
         agent = AsyncMock()
         mock_create.return_value = agent
 
-        async def mock_astream(input_data):
-            yield MockChunk(messages=[MockMessage("Test response")])
-            yield MockChunk(end=True)
+        async def mock_astream_events(input_data, version, include_types):
+            yield model_stream_event(MockMessage("Test response"))
 
-        agent.astream = mock_astream
+        agent.astream_events = mock_astream_events
 
         # Test streaming endpoint
         response = client.post("/api/v1/agent/chat/stream", json={"message": "test"})
 
         # Check response headers
         assert response.status_code == 200
-        assert "text/plain" in response.headers.get("content-type", "")
+        assert "text/event-stream" in response.headers.get("content-type", "")
 
         # Response should be streaming
         assert response.headers.get("cache-control") == "no-cache"
@@ -270,6 +298,6 @@ class TestComparisonWithNonStreaming:
             assert "response" in data
             assert "success" in data
 
-        # Streaming should return text/plain
+        # Streaming should return Server-Sent Events
         response2 = client.post("/api/v1/agent/chat/stream", json={"message": "test"})
-        assert "text/plain" in response2.headers.get("content-type", "")
+        assert "text/event-stream" in response2.headers.get("content-type", "")
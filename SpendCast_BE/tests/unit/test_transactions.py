@@ -0,0 +1,426 @@
+"""Unit tests for transactions endpoints."""
+
+import pytest
+from fastapi import HTTPException
+from unittest.mock import patch, AsyncMock, MagicMock
+from urllib.parse import parse_qs, quote
+
+from src.config import settings
+from src.routers import transactions
+
+
+@pytest.fixture(autouse=True)
+def empty_analytics_cache():
+    """Start every test with a cold analytics cache."""
+    transactions._analytics_cache.clear()
+    transactions._data_version_cache.clear()
+    yield
+    transactions._analytics_cache.clear()
+    transactions._data_version_cache.clear()
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_graphdb_client_is_shared_and_closed():
+    """Test that the GraphDB client is created once and closed on shutdown."""
+    with patch("src.routers.transactions.httpx.AsyncClient") as mock_client_cls:
+        mock_client_cls.side_effect = lambda **kwargs: MagicMock(aclose=AsyncMock())
+
+        client = transactions.get_graphdb_client()
+        assert transactions.get_graphdb_client() is client
+        mock_client_cls.assert_called_once()
+        assert mock_client_cls.call_args.kwargs["http2"] is True
+
+        await transactions.close_graphdb_client()
+
+        client.aclose.assert_awaited_once()
+        assert transactions._graphdb_client is None
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_execute_sparql_query_posts_form_query(httpx_mock):
+    """Test that queries are posted as a form with credentials and a server timeout."""
+    httpx_mock.add_response(
+        url=settings.graphdb_url, json={"results": {"bindings": []}}
+    )
+
+    try:
+        result = await transactions.execute_sparql_query("SELECT * WHERE {}")
+    finally:
+        await transactions.close_graphdb_client()
+
+    assert result == {"results": {"bindings": []}}
+    request = httpx_mock.get_request()
+    assert parse_qs(request.content.decode()) == {
+        "query": ["SELECT * WHERE {}"],
+        "timeout": ["25"],
+        "infer": ["false"],
+    }
+    assert request.headers["Accept"] == "application/sparql-results+json"
+    assert request.headers["Accept-Encoding"] == "gzip"
+    assert request.headers["Authorization"].startswith("Basic ")
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_execute_sparql_query_rejects_invalid_json(httpx_mock):
+    """Test that an unparsable GraphDB response becomes a 500."""
+    httpx_mock.add_response(url=settings.graphdb_url, content=b"<html>")
+
+    try:
+        with pytest.raises(HTTPException) as exc_info:
+            await transactions.execute_sparql_query("SELECT * WHERE {}")
+    finally:
+        await transactions.close_graphdb_client()
+
+    assert exc_info.value.status_code == 500
+    assert exc_info.value.detail == "Invalid JSON response from GraphDB"
+
+
+@pytest.mark.unit
+def test_list_transactions_success(client, mock_transactions_response):
+    """Test GET /api/v1/transactions/ maps bindings to transactions."""
+    with patch(
+        "src.routers.transactions.execute_sparql_query", new_callable=AsyncMock
+    ) as mock_query:
+        mock_query.return_value = mock_transactions_response
+
+        response = client.get("/api/v1/transactions/?limit=5")
+
+        assert response.status_code == 200
+        data = response.json()
+        assert [t["transaction_id"] for t in data] == ["tx1", "tx2"]
+        assert data[0]["amount"] == 25.5
+        assert "LIMIT 5" in mock_query.call_args[0][0]
+
+
+@pytest.mark.unit
+def test_list_transactions_revalidates_by_etag(client, mock_transactions_response):
+    """Test that a matching If-None-Match skips the list query until data changes."""
+    versions = iter(["360", "361"])
+
+    async def graphdb(query):
+        if query == transactions.DATA_VERSION_QUERY:
+            return {"results": {"bindings": [{"count": {"value": next(versions)}}]}}
+        return mock_transactions_response
+
+    with patch(
+        "src.routers.transactions.execute_sparql_query", new_callable=AsyncMock
+    ) as mock_query:
+        mock_query.side_effect = graphdb
+
+        first = client.get("/api/v1/transactions/?limit=5")
+        etag = first.headers["ETag"]
+        assert first.headers["Cache-Control"] == "private, max-age=30"
+
+        cached = client.get(
+            "/api/v1/transactions/?limit=5", headers={"If-None-Match": etag}
+        )
+        assert cached.status_code == 304
+        assert mock_query.call_count == 2
+
+        other = client.get(
+            "/api/v1/transactions/?limit=10", headers={"If-None-Match": etag}
+        )
+        assert other.status_code == 200
+
+        # New data is picked up once the probe expires or is invalidated
+        client.post("/api/v1/transactions/analytics/cache/invalidate")
+        stale = client.get(
+            "/api/v1/transactions/?limit=5", headers={"If-None-Match": etag}
+        )
+        assert stale.status_code == 200
+        assert stale.headers["ETag"] != etag
+        assert mock_query.call_count == 5
+
+
+@pytest.mark.unit
+def test_transactions_batch_uses_one_query(client):
+    """Test that bulk details come from one query, folded per transaction in order."""
+
+    def row(transaction_id, role_type, name=None, label=None):
+        binding = {
+            "transaction": {
+                "value": f"https://static.rwpz.net/spendcast/{transaction_id}"
+            },
+            "amount": {"value": "10.0"},
+            "currency": {"value": "https://static.rwpz.net/spendcast/CHF"},
+            "date": {"value": "2025-01-15"},
+            "role_type": {"value": role_type},
+        }
+        if name:
+            binding["participant_name"] = {"value": name}
+        if label:
+            binding["participant_label"] = {"value": label}
+        return binding
+
+    with patch(
+        "src.routers.transactions.execute_sparql_query", new_callable=AsyncMock
+    ) as mock_query:
+        mock_query.return_value = {
+            "results": {
+                "bindings": [
+                    row("tx2", transactions.PAYER_ROLE, name="Bob"),
+                    row("tx1", transactions.PAYER_ROLE, name="Alice"),
+                    row("tx1", transactions.PAYEE_ROLE, label="Coffee Shop"),
+                    row("%C3%96V_Abo", transactions.PAYER_ROLE, name="Carol"),
+                ]
+            }
+        }
+
+        response = client.post(
+            "/api/v1/transactions/batch",
+            json={"ids": ["tx1", "tx2", "tx1", "tx3", "ÖV_Abo", "bad> }"]},
+        )
+
+        assert response.status_code == 200
+        data = response.json()
+        assert [t["transaction_id"] for t in data] == ["tx1", "tx2", "%C3%96V_Abo"]
+        assert data[0]["payer_name"] == "Alice"
+        assert data[0]["payee_name"] is None
+        assert data[0]["merchant"] == "Coffee Shop"
+        assert data[0]["currency"] == "CHF"
+        assert data[1]["payer_name"] == "Bob"
+        assert data[2]["payer_name"] == "Carol"
+        mock_query.assert_called_once()
+        query = mock_query.call_args[0][0]
+        assert query.count("/tx/tx1>") == 1
+        assert "/tx/%C3%96V_Abo>" in query
+        assert "bad" not in query
+
+
+@pytest.mark.unit
+def test_transactions_batch_of_invalid_ids_skips_graphdb(client):
+    """Test that a batch with no usable ID answers empty without querying."""
+    with patch(
+        "src.routers.transactions.execute_sparql_query", new_callable=AsyncMock
+    ) as mock_query:
+        response = client.post("/api/v1/transactions/batch", json={"ids": ["a b"]})
+
+        assert response.status_code == 200
+        assert response.json() == []
+        mock_query.assert_not_called()
+
+
+@pytest.mark.unit
+def test_transaction_receipt_validates_item_rows(client):
+    """Test that receipt line items are coerced from SPARQL string values."""
+    receipt = {"receipt": {"value": "https://static.rwpz.net/spendcast/receipt1"}}
+    with patch(
+        "src.routers.transactions.execute_sparql_query", new_callable=AsyncMock
+    ) as mock_query:
+        mock_query.side_effect = [
+            {"results": {"bindings": [receipt]}},
+            {"results": {"bindings": [{**receipt, "total_amount": {"value": "7.5"}}]}},
+            {
+                "results": {
+                    "bindings": [
+                        {
+                            "item_description": {"value": "Milk"},
+                            "quantity": {"value": "2"},
+                            "unit_price": {"value": "1.25"},
+                            "line_subtotal": {"value": "2.50"},
+                        },
+                        {"product_name": {"value": "Bread"}},
+                    ]
+                }
+            },
+        ]
+
+        response = client.get("/api/v1/transactions/tx1/receipt")
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["receipt_id"] == "receipt1"
+        assert data["total_amount"] == 7.5
+        assert data["items"][0]["quantity"] == 2
+        assert data["items"][0]["line_subtotal"] == 2.5
+        assert data["items"][1]["item_description"] == "Unknown item"
+        assert data["items"][1]["unit_price"] == 0.0
+
+
+@pytest.mark.unit
+def test_spending_overview_splits_buckets_from_one_query(client):
+    """Test that the overview is one query whose rows are split by bucket."""
+
+    def row(bucket, label, total, count):
+        return {
+            "bucket": {"value": bucket},
+            "label": {"value": label},
+            "total": {"value": total},
+            "count": {"value": count},
+        }
+
+    with patch(
+        "src.routers.transactions.execute_sparql_query", new_callable=AsyncMock
+    ) as mock_query:
+        mock_query.return_value = {
+            "results": {
+                "bindings": [
+                    row("type", "expense", "300.0", "3"),
+                    row("type", "income", "1000.0", "1"),
+                    row("category", "Transportation", "230.00", "8"),
+                    row("category", "Food & Dining", "450.75", "18"),
+                    row("merchant", "Coffee Shop", "25.50", "2"),
+                ]
+            }
+        }
+
+        response = client.get("/api/v1/transactions/analytics/overview")
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["total_spending"] == 300.0
+        assert data["net_amount"] == 700.0
+        assert data["transaction_count"] == 4
+        assert [c["category"] for c in data["top_categories"]] == [
+            "Food & Dining",
+            "Transportation",
+        ]
+        assert data["top_merchants"] == [
+            {"merchant": "Coffee Shop", "total_spent": 25.5, "transaction_count": 2}
+        ]
+        mock_query.assert_called_once()
+
+
+@pytest.mark.unit
+def test_monthly_trends_map_one_row_per_month(client):
+    """Test that per-month sums from GraphDB are returned without regrouping."""
+    with patch(
+        "src.routers.transactions.execute_sparql_query", new_callable=AsyncMock
+    ) as mock_query:
+        mock_query.return_value = {
+            "results": {
+                "bindings": [
+                    {
+                        "month": {"value": "2024-01"},
+                        "spending": {"value": "300.5"},
+                        "income": {"value": "1000"},
+                        "count": {"value": "5"},
+                    }
+                ]
+            }
+        }
+
+        response = client.get("/api/v1/transactions/analytics/monthly-trends?year=2024")
+
+        assert response.status_code == 200
+        assert response.json()["monthly_trends"] == [
+            {
+                "month": "2024-01",
+                "spending": 300.5,
+                "income": 1000.0,
+                "transaction_count": 5,
+                "net": 699.5,
+            }
+        ]
+        assert "GROUP BY ?month\n" in mock_query.call_args[0][0]
+
+
+@pytest.mark.unit
+def test_monthly_trends_are_cached_until_invalidated(client):
+    """Test that repeated trend requests hit the cache and invalidation clears it."""
+    with patch(
+        "src.routers.transactions.execute_sparql_query", new_callable=AsyncMock
+    ) as mock_query:
+        mock_query.return_value = {"results": {"bindings": []}}
+
+        first = client.get("/api/v1/transactions/analytics/monthly-trends?year=2024")
+        second = client.get("/api/v1/transactions/analytics/monthly-trends?year=2024")
+        client.get("/api/v1/transactions/analytics/monthly-trends?year=2025")
+
+        assert first.json() == second.json()
+        assert mock_query.call_count == 2
+
+        response = client.post("/api/v1/transactions/analytics/cache/invalidate")
+        assert response.json() == {"invalidated": 2}
+
+        client.get("/api/v1/transactions/analytics/monthly-trends?year=2024")
+        assert mock_query.call_count == 3
+
+
+@pytest.mark.unit
+def test_overview_binds_customer_name_as_escaped_literal(client):
+    """Test that user input is bound as a VALUES literal, never spliced into SPARQL."""
+    with patch(
+        "src.routers.transactions.execute_sparql_query", new_callable=AsyncMock
+    ) as mock_query:
+        mock_query.return_value = {"results": {"bindings": []}}
+
+        client.get(
+            "/api/v1/transactions/analytics/overview",
+            params={"customer_name": 'Eve" . } #', "start_date": "2024-01-01"},
+        )
+
+        query = mock_query.call_args[0][0]
+        assert "#PARAMS" not in query
+        assert (
+            'VALUES (?p_start ?p_end ?p_customer) { ("2024-01-01"^^'
+            '<http://www.w3.org/2001/XMLSchema#date> UNDEF "Eve\\" . } #") }'
+        ) in query
+        assert query.startswith(
+            transactions.SPENDING_OVERVIEW_QUERY.template.split("#PARAMS")[0]
+        )
+        assert query.count("?customer exs:hasName ?p_customer .") == 3
+
+
+@pytest.mark.unit
+def test_overview_without_customer_skips_customer_join(client):
+    """Test that unscoped analytics use the template without the customer pattern."""
+    with patch(
+        "src.routers.transactions.execute_sparql_query", new_callable=AsyncMock
+    ) as mock_query:
+        mock_query.return_value = {"results": {"bindings": []}}
+
+        client.get("/api/v1/transactions/analytics/monthly-trends?year=2024")
+
+        query = mock_query.call_args[0][0]
+        assert "?p_customer" not in query
+        assert "exs:hasAccountHolder" not in query
+
+
+@pytest.mark.unit
+def test_transaction_details_rejects_invalid_id(client):
+    """Test that IDs which cannot form an IRI are rejected before querying."""
+    with patch(
+        "src.routers.transactions.execute_sparql_query", new_callable=AsyncMock
+    ) as mock_query:
+        response = client.get("/api/v1/transactions/tx1>%20%7D")
+
+        assert response.status_code == 400
+        mock_query.assert_not_called()
+
+
+@pytest.mark.unit
+def test_transaction_details_accepts_percent_encoded_id(client):
+    """Test that IDs minted from non-ASCII merchant names reach GraphDB unchanged."""
+    transaction_id = "%C3%96V_Abo_2025_2025_02_16"
+    with patch(
+        "src.routers.transactions.execute_sparql_query", new_callable=AsyncMock
+    ) as mock_query:
+        mock_query.return_value = {
+            "results": {
+                "bindings": [
+                    {
+                        "transaction": {
+                            "value": f"https://static.rwpz.net/spendcast/tx/{transaction_id}"
+                        },
+                        "amount": {"value": "85.0"},
+                        "currency": {"value": "https://static.rwpz.net/spendcast/CHF"},
+                        "date": {"value": "2025-02-16"},
+                    }
+                ]
+            }
+        }
+
+        escaped = client.get(f"/api/v1/transactions/{quote(transaction_id)}")
+        decoded = client.get(f"/api/v1/transactions/{transaction_id}")
+
+        for response in (escaped, decoded):
+            assert response.status_code == 200
+            assert response.json()["transaction_id"] == transaction_id
+        for call in mock_query.call_args_list:
+            assert f"<https://static.rwpz.net/spendcast/tx/{transaction_id}>" in (
+                call[0][0]
+            )